@@ -0,0 +1,34 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.template import engines
+
+REFERENCIA_STATIC = re.compile(r"""\{%\s*static\s+['"]/?([^'"]+)['"]""")
+
+
+def arquivos_referenciados():
+    """Caminhos usados em ``{% static %}`` em todos os templates do projeto."""
+    referenciados = set()
+    for engine in engines.all():
+        for diretorio in engine.template_dirs:
+            for template in Path(diretorio).rglob('*.html'):
+                referenciados.update(REFERENCIA_STATIC.findall(template.read_text(encoding='utf-8', errors='ignore')))
+    return referenciados
+
+
+class PrunedFileSystemFinder(FileSystemFinder):
+    """
+    Ignora no collectstatic os arquivos de ``STATIC_PRUNE_PREFIXES`` (módulos
+    de demonstração do tema em ``js/custom``) que nenhum template referencia.
+    """
+
+    def list(self, ignore_patterns):
+        prefixos = tuple(getattr(settings, 'STATIC_PRUNE_PREFIXES', ()))
+        referenciados = arquivos_referenciados()
+        for caminho, storage in super().list(ignore_patterns):
+            relativo = caminho.replace('\\', '/')
+            if relativo.startswith(prefixos) and relativo not in referenciados:
+                continue
+            yield caminho, storage
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.base.models import ArquivoArmazenado
+from apps.base.storage import ArmazenamentoEmCamadas
+
+
+class Command(BaseCommand):
+    help = 'Move para a camada fria (comprimida) os anexos sem acesso há mais de N dias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.ANEXOS_DIAS_FRIO)
+        parser.add_argument('--limite', type=int, default=1000, help='arquivos processados por execução')
+        parser.add_argument('--registrar-existentes', action='store_true',
+                            help='cria os metadados dos arquivos anteriores ao armazenamento em camadas')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ArmazenamentoEmCamadas):
+            raise CommandError('STORAGES["default"] não usa apps.base.storage.ArmazenamentoEmCamadas.')
+
+        if options['registrar_existentes']:
+            self.stdout.write(f'{default_storage.registrar_existentes()} arquivos existentes registrados.')
+
+        limite = timezone.now() - timedelta(days=options['dias'])
+        frios = ArquivoArmazenado.objects.filter(camada=ArquivoArmazenado.QUENTE).filter(
+            Q(acessado_em__lt=limite) | Q(acessado_em__isnull=True, criado_em__lt=limite)
+        ).values_list('nome', flat=True)[:options['limite']]
+
+        movidos, antes, depois = 0, 0, 0
+        for nome in list(frios):
+            if not default_storage.exists(nome):
+                ArquivoArmazenado.objects.filter(nome=nome).delete()
+                continue
+            tamanho = default_storage.size(nome)
+            depois += default_storage.mover_para_frio(nome)
+            antes += tamanho
+            movidos += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{movidos} anexos movidos para a camada fria: {antes / 1024:.0f} KB -> {depois / 1024:.0f} KB'
+        ))
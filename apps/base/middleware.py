@@ -0,0 +1,54 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .routers import estado_requisicao
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-writes: depois de uma escrita, o cliente recebe um cookie que
+    mantém suas leituras no primário por ``REPLICA_PIN_SECONDS``, tempo
+    suficiente para a réplica alcançar o primário. Síncrono e assíncrono: sob
+    ASGI o estado da requisição segue no contexto até as threads do
+    ``sync_to_async``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    cookie_name = 'db_primario'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.segundos = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with estado_requisicao(fixado=self.fixado(request)) as estado:
+            response = self.get_response(request)
+            self.fixar(estado, response)
+        return response
+
+    async def __acall__(self, request):
+        with estado_requisicao(fixado=self.fixado(request)) as estado:
+            response = await self.get_response(request)
+            self.fixar(estado, response)
+        return response
+
+    def fixar(self, estado, response):
+        if estado.escreveu:
+            response.set_cookie(
+                self.cookie_name, str(time.time() + self.segundos),
+                max_age=self.segundos, httponly=True, samesite='Lax',
+            )
+
+    def fixado(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
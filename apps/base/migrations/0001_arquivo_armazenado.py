@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoArmazenado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=255, unique=True)),
+                ('tamanho', models.PositiveBigIntegerField(default=0)),
+                ('tamanho_armazenado', models.PositiveBigIntegerField(default=0)),
+                ('camada', models.CharField(choices=[('Q', 'Quente'), ('F', 'Fria')], default='Q', max_length=1)),
+                ('compressao', models.CharField(blank=True, max_length=10)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('acessado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Arquivo Armazenado',
+                'verbose_name_plural': 'Arquivos Armazenados',
+                'indexes': [models.Index(fields=['camada', 'acessado_em'], name='arquivo_camada_acesso_idx')],
+            },
+        ),
+    ]
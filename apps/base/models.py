@@ -14,4 +14,34 @@ class Base(models.Model):
     ativo = models.BooleanField(default=False)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class ArquivoArmazenado(models.Model):
+    """
+    Metadados de cada arquivo gravado pelo ``ArmazenamentoEmCamadas``: permitem
+    escolher o que vai para a camada fria sem varrer o MEDIA_ROOT.
+    """
+    QUENTE = 'Q'
+    FRIO = 'F'
+    CAMADA_CHOICES = [
+        (QUENTE, 'Quente'),
+        (FRIO, 'Fria'),
+    ]
+
+    nome = models.CharField(max_length=255, unique=True)
+    tamanho = models.PositiveBigIntegerField(default=0)
+    tamanho_armazenado = models.PositiveBigIntegerField(default=0)
+    camada = models.CharField(max_length=1, choices=CAMADA_CHOICES, default=QUENTE)
+    compressao = models.CharField(max_length=10, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    acessado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Arquivo Armazenado'
+        verbose_name_plural = 'Arquivos Armazenados'
+        indexes = [
+            models.Index(fields=['camada', 'acessado_em'], name='arquivo_camada_acesso_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.nome} ({self.get_camada_display()})'
@@ -0,0 +1,38 @@
+"""
+Compilação antecipada dos templates do projeto.
+
+Com o loader em cache (``django.template.loaders.cached.Loader``) cada template
+é lido e compilado uma vez por processo, no primeiro ``get_template``. Chamada
+pelo conf/wsgi.py e conf/asgi.py quando ``TEMPLATES_PRECOMPILAR`` está ligado,
+``precompilar_templates`` faz esse trabalho na subida do worker, e a primeira
+requisição de cada página já encontra todos os parciais compilados.
+"""
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+EXTENSOES_TEMPLATE = ('.html', '.txt', '.js')
+
+
+def nomes_templates(diretorios=None):
+    """Nomes (relativos ao diretório de templates) de todos os templates do projeto."""
+    engine = engines['django'].engine
+    for diretorio in diretorios or engine.dirs:
+        for raiz, _, arquivos in os.walk(diretorio):
+            for arquivo in sorted(arquivos):
+                if arquivo.endswith(EXTENSOES_TEMPLATE):
+                    yield os.path.relpath(os.path.join(raiz, arquivo), diretorio).replace(os.sep, '/')
+
+
+def precompilar_templates(diretorios=None):
+    """Compila os templates no loader em cache; devolve (compilados, {nome: erro})."""
+    engine = engines['django'].engine
+    compilados, erros = 0, {}
+    for nome in nomes_templates(diretorios):
+        try:
+            engine.get_template(nome)
+        except TemplateSyntaxError as erro:
+            erros[nome] = str(erro)
+        else:
+            compilados += 1
+    return compilados, erros
@@ -0,0 +1,87 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+ALIAS_PRIMARIO = 'default'
+ALIAS_REPLICA = 'replica'
+
+# Estado da requisição atual; é um objeto mutável para que escritas feitas em
+# threads do sync_to_async (contexto copiado) fiquem visíveis para o middleware
+_estado = contextvars.ContextVar('estado_replica', default=None)
+
+
+class EstadoRequisicao:
+    def __init__(self, fixado=False):
+        self.fixado = fixado
+        self.escreveu = False
+        self.leitura_replica = False
+
+
+def estado_atual():
+    return _estado.get()
+
+
+@contextmanager
+def estado_requisicao(fixado=False):
+    token = _estado.set(EstadoRequisicao(fixado))
+    try:
+        yield _estado.get()
+    finally:
+        _estado.reset(token)
+
+
+@contextmanager
+def ler_da_replica():
+    """
+    Envia as leituras do bloco para a réplica, a menos que a sessão esteja
+    fixada no primário ou algo já tenha sido escrito nesta requisição.
+    """
+    estado = _estado.get()
+    token = None
+    if estado is None:
+        # Fora de uma requisição (relatórios, comandos)
+        token = _estado.set(EstadoRequisicao())
+        estado = _estado.get()
+
+    anterior = estado.leitura_replica
+    estado.leitura_replica = True
+    try:
+        yield
+    finally:
+        estado.leitura_replica = anterior
+        if token is not None:
+            _estado.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Escritas sempre no primário; leituras na réplica apenas dentro de
+    ``ler_da_replica()`` (views somente leitura e relatórios).
+    """
+
+    def apps_somente_primario(self):
+        return getattr(settings, 'REPLICA_EXCLUDED_APPS', ['sessions'])
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if (
+            estado is not None
+            and estado.leitura_replica
+            and not estado.fixado
+            and not estado.escreveu
+            and ALIAS_REPLICA in settings.DATABASES
+            and model._meta.app_label not in self.apps_somente_primario()
+        ):
+            return ALIAS_REPLICA
+        return ALIAS_PRIMARIO
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None and model._meta.app_label not in self.apps_somente_primario():
+            estado.escreveu = True
+        return ALIAS_PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primário e réplica guardam os mesmos dados
+        return True
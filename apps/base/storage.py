@@ -0,0 +1,232 @@
+import gzip
+import os
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils import timezone
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.xml', '.html', '.ttf', '.eot', '.otf', '.ico')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest com nomes por hash de conteúdo e variantes ``.gz``/``.br``
+    geradas no collectstatic, servidas por ``apps.base.views.servir_estatico``.
+    """
+
+    # Referências quebradas nos bundles do tema não devem impedir o deploy
+    manifest_strict = False
+    tamanho_minimo = 1024
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except (ValueError, SuspiciousFileOperation):
+            # url() para arquivo ausente no tema (ou fora do STATIC_ROOT): mantém a referência original
+            return name
+
+    def url(self, name, force=False):
+        # {% static '/arle/...' %}: a barra inicial levaria o safe_join para fora do STATIC_ROOT
+        return super().url(name.lstrip('/') if name else name, force)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for nome in set(self.hashed_files.values()):
+            if not nome.endswith(EXTENSOES_COMPRIMIVEIS) or not self.exists(nome):
+                continue
+            with self.open(nome) as arquivo:
+                conteudo = arquivo.read()
+            if len(conteudo) < self.tamanho_minimo:
+                continue
+
+            for sufixo, comprimido in self.comprimir(conteudo):
+                # Só mantém a variante quando ela realmente é menor
+                if len(comprimido) < len(conteudo):
+                    with open(self.path(nome + sufixo), 'wb') as destino:
+                        destino.write(comprimido)
+                    yield nome, nome + sufixo, True
+
+    def comprimir(self, conteudo):
+        yield '.gz', gzip.compress(conteudo, compresslevel=9, mtime=0)
+        if brotli is not None:
+            yield '.br', brotli.compress(conteudo, quality=11)
+
+
+class LeituraGzip(gzip.GzipFile):
+    # Só para frente: quem mede o arquivo com seek(0, 2) (FileResponse) descomprimiria tudo duas vezes
+    def seekable(self):
+        return False
+
+
+def abrir_gzip(caminho):
+    return LeituraGzip(caminho, 'rb')
+
+
+def gravar_gzip(origem, caminho):
+    with gzip.open(caminho, 'wb', compresslevel=6) as destino:
+        shutil.copyfileobj(origem, destino)
+
+
+def abrir_zstd(caminho):
+    return zstandard.ZstdDecompressor().stream_reader(open(caminho, 'rb'), closefd=True)
+
+
+def gravar_zstd(origem, caminho):
+    with open(caminho, 'wb') as destino:
+        zstandard.ZstdCompressor(level=10).copy_stream(origem, destino)
+
+
+# Sufixo no disco -> (nome, abrir, gravar)
+CODECS = {'.zst': ('zstd', abrir_zstd, gravar_zstd), '.gz': ('gzip', abrir_gzip, gravar_gzip)}
+
+# Formatos que já são comprimidos: na camada fria ficam como estão
+EXTENSOES_INCOMPRESSIVEIS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf', '.zip', '.gz', '.7z', '.rar',
+    '.docx', '.xlsx', '.pptx', '.mp3', '.mp4', '.mov',
+)
+
+
+class ArmazenamentoEmCamadas(FileSystemStorage):
+    """
+    Armazenamento dos anexos em duas camadas.
+
+    Arquivos novos ficam na camada quente, como foram enviados. O comando
+    ``compactar_anexos`` move os que não são acessados há ``ANEXOS_DIAS_FRIO``
+    dias para a camada fria, comprimidos ao lado do nome original (``.zst``
+    com o pacote ``zstandard``, senão ``.gz``). ``open()`` descomprime de forma
+    transparente e a URL aponta para ``base:anexo``, que serve os dois casos.
+    Tamanho, camada e último acesso ficam em ``ArquivoArmazenado``.
+    """
+
+    # Evita uma escrita por download: o último acesso é atualizado no máximo uma vez por intervalo
+    intervalo_acesso = timedelta(hours=1)
+
+    def metadados(self):
+        from .models import ArquivoArmazenado
+        return ArquivoArmazenado.objects
+
+    def caminho_frio(self, name):
+        for sufixo, codec in CODECS.items():
+            caminho = self.path(name) + sufixo
+            if os.path.exists(caminho):
+                return caminho, codec
+        return None, None
+
+    def _save(self, name, content):
+        from .models import ArquivoArmazenado
+
+        name = super()._save(name, content)
+        tamanho = os.path.getsize(self.path(name))
+        self.metadados().update_or_create(nome=name, defaults={
+            'tamanho': tamanho, 'tamanho_armazenado': tamanho, 'camada': ArquivoArmazenado.QUENTE, 'compressao': '',
+            'acessado_em': timezone.now(),
+        })
+        return name
+
+    def _open(self, name, mode='rb'):
+        self.registrar_acesso(name)
+        if os.path.exists(self.path(name)):
+            return super()._open(name, mode)
+
+        caminho, codec = self.caminho_frio(name)
+        if caminho is None:
+            return super()._open(name, mode)
+        return File(codec[1](caminho), name=name)
+
+    def abrir_comprimido(self, name, codecs):
+        """
+        Arquivo frio como está no disco quando comprimido com um de ``codecs``
+        (quem recebe descomprime): ``(arquivo, codec)``, senão ``(None, None)``.
+        """
+        if os.path.exists(self.path(name)):
+            return None, None
+        caminho, codec = self.caminho_frio(name)
+        if caminho is None or codec[0] not in codecs:
+            return None, None
+        self.registrar_acesso(name)
+        return File(open(caminho, 'rb'), name=name), codec[0]
+
+    def registrar_acesso(self, name):
+        agora = timezone.now()
+        vencido = self.metadados().filter(nome=name, acessado_em__lt=agora - self.intervalo_acesso)
+        # A leitura antes do UPDATE poupa o lock de escrita do SQLite na maioria dos downloads
+        if vencido.exists():
+            vencido.update(acessado_em=agora)
+
+    def exists(self, name):
+        return super().exists(name) or self.caminho_frio(name)[0] is not None
+
+    def delete(self, name):
+        super().delete(name)
+        caminho, _ = self.caminho_frio(name)
+        if caminho is not None:
+            os.remove(caminho)
+        self.metadados().filter(nome=name).delete()
+
+    def size(self, name):
+        tamanho = self.metadados().filter(nome=name).values_list('tamanho', flat=True).first()
+        return tamanho if tamanho is not None else super().size(name)
+
+    def url(self, name):
+        return reverse('base:anexo', args=[name])
+
+    def mover_para_frio(self, name):
+        """Comprime o arquivo quente; devolve o tamanho armazenado na camada fria."""
+        caminho = self.path(name)
+        tamanho = os.path.getsize(caminho)
+        sufixo = '.zst' if zstandard is not None else '.gz'
+        codec, _, gravar = CODECS[sufixo]
+
+        if not name.lower().endswith(EXTENSOES_INCOMPRESSIVEIS):
+            with open(caminho, 'rb') as origem:
+                gravar(origem, caminho + sufixo)
+            comprimido = os.path.getsize(caminho + sufixo)
+            # Só troca o original quando a compressão compensa
+            if comprimido < tamanho * 0.9:
+                os.remove(caminho)
+                self.metadados().filter(nome=name).update(
+                    camada=self.metadados().model.FRIO, compressao=codec, tamanho=tamanho, tamanho_armazenado=comprimido
+                )
+                return comprimido
+            os.remove(caminho + sufixo)
+
+        self.metadados().filter(nome=name).update(camada=self.metadados().model.FRIO, compressao='', tamanho=tamanho, tamanho_armazenado=tamanho)
+        return tamanho
+
+    def registrar_existentes(self, diretorio=''):
+        """Cria os metadados de arquivos gravados antes deste armazenamento (varredura única)."""
+        conhecidos = set(self.metadados().values_list('nome', flat=True))
+        diretorios, arquivos = self.listdir(diretorio)
+        novos = []
+        for nome in arquivos:
+            nome = f'{diretorio}/{nome}' if diretorio else nome
+            if nome in conhecidos or nome.endswith(tuple(CODECS)):
+                continue
+            tamanho = os.path.getsize(self.path(nome))
+            novos.append(self.metadados().model(
+                nome=nome, tamanho=tamanho, tamanho_armazenado=tamanho,
+                acessado_em=datetime.fromtimestamp(os.path.getmtime(self.path(nome)), tz=dt_timezone.utc),
+            ))
+        self.metadados().bulk_create(novos, ignore_conflicts=True)
+        total = len(novos)
+        for subdiretorio in diretorios:
+            total += self.registrar_existentes(f'{diretorio}/{subdiretorio}' if diretorio else subdiretorio)
+        return total
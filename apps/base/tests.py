@@ -0,0 +1,158 @@
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ArquivoArmazenado
+from .views import servir_anexo, servir_estatico
+
+
+class EstaticosTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(STATIC_ROOT=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        for sufixo, conteudo in (('', b'body{}'), ('.gz', b'gzip'), ('.br', b'brotli')):
+            with open(os.path.join(diretorio.name, 'app.css' + sufixo), 'wb') as arquivo:
+                arquivo.write(conteudo)
+
+    def baixar(self, aceitas=None, **cabecalhos):
+        if aceitas is not None:
+            cabecalhos['HTTP_ACCEPT_ENCODING'] = aceitas
+        response = servir_estatico(RequestFactory().get('/static/app.css', **cabecalhos), 'app.css')
+        conteudo = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, conteudo
+
+    def test_negociacao_respeita_os_pesos(self):
+        casos = {
+            None: b'body{}',
+            'gzip, deflate, br': b'brotli',
+            'gzip;q=1, br;q=0.5': b'gzip',
+            'br;q=0, gzip': b'gzip',
+            'gzip;q=0': b'body{}',
+            'GZIP; Q=0.8': b'gzip',
+            'identity;q=1, br;q=0': b'body{}',
+            'identity;q=0.5, *': b'brotli',
+            '*;q=0': b'body{}',
+        }
+        for aceitas, esperado in casos.items():
+            with self.subTest(aceitas=aceitas):
+                response, conteudo = self.baixar(aceitas)
+                self.assertEqual(conteudo, esperado)
+                self.assertEqual(response.get('Content-Encoding'), {b'gzip': 'gzip', b'brotli': 'br'}.get(esperado))
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(STORAGES={
+        **settings.STORAGES, 'staticfiles': {'BACKEND': 'apps.base.storage.CompressedManifestStaticFilesStorage'},
+    })
+    def test_paginas_renderizam_com_o_storage_de_producao(self):
+        os.makedirs(os.path.join(settings.STATIC_ROOT, 'arle', 'logos'))
+        with open(os.path.join(settings.STATIC_ROOT, 'arle', 'logos', 'default.ico'), 'wb') as arquivo:
+            arquivo.write(b'icone')
+
+        response = self.client.get(reverse('ticket:login'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.content.decode(), r'href="/static/arle/logos/default\.[0-9a-f]{12}\.ico"')
+        # Barra inicial ou arquivo ausente não derrubam a página
+        self.assertEqual(staticfiles_storage.url('/arle/logos/default.ico'), staticfiles_storage.url('arle/logos/default.ico'))
+        self.assertTrue(staticfiles_storage.url('../fora.css'))
+
+    def test_304_quando_nao_modificado(self):
+        response, _ = self.baixar('gzip')
+        response, conteudo = self.baixar('gzip', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual((response.status_code, conteudo), (304, b''))
+
+
+class ArmazenamentoTests(TestCase):
+
+    CONTEUDO = b'linha de log repetida\n' * 200
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.usuario = get_user_model().objects.create(username='colaborador')
+        self.client.force_login(self.usuario)
+        self.nome = default_storage.save('anexos/log.txt', ContentFile(self.CONTEUDO))
+        self.url = default_storage.url(self.nome)
+
+    def envelhecer(self, dias=60):
+        ArquivoArmazenado.objects.update(acessado_em=timezone.now() - timedelta(days=dias))
+
+    def atualizacoes(self, **cabecalhos):
+        # Direto na view: o test client troca o streaming_content e esconde o arquivo aberto
+        request = RequestFactory().get(self.url, **cabecalhos)
+        request.user = self.usuario
+        with CaptureQueriesContext(connection) as consultas:
+            response = servir_anexo(request, self.nome)
+            arquivo = response.file_to_stream
+            conteudo = b''.join(response.streaming_content)
+            response.close()
+        self.assertTrue(arquivo.closed)
+        return response, conteudo, sum('UPDATE "base_arquivoarmazenado"' in consulta['sql'] for consulta in consultas)
+
+    def test_ida_e_volta_entre_as_camadas(self):
+        self.assertEqual(ArquivoArmazenado.objects.get().camada, ArquivoArmazenado.QUENTE)
+        armazenado = default_storage.mover_para_frio(self.nome)
+
+        metadados = ArquivoArmazenado.objects.get()
+        self.assertEqual((metadados.camada, metadados.compressao), (ArquivoArmazenado.FRIO, 'gzip'))
+        self.assertEqual((metadados.tamanho, metadados.tamanho_armazenado), (len(self.CONTEUDO), armazenado))
+        self.assertFalse(os.path.exists(default_storage.path(self.nome)))
+        self.assertTrue(default_storage.exists(self.nome))
+        self.assertEqual(default_storage.size(self.nome), len(self.CONTEUDO))
+        with default_storage.open(self.nome) as arquivo:
+            self.assertEqual(arquivo.read(), self.CONTEUDO)
+
+    def test_download_registra_um_acesso_e_fecha_o_arquivo(self):
+        default_storage.mover_para_frio(self.nome)
+        self.envelhecer()
+
+        response, conteudo, atualizacoes = self.atualizacoes(HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertEqual((conteudo, atualizacoes), (self.CONTEUDO, 1))
+        self.assertEqual(int(response['Content-Length']), len(self.CONTEUDO))
+        self.assertNotIn('Content-Encoding', response)
+
+        # Já registrado dentro do intervalo: o GET não escreve
+        response, conteudo, atualizacoes = self.atualizacoes(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual((response['Content-Encoding'], atualizacoes), ('gzip', 0))
+        self.assertEqual(gzip.decompress(conteudo), self.CONTEUDO)
+
+    def test_delete_remove_as_duas_camadas(self):
+        default_storage.mover_para_frio(self.nome)
+        default_storage.delete(self.nome)
+
+        self.assertFalse(default_storage.exists(self.nome))
+        self.assertEqual(default_storage.listdir('anexos')[1], [])
+        self.assertFalse(ArquivoArmazenado.objects.exists())
+
+    def test_compactar_anexos_move_apenas_os_sem_acesso(self):
+        self.envelhecer()
+        recente = default_storage.save('anexos/recente.txt', ContentFile(self.CONTEUDO))
+
+        call_command('compactar_anexos', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(dict(ArquivoArmazenado.objects.values_list('nome', 'camada')), {
+            self.nome: ArquivoArmazenado.FRIO, recente: ArquivoArmazenado.QUENTE,
+        })
+        self.assertEqual(self.client.get(self.url).getvalue(), self.CONTEUDO)
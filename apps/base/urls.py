@@ -8,4 +8,5 @@ app_name = 'base'
 urlpatterns = [
     path('', Login.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('anexos/<path:nome>', servir_anexo, name='anexo'),
 ]
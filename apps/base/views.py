@@ -1,7 +1,18 @@
-from icecream import ic
+import mimetypes
+import os
 
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, LogoutView
+from django.core.files.storage import default_storage
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.urls import reverse_lazy
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import content_disposition_header, http_date
+from django.views.static import was_modified_since
 
 from .forms import CustomAuthenticationForm
 
@@ -13,4 +24,101 @@ class Login(LoginView):
     authentication_form = CustomAuthenticationForm
 
 class LogoutView(LogoutView):
-    next_page = reverse_lazy('landingpage:dashboard')
\ No newline at end of file
+    next_page = reverse_lazy('landingpage:dashboard')
+
+
+# Nomes com hash do manifest: podem ser cacheados para sempre
+arquivos_com_hash = SimpleLazyObject(lambda: set(getattr(staticfiles_storage, 'hashed_files', {}).values()))
+
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def codificacoes_aceitas(request):
+    """``Accept-Encoding`` como ``{codificação: q}``; ``q`` ausente vale 1 e inválido, 0."""
+    aceitas = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nome, *parametros = item.split(';')
+        q = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.strip().partition('=')
+            if chave.lower() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if nome.strip():
+            aceitas[nome.strip().lower()] = q
+    return aceitas
+
+
+def escolher_codificacao(request, disponiveis):
+    """
+    A codificação de ``disponiveis`` de maior ``q`` para o cliente (empate: a
+    primeira), ou None para enviar sem compressão. ``*`` cobre as não
+    listadas; ``q=0`` recusa; ``identity`` só vence quando pedida com ``q`` maior.
+    """
+    aceitas = codificacoes_aceitas(request)
+    escolhida, maior = None, aceitas.get('identity', 0)
+    for nome in disponiveis:
+        q = aceitas.get(nome, aceitas.get('*', 0))
+        if q > maior:
+            escolhida, maior = nome, q
+    return escolhida
+
+
+def servir_estatico(request, path):
+    """
+    Serve o STATIC_ROOT em produção, preferindo as variantes pré-comprimidas
+    geradas pelo collectstatic e com cache longo para arquivos com hash.
+    """
+    caminho = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(caminho):
+        raise Http404('Arquivo estático não encontrado.')
+
+    estado = os.stat(caminho)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), estado.st_mtime):
+        return HttpResponseNotModified()
+
+    variantes = {nome: caminho + sufixo for nome, sufixo in CODIFICACOES if os.path.isfile(caminho + sufixo)}
+    codificacao = escolher_codificacao(request, variantes)
+    arquivo = variantes[codificacao] if codificacao else caminho
+
+    content_type = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+    response = FileResponse(open(arquivo, 'rb'), content_type=content_type)
+    response['Last-Modified'] = http_date(estado.st_mtime)
+    if codificacao:
+        response['Content-Encoding'] = codificacao
+    patch_vary_headers(response, ['Accept-Encoding'])
+
+    if path in arquivos_com_hash:
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=3600)
+    return response
+
+
+@login_required
+def servir_anexo(request, nome):
+    """
+    Download de anexos do ``ArmazenamentoEmCamadas``: arquivos quentes saem
+    como estão; os frios são descomprimidos em blocos, ou enviados já em gzip
+    quando o cliente aceita. O acesso é registrado uma vez, pelo armazenamento.
+    """
+    if not default_storage.exists(nome):
+        raise Http404('Anexo não encontrado.')
+
+    content_type = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    comprimido, codec = default_storage.abrir_comprimido(nome, [escolher_codificacao(request, ['gzip'])])
+    if comprimido is not None:
+        response = FileResponse(comprimido, content_type=content_type)
+        response['Content-Encoding'] = codec
+    else:
+        # Quente ou descomprimido em blocos; o FileResponse fecha o arquivo ao fim da resposta
+        response = FileResponse(default_storage.open(nome), content_type=content_type)
+    if 'Content-Length' not in response:
+        response['Content-Length'] = default_storage.size(nome)
+
+    response['Content-Disposition'] = content_disposition_header(False, os.path.basename(nome))
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, private=True, max_age=3600)
+    return response
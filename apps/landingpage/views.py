@@ -1,5 +1,3 @@
-from icecream import ic
-
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 
@@ -1,3 +1,69 @@
 from django.contrib import admin
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import EventoSaida, PerfilRequisicao
+
+
+@admin.register(PerfilRequisicao)
+class PerfilRequisicaoAdmin(admin.ModelAdmin):
+    list_display = ['criado_em', 'metodo', 'caminho', 'status_code', 'duracao_ms', 'total_queries', 'tempo_sql_ms', 'usuario', 'downloads']
+    list_filter = ['metodo', 'status_code']
+    search_fields = ['caminho']
+    exclude = ['dados', 'sql']
+    readonly_fields = ['caminho', 'metodo', 'usuario', 'status_code', 'duracao_ms', 'total_queries', 'tempo_sql_ms', 'resumo', 'downloads', 'criado_em']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<int:perfil_id>/download/', self.admin_site.admin_view(self.download), name='ticket_perfilrequisicao_download'),
+            path('<int:perfil_id>/sql/', self.admin_site.admin_view(self.download_sql), name='ticket_perfilrequisicao_sql'),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='Downloads')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">.prof</a> | <a href="{}">SQL</a>',
+            reverse('admin:ticket_perfilrequisicao_download', args=[obj.pk]),
+            reverse('admin:ticket_perfilrequisicao_sql', args=[obj.pk]),
+        )
+
+    def download(self, request, perfil_id):
+        perfil = get_object_or_404(PerfilRequisicao, pk=perfil_id)
+        response = HttpResponse(bytes(perfil.dados), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="perfil_{perfil.pk}.prof"'
+        return response
+
+    def download_sql(self, request, perfil_id):
+        perfil = get_object_or_404(PerfilRequisicao, pk=perfil_id)
+        response = JsonResponse(perfil.sql, safe=False, json_dumps_params={'indent': 2})
+        response['Content-Disposition'] = f'attachment; filename="perfil_{perfil.pk}_sql.json"'
+        return response
+
+
+@admin.register(EventoSaida)
+class EventoSaidaAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'criado_em', 'destino', 'evento', 'tentativas', 'proxima_tentativa', 'enviado_em']
+    list_filter = ['destino', 'evento', ('enviado_em', admin.EmptyFieldListFilter)]
+    readonly_fields = ['destino', 'evento', 'dados', 'criado_em', 'tentativas', 'proxima_tentativa', 'enviado_em', 'erro']
+    actions = ['reenviar']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Reenviar os eventos selecionados')
+    def reenviar(self, request, queryset):
+        total = queryset.update(enviado_em=None, tentativas=0, proxima_tentativa=timezone.now(), erro='')
+        self.message_user(request, f'{total} eventos voltaram para a fila.')
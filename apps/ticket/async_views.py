@@ -0,0 +1,117 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.views.generic import View
+
+from .models import HistoricoTicket, Ticket, Mensagem
+from .forms import TicketStatusForm
+from . import duplicados, facetas
+from .leituras import leituras, marcar_nao_lidos
+from .views import CreateTicketView, DashboardView, TicketDetailView, marcar_recentes
+from apps.base.routers import ler_da_replica
+
+
+async def listar(queryset):
+    return [obj async for obj in queryset]
+
+
+class AsyncDispatchMixin:
+    """
+    Resolve o usuário com ``request.auser()`` antes de chamar o handler,
+    evitando o acesso síncrono à sessão dentro do event loop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+
+@method_decorator(login_required, name='dispatch')
+class AsyncCreateTicketView(AsyncDispatchMixin, CreateTicketView):
+
+    async def get(self, request, *args, **kwargs):
+        await request.session.aset('ticket_saved', False)
+        self.object = None
+        return render(request, self.template_name, self.get_context_data())
+
+    async def post(self, request, *args, **kwargs):
+        # Upload e gravação do ticket continuam no fluxo síncrono, em um único salto de thread
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+
+
+@method_decorator(login_required, name='dispatch')
+class AsyncDashboardView(AsyncDispatchMixin, DashboardView):
+
+    async def get(self, request, *args, **kwargs):
+        tickets = self.get_queryset()
+
+        with ler_da_replica():
+            paginator = Paginator(tickets, self.paginate_by)
+            paginator.count = await tickets.acount()
+            page_obj = paginator.get_page(request.GET.get('page'))
+            page_obj.object_list = await listar(page_obj.object_list)
+            contexto_facetas = await sync_to_async(facetas.contexto)(self.get_filtro())
+        marcar_recentes(page_obj.object_list)
+        await sync_to_async(marcar_nao_lidos)(page_obj.object_list, request.user)
+
+        context = {
+            'tickets': page_obj,
+            'page_obj': page_obj,
+            'paginator': paginator,
+            'is_paginated': page_obj.has_other_pages(),
+            'referer': request.META.get('HTTP_REFERER', '/'),
+            **contexto_facetas,
+        }
+        return render(request, self.template_name, context)
+
+
+@method_decorator(login_required, name='dispatch')
+class AsyncTicketDetailView(AsyncDispatchMixin, TicketDetailView):
+
+    async def get(self, request, ticket_id):
+        try:
+            ticket = await self.get_ticket_queryset().aget(id=ticket_id)
+        except Ticket.DoesNotExist:
+            raise Http404('Ticket não encontrado.')
+
+        await sync_to_async(leituras.marcar_vista)(request.user.pk, ticket.pk, ticket.ultima_mensagem_id)
+
+        # Os avisos podem estar na sessão: carregados fora do event loop
+        avisos = await sync_to_async(self.tem_avisos)(request)
+        versao = None if avisos else self.get_versao(ticket, request)
+        if versao is not None:
+            response = get_conditional_response(request, etag=versao['etag'], last_modified=versao['last_modified'])
+            if response is not None:
+                return self.aplicar_versao(response, versao)
+
+        # Consultas independentes da página disparadas juntas
+        mensagens, historico_list, similares = await asyncio.gather(
+            listar(Mensagem.objects.filter(ticket=ticket).select_related('autor').order_by('criado_em')),
+            listar(HistoricoTicket.objects.filter(ticket=ticket).order_by('data_criacao')),
+            sync_to_async(duplicados.provaveis_duplicados)(ticket),
+        )
+
+        form = TicketStatusForm(instance=ticket)
+        # O select remoto só leva o técnico atual, já carregado pelo select_related;
+        # assim o template não consulta o banco dentro do event loop
+        campo_tecnico = form.fields['tecnico']
+        campo_tecnico.choices = [('', campo_tecnico.empty_label)] + (
+            [(ticket.tecnico.pk, campo_tecnico.label_from_instance(ticket.tecnico))] if ticket.tecnico else []
+        )
+
+        context = self.get_context_data(ticket, form, historico_list, mensagens)
+        context['duplicados'] = similares
+        return self.aplicar_versao(render(request, 'ticket/ticket_detail.html', context), versao)
+
+    async def post(self, request, ticket_id):
+        # As ações de escrita reaproveitam o fluxo síncrono em um único salto de thread
+        return await sync_to_async(super().post)(request, ticket_id)
@@ -0,0 +1,91 @@
+"""
+Busca de usuários por prefixo para os selects de técnico (select2 remoto).
+
+O índice guarda uma lista ordenada de termos (palavras de username, nome,
+sobrenome e e-mail) e resolve cada palavra digitada com ``bisect``: o custo é
+proporcional aos usuários encontrados, não ao tamanho do cadastro. É
+reconstruído sob demanda quando um usuário é salvo neste processo ou quando
+passa de ``BUSCA_USUARIOS_TTL`` segundos (alterações feitas por outros workers).
+"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def palavras(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def rotulo(usuario):
+    """Texto exibido no select: nome completo e username."""
+    nome = usuario.get_full_name()
+    return f'{nome} ({usuario.username})' if nome else usuario.username
+
+
+class IndiceUsuarios:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.termos = []
+        self.ids = []
+        self.rotulos = {}
+        self.carregado_em = None
+
+    def invalidar(self):
+        self.carregado_em = None
+
+    def carregar(self):
+        User = get_user_model()
+        entradas = set()
+        rotulos = {}
+        for usuario in User.objects.filter(is_active=True).only(
+            'pk', 'username', 'first_name', 'last_name', 'email'
+        ).iterator():
+            rotulos[usuario.pk] = rotulo(usuario)
+            for campo in (usuario.username, usuario.first_name, usuario.last_name, usuario.email):
+                entradas.update((termo, usuario.pk) for termo in palavras(campo))
+
+        entradas = sorted(entradas)
+        self.termos = [termo for termo, _ in entradas]
+        self.ids = [usuario_id for _, usuario_id in entradas]
+        self.rotulos = rotulos
+        self.carregado_em = time.monotonic()
+
+    def garantir_carregado(self):
+        ttl = getattr(settings, 'BUSCA_USUARIOS_TTL', 300)
+        with self.lock:
+            if self.carregado_em is None or time.monotonic() - self.carregado_em > ttl:
+                self.carregar()
+
+    def prefixo(self, termo):
+        inicio = bisect.bisect_left(self.termos, termo)
+        fim = bisect.bisect_left(self.termos, termo + '\uffff', inicio)
+        return set(self.ids[inicio:fim])
+
+    def buscar(self, texto, inicio=0, limite=20):
+        """Devolve ``([(id, rotulo), ...], ha_mais)``; cada palavra precisa casar com algum campo."""
+        self.garantir_carregado()
+        termos = palavras(texto)
+        if not termos:
+            return [], False
+
+        encontrados = self.prefixo(termos[0])
+        for termo in termos[1:]:
+            encontrados &= self.prefixo(termo)
+
+        resultados = sorted((self.rotulos[usuario_id].lower(), usuario_id) for usuario_id in encontrados)
+        pagina = resultados[inicio:inicio + limite]
+        return [(usuario_id, self.rotulos[usuario_id]) for _, usuario_id in pagina], len(resultados) > inicio + limite
+
+
+indice_usuarios = IndiceUsuarios()
@@ -0,0 +1,162 @@
+"""
+Detecção de tickets quase duplicados com MinHash + LSH.
+
+Cada ticket aberto tem uma assinatura MinHash dos shingles de caracteres de
+``titulo``/``descricao``. A assinatura é dividida em bandas e o hash de cada
+banda fica em ``BandaLSH`` (coluna indexada): tickets parecidos compartilham
+ao menos uma banda com alta probabilidade. A busca é um ``IN`` sobre o índice
+seguido da comparação das assinaturas dos poucos candidatos, sem varrer a
+tabela de tickets.
+
+A assinatura usa um único hash por shingle (one permutation hashing): os bits
+baixos escolhem um dos ``NUM_COMPARTIMENTOS`` e cada compartimento guarda o
+menor valor recebido. O custo é linear no texto, limitado a
+``TAMANHO_MAXIMO_TEXTO`` caracteres, e fica abaixo de 1 ms por consulta.
+"""
+import hashlib
+import re
+import unicodedata
+
+from django.db import transaction
+
+from .models import AssinaturaTicket, BandaLSH, Ticket
+
+BITS_COMPARTIMENTO = 6
+NUM_COMPARTIMENTOS = 1 << BITS_COMPARTIMENTO
+# Hash de 56 bits por shingle: com o deslocamento da densificação os valores cabem em um inteiro JSON com sinal
+BYTES_HASH = 7
+BITS_VALOR = BYTES_HASH * 8 - BITS_COMPARTIMENTO
+LINHAS_POR_BANDA = 4  # 16 bandas: pares com similaridade acima de ~0.5 viram candidatos
+TAMANHO_SHINGLE = 5
+# Título e começo da descrição bastam para achar duplicados e mantêm a busca por tecla abaixo de 1 ms
+TAMANHO_MAXIMO_TEXTO = 500
+LIMIAR_SIMILARIDADE = 0.5
+
+# Tickets concluídos ou fechados saem do índice
+STATUS_FORA_DO_INDICE = Ticket.STATUS_ENCERRADOS
+
+
+def hash64(valor):
+    digest = hashlib.blake2b(valor.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r'\W+', ' ', texto).strip()[:TAMANHO_MAXIMO_TEXTO]
+
+
+def shingles(texto):
+    if len(texto) <= TAMANHO_SHINGLE:
+        return {texto} if texto else set()
+    return {texto[i:i + TAMANHO_SHINGLE] for i in range(len(texto) - TAMANHO_SHINGLE + 1)}
+
+
+def minhash(texto):
+    mascara = NUM_COMPARTIMENTOS - 1
+    minimos = [None] * NUM_COMPARTIMENTOS
+    for shingle in shingles(texto):
+        valor = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=BYTES_HASH).digest(), 'big')
+        compartimento, valor = valor & mascara, valor >> BITS_COMPARTIMENTO
+        if minimos[compartimento] is None or valor < minimos[compartimento]:
+            minimos[compartimento] = valor
+    if all(minimo is None for minimo in minimos):
+        return []
+
+    # Compartimento vazio copia o próximo preenchido (densificação por rotação),
+    # deslocado pela distância para não coincidir com o próprio vizinho
+    assinatura = []
+    for inicio in range(NUM_COMPARTIMENTOS):
+        distancia = 0
+        while minimos[(inicio + distancia) % NUM_COMPARTIMENTOS] is None:
+            distancia += 1
+        assinatura.append(minimos[(inicio + distancia) % NUM_COMPARTIMENTOS] + (distancia << BITS_VALOR))
+    return assinatura
+
+
+def chaves_bandas(assinatura):
+    return [
+        hash64(f'{inicio}:{assinatura[inicio:inicio + LINHAS_POR_BANDA]}')
+        for inicio in range(0, len(assinatura), LINHAS_POR_BANDA)
+    ]
+
+
+def similaridade(assinatura_a, assinatura_b):
+    iguais = sum(1 for a, b in zip(assinatura_a, assinatura_b) if a == b)
+    return iguais / NUM_COMPARTIMENTOS
+
+
+def texto_do_ticket(ticket):
+    return normalizar(f'{ticket.titulo or ""} {ticket.descricao or ""}')
+
+
+def indexavel(ticket):
+    return ticket.ativo and ticket.status not in STATUS_FORA_DO_INDICE
+
+
+def objetos_do_indice(ticket, texto):
+    """Assinatura e bandas de um ticket, prontas para ``bulk_create``."""
+    assinatura = minhash(texto)
+    return (
+        AssinaturaTicket(ticket=ticket, minhash=assinatura, texto_hash=hash64(texto)),
+        [BandaLSH(ticket=ticket, chave=chave) for chave in chaves_bandas(assinatura)],
+    )
+
+
+def indexar(ticket, using=None):
+    """Atualiza a entrada do ticket no índice; chamado pelo post_save de ``Ticket``."""
+    using = using or ticket._state.db
+    if not indexavel(ticket):
+        remover(ticket.pk, using)
+        return
+
+    texto = texto_do_ticket(ticket)
+    texto_hash = AssinaturaTicket.objects.using(using).filter(ticket=ticket).values_list('texto_hash', flat=True).first()
+    if texto_hash == hash64(texto):
+        return
+
+    assinatura, bandas = objetos_do_indice(ticket, texto)
+    with transaction.atomic(using=using):
+        remover(ticket.pk, using)
+        assinatura.save(using=using)
+        BandaLSH.objects.using(using).bulk_create(bandas)
+
+
+def remover(ticket_id, using=None):
+    BandaLSH.objects.using(using).filter(ticket_id=ticket_id).delete()
+    AssinaturaTicket.objects.using(using).filter(ticket_id=ticket_id).delete()
+
+
+def buscar_por_assinatura(assinatura, excluir=None, limite=5):
+    if not assinatura:
+        return []
+
+    candidatos = BandaLSH.objects.filter(chave__in=chaves_bandas(assinatura)).values('ticket_id')
+    assinaturas = AssinaturaTicket.objects.filter(ticket_id__in=candidatos).values_list('ticket_id', 'minhash')
+    if excluir is not None:
+        assinaturas = assinaturas.exclude(ticket_id=excluir)
+
+    pontuados = sorted(
+        ((similaridade(assinatura, outra), ticket_id) for ticket_id, outra in assinaturas),
+        reverse=True,
+    )
+    pontuados = [(valor, ticket_id) for valor, ticket_id in pontuados if valor >= LIMIAR_SIMILARIDADE][:limite]
+
+    tickets = Ticket.objects.in_bulk([ticket_id for _, ticket_id in pontuados])
+    return [(tickets[ticket_id], valor) for valor, ticket_id in pontuados if ticket_id in tickets]
+
+
+def buscar(texto, excluir=None, limite=5):
+    """Tickets abertos parecidos com um texto livre (ex.: formulário de criação)."""
+    return buscar_por_assinatura(minhash(normalizar(texto)), excluir, limite)
+
+
+def provaveis_duplicados(ticket, limite=5):
+    # Ticket encerrado não está no índice e não tem duplicados a resolver
+    if not indexavel(ticket):
+        return []
+    assinatura = AssinaturaTicket.objects.filter(ticket=ticket).values_list('minhash', flat=True).first()
+    if assinatura is None:
+        assinatura = minhash(texto_do_ticket(ticket))
+    return buscar_por_assinatura(assinatura, excluir=ticket.pk, limite=limite)
@@ -0,0 +1,123 @@
+"""
+Filtros combináveis do dashboard e contagens por faceta.
+
+Cada dimensão (status, tipo, subtipo, prioridade, técnico, nível) é contada
+com um único ``GROUP BY`` sobre os tickets filtrados pelas outras dimensões:
+o valor selecionado em uma faceta não esconde as alternativas dela. As
+contagens de cada combinação de filtros ficam ``FACETAS_TTL`` segundos no
+cache, então paginar ou voltar ao dashboard não refaz as agregações.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .busca_usuarios import rotulo
+from .models import Ticket
+
+DIMENSOES = ['status', 'tipo', 'subtipo', 'prioridade', 'tecnico', 'nivel_atendimento']
+ROTULOS = {
+    'status': 'Status', 'tipo': 'Tipo', 'subtipo': 'Subtipo', 'prioridade': 'Prioridade',
+    'tecnico': 'Técnico', 'nivel_atendimento': 'Nível',
+}
+TODOS = 'T'
+
+
+def data_ou_none(valor):
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
+
+
+class FiltroTickets:
+    """Filtros ativos lidos da querystring; ``status=T`` (todos) equivale a não filtrar."""
+
+    def __init__(self, params):
+        self.valores = {}
+        for campo in DIMENSOES:
+            valor = params.get(campo, '').strip()
+            if not valor or valor == TODOS or (campo == 'tecnico' and not valor.isdigit()):
+                continue
+            self.valores[campo] = valor
+        self.de = data_ou_none(params.get('de'))
+        self.ate = data_ou_none(params.get('ate'))
+
+    @property
+    def status(self):
+        return self.valores.get('status', TODOS)
+
+    def aplicar(self, queryset, exceto=None):
+        filtros = {campo: valor for campo, valor in self.valores.items() if campo != exceto}
+        # Intervalo sobre o datetime (usa o índice), no fuso do projeto
+        if self.de:
+            filtros['criado_em__gte'] = timezone.make_aware(datetime.combine(self.de, time.min))
+        if self.ate:
+            filtros['criado_em__lt'] = timezone.make_aware(datetime.combine(self.ate + timedelta(days=1), time.min))
+        return queryset.filter(**filtros)
+
+    def params(self, exceto=None):
+        params = [(campo, valor) for campo, valor in self.valores.items() if campo != exceto]
+        params += [(nome, data.isoformat()) for nome, data in (('de', self.de), ('ate', self.ate)) if data]
+        return params
+
+    @property
+    def params_sem_status(self):
+        # Campos ocultos do seletor de status, que mantém os demais filtros
+        return self.params(exceto='status')
+
+    @property
+    def pagination_params(self):
+        return '&' + urlencode([('status', self.status), *self.params_sem_status])
+
+    def chave(self):
+        return 'facetas:' + hashlib.md5(urlencode(sorted(self.params())).encode()).hexdigest()
+
+
+def contagens(filtro):
+    """{dimensão: [(valor, rótulo, total), ...]} para a combinação de filtros, com cache curto."""
+    return cache.get_or_set(filtro.chave(), lambda: calcular(filtro), getattr(settings, 'FACETAS_TTL', 30))
+
+
+def calcular(filtro):
+    facetas = {}
+    for campo in DIMENSOES:
+        tickets = filtro.aplicar(Ticket.objects.all(), exceto=campo).exclude(**{f'{campo}__isnull': True})
+        if campo != 'tecnico':
+            tickets = tickets.exclude(**{campo: ''})
+        facetas[campo] = list(tickets.values_list(campo).annotate(total=Count('pk')).order_by(campo))
+
+    rotulos = {campo: dict(Ticket._meta.get_field(campo).choices or []) for campo in DIMENSOES if campo != 'tecnico'}
+    tecnicos = get_user_model().objects.only('username', 'first_name', 'last_name').in_bulk(
+        [valor for valor, _ in facetas['tecnico']]
+    )
+    rotulos['tecnico'] = {pk: rotulo(usuario) for pk, usuario in tecnicos.items()}
+
+    return {
+        campo: [(str(valor), str(rotulos[campo].get(valor, valor)), total) for valor, total in linhas]
+        for campo, linhas in facetas.items()
+    }
+
+
+def contexto(filtro):
+    """Variáveis do dashboard: opções de status com totais, painel de facetas e paginação."""
+    contagem = contagens(filtro)
+    totais_status = {valor: total for valor, _, total in contagem['status']}
+    return {
+        'filtro': filtro,
+        'selected_status': filtro.status,
+        'status_filtro': [(TODOS, f'Todos ({sum(totais_status.values())})')] + [
+            (valor, f'{texto} ({totais_status.get(valor, 0)})') for valor, texto in Ticket.STATUS_CHOICES
+        ],
+        'facetas': [
+            (campo, ROTULOS[campo], filtro.valores.get(campo, ''), contagem[campo])
+            for campo in DIMENSOES if campo != 'status'
+        ],
+        'pagination_params': filtro.pagination_params,
+    }
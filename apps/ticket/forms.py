@@ -1,9 +1,52 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.urls import reverse_lazy
 
+from .busca_usuarios import rotulo
 from .models import Ticket, DadoAnalise, CustomUser
 
 
+class SelectUsuarioRemoto(forms.Select):
+    """
+    Select2 com dados remotos: a página leva só a opção selecionada e as
+    demais vêm da busca em ``ticket:buscar_usuarios`` conforme o usuário digita.
+    """
+
+    def __init__(self, attrs=None):
+        padrao = {
+            'class': 'form-select form-select-sm form-select-solid',
+            'data-control': 'select2',
+            'data-ajax--url': reverse_lazy('ticket:buscar_usuarios'),
+            'data-ajax--delay': '250',
+            'data-minimum-input-length': '1',
+            'data-allow-clear': 'true',
+            'data-placeholder': 'Digite para buscar',
+        }
+        super().__init__({**padrao, **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        selecionados = [valor for valor in value if valor]
+        todas = self.choices
+        if hasattr(todas, 'queryset'):
+            opcoes = [todas.choice(obj) for obj in todas.queryset.filter(pk__in=selecionados)] if selecionados else []
+        else:
+            opcoes = [(valor, texto) for valor, texto in todas if valor and str(valor) in selecionados]
+
+        self.choices = [('', '')] + opcoes
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
+
+
+class UsuarioRemotoMixin:
+    """Rótulo do técnico igual ao devolvido pela busca."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['tecnico'].label_from_instance = rotulo
+
+
 class CustomAuthenticationForm(AuthenticationForm):
     username = forms.CharField(widget=forms.TextInput(attrs={
         'class': 'form-control',
@@ -19,7 +62,11 @@ class CustomAuthenticationForm(AuthenticationForm):
         fields = ['username', 'password']
 
 
-class TicketStatusForm(forms.ModelForm):
+class TicketStatusForm(UsuarioRemotoMixin, forms.ModelForm):
+    # Levam o valor exibido na página em um input oculto (initial-*): se outra
+    # pessoa gravou o ticket no meio, só os campos que este usuário mudou são aplicados
+    CAMPOS_MESCLAVEIS = ['status', 'prioridade', 'nivel_atendimento', 'tecnico']
+
     class Meta:
         model = Ticket
 
@@ -51,13 +98,20 @@ class TicketStatusForm(forms.ModelForm):
                 'data-hide-search': 'true',
                 'data-control': 'select2',
             }),
-            'tecnico': forms.Select(attrs={
-                'class': 'form-select form-select-sm form-select-solid',
-                'data-hide-search': 'true',
-                'data-control': 'select2',
-            }),
+            'tecnico': SelectUsuarioRemoto(),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo in self.CAMPOS_MESCLAVEIS:
+            self.fields[campo].show_hidden_initial = True
+
+    def valor_exibido(self, campo):
+        """Valor do campo quando a página foi renderizada (input oculto initial-*)."""
+        field = self.fields[campo]
+        valor = field.hidden_widget().value_from_datadict(self.data, self.files, self[campo].html_initial_name)
+        return field.to_python(valor)
+
     def clean_status(self):
         status = self.cleaned_data.get('status')
         if not status:
@@ -77,7 +131,10 @@ class DadoAnaliseForm(forms.ModelForm):
         fields = ['data_inicio', 'data_conclusao', 'texto', 'numero']
 
 
-class TicketForm(forms.ModelForm):
+class TicketForm(UsuarioRemotoMixin, forms.ModelForm):
     class Meta:
         model = Ticket
-        fields = ['descricao', 'anexo', 'tipo', 'subtipo', 'tecnico'] 
+        fields = ['descricao', 'anexo', 'tipo', 'subtipo', 'tecnico']
+        widgets = {
+            'tecnico': SelectUsuarioRemoto(),
+        }
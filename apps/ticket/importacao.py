@@ -0,0 +1,382 @@
+"""
+Importação em lote de tickets a partir de CSV e de e-mails (.eml / maildir).
+
+Os arquivos são lidos de forma incremental e os registros gravados em lotes
+com ``bulk_create``, um lote por transação. Cada ticket e mensagem importado
+guarda a chave do sistema de origem em ``origem``; registros já importados são
+ignorados, então uma importação interrompida pode simplesmente ser repetida.
+
+Colunas do CSV (só ``origem`` e ``descricao`` são obrigatórias; linhas sem
+elas, com data inválida ou com anexo inexistente são relatadas e puladas)::
+
+    origem, titulo, descricao, tipo, subtipo, status, prioridade,
+    usuario, tecnico, criado_em, anexo, responde_a
+
+``usuario``/``tecnico`` aceitam username ou e-mail; ``anexo`` é um caminho
+relativo ao CSV; linhas com ``responde_a`` (origem de outro ticket) viram
+mensagens desse ticket. Nos e-mails, respostas (In-Reply-To/References) a um
+ticket já conhecido viram mensagens; as demais abrem um ticket novo.
+"""
+import csv
+import email
+import io
+import os
+from email import policy
+from functools import partial
+from email.utils import parseaddr, parsedate_to_datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import File
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import duplicados
+from .models import AssinaturaTicket, BandaLSH, HistoricoTicket, LeituraTicket, Mensagem, Ticket
+from .triagem import triagem
+
+LOTE_PADRAO = 500
+COLUNAS_OBRIGATORIAS = ('origem', 'descricao')
+
+
+class ArquivoInvalido(Exception):
+    """O arquivo inteiro não pode ser importado (ex.: falta uma coluna obrigatória)."""
+
+
+def invalido(arquivo, posicao, motivo):
+    # Registro pulado pelo importador e relatado em ``Importador.erros``
+    return {'invalido': f'{arquivo}:{posicao}: {motivo}'}
+
+
+def ler_csv(caminho):
+    base = os.path.dirname(os.path.abspath(caminho))
+    nome = os.path.basename(caminho)
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        leitor = csv.DictReader(arquivo)
+        faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in (leitor.fieldnames or [])]
+        if faltando:
+            raise ArquivoInvalido(f'{nome}: colunas obrigatórias ausentes: {", ".join(faltando)}')
+
+        for linha in leitor:
+            linha = {campo: (valor or '').strip() for campo, valor in linha.items() if campo}
+            vazias = [coluna for coluna in COLUNAS_OBRIGATORIAS if not linha.get(coluna)]
+            if vazias:
+                yield invalido(nome, leitor.line_num, f'{", ".join(vazias)} em branco')
+                continue
+            try:
+                criado_em = ler_data(linha.get('criado_em'), parse_datetime)
+                anexo = None
+                if linha.get('anexo'):
+                    caminho_anexo = os.path.join(base, linha['anexo'])
+                    if not os.path.isfile(caminho_anexo):
+                        raise FileNotFoundError(f'anexo não encontrado: {linha["anexo"]}')
+                    anexo = (os.path.basename(linha['anexo']), partial(open, caminho_anexo, 'rb'))
+            except (ValueError, OSError) as erro:
+                yield invalido(nome, leitor.line_num, erro)
+                continue
+
+            yield {
+                'origem': f'csv:{linha["origem"]}',
+                'arquivo': nome,
+                'referencias': [f'csv:{linha["responde_a"]}'] if linha.get('responde_a') else [],
+                'resposta_obrigatoria': bool(linha.get('responde_a')),
+                'titulo': linha.get('titulo', ''),
+                'descricao': linha.get('descricao', ''),
+                'tipo': linha.get('tipo') or 'Importado',
+                'subtipo': linha.get('subtipo') or None,
+                'status': linha.get('status', ''),
+                'prioridade': linha.get('prioridade', ''),
+                'usuario': linha.get('usuario', ''),
+                'tecnico': linha.get('tecnico', ''),
+                'criado_em': criado_em,
+                'anexo': anexo,
+            }
+
+
+def ler_eml(caminho):
+    with open(caminho, 'rb') as arquivo:
+        mensagem = email.message_from_binary_file(arquivo, policy=policy.default)
+
+    message_id = (mensagem['Message-ID'] or '').strip() or os.path.basename(caminho)
+    referencias = f'{mensagem["In-Reply-To"] or ""} {mensagem["References"] or ""}'.split()
+    corpo = mensagem.get_body(preferencelist=('plain', 'html'))
+    anexo = next(iter(mensagem.iter_attachments()), None)
+    try:
+        criado_em = ler_data(str(mensagem['Date'] or ''), parsedate_to_datetime)
+    except ValueError as erro:
+        yield invalido(os.path.basename(caminho), message_id, erro)
+        return
+
+    yield {
+        'origem': f'eml:{message_id}',
+        'arquivo': os.path.basename(caminho),
+        'referencias': [f'eml:{referencia}' for referencia in referencias],
+        'resposta_obrigatoria': False,
+        'titulo': str(mensagem['Subject'] or ''),
+        'descricao': corpo.get_content().strip() if corpo is not None else '',
+        'tipo': 'E-mail',
+        'subtipo': None,
+        'status': '',
+        'prioridade': '',
+        'usuario': parseaddr(str(mensagem['From'] or ''))[1],
+        'tecnico': '',
+        'criado_em': criado_em,
+        'anexo': (nome_do_anexo(anexo), partial(abrir_anexo_eml, caminho)) if anexo is not None else None,
+    }
+
+
+def nome_do_anexo(anexo):
+    if anexo.get_filename():
+        return anexo.get_filename()
+    return 'anexo.eml' if anexo.get_content_type() == 'message/rfc822' else 'anexo'
+
+
+def abrir_anexo_eml(caminho):
+    """Primeiro anexo de um .eml, relido do arquivo só na hora de gravar."""
+    with open(caminho, 'rb') as arquivo:
+        mensagem = email.message_from_binary_file(arquivo, policy=policy.default)
+    anexo = next(mensagem.iter_attachments())
+    if anexo.is_multipart():
+        # message/rfc822 (e-mail encaminhado como anexo): o conteúdo é a mensagem, gravada como .eml
+        return io.BytesIO(anexo.get_payload(0).as_bytes())
+    return io.BytesIO(anexo.get_payload(decode=True))
+
+
+def ler_origem(caminho):
+    """Registros de um CSV, de um .eml ou de um diretório (maildir) em ordem de nome."""
+    if os.path.isdir(caminho):
+        for raiz, diretorios, arquivos in os.walk(caminho):
+            diretorios.sort()
+            for nome in sorted(arquivos):
+                if nome.startswith('.') or nome.endswith('.csv'):
+                    continue
+                yield from ler_eml(os.path.join(raiz, nome))
+    elif caminho.lower().endswith('.csv'):
+        yield from ler_csv(caminho)
+    else:
+        yield from ler_eml(caminho)
+
+
+def ler_data(texto, converter):
+    """Data aware a partir do texto; vazio é None, formato inválido levanta ValueError."""
+    if not texto:
+        return None
+    data = converter(texto)
+    if data is None:
+        raise ValueError(f'data inválida: "{texto}"')
+    if timezone.is_naive(data):
+        return timezone.make_aware(data)
+    return data
+
+
+def chave_de_choice(choices, valor, padrao):
+    """Aceita a chave (``EA``) ou o nome exibido (``Em Análise``)."""
+    for chave, nome in choices:
+        if valor.lower() in (chave.lower(), nome.lower()):
+            return chave
+    return padrao
+
+
+class ResolvedorUsuarios:
+    """Username ou e-mail para id de usuário, com cache e uma consulta por lote."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def carregar(self, identificadores):
+        faltando = {identificador.lower() for identificador in identificadores if identificador} - set(self.cache)
+        if not faltando:
+            return
+        usuarios = get_user_model().objects.annotate(
+            username_minusculo=Lower('username'), email_minusculo=Lower('email')
+        ).filter(Q(username_minusculo__in=faltando) | Q(email_minusculo__in=faltando))
+        for usuario in usuarios.only('pk', 'username', 'email'):
+            self.cache.setdefault(usuario.username.lower(), usuario.pk)
+            if usuario.email:
+                self.cache.setdefault(usuario.email.lower(), usuario.pk)
+        for identificador in faltando:
+            self.cache.setdefault(identificador, None)
+
+    def __call__(self, identificador):
+        return self.cache.get((identificador or '').lower())
+
+
+class Importador:
+    """
+    Serviço de importação: ``Importador(usuario_padrao).importar(registros)``.
+
+    ``usuario_padrao`` assina o histórico e as mensagens cujo autor não existe
+    no cadastro. ``progresso`` recebe o dicionário de totais após cada lote.
+    """
+
+    def __init__(self, usuario_padrao, lote=LOTE_PADRAO, progresso=None):
+        self.usuario_padrao = usuario_padrao
+        self.lote = lote
+        self.progresso = progresso
+        self.usuarios = ResolvedorUsuarios()
+        self.totais = {'lidos': 0, 'tickets': 0, 'mensagens': 0, 'ja_importados': 0, 'sem_ticket': 0, 'invalidos': 0}
+        self.erros = []
+        # Anexos gravados no armazenamento pelo lote atual, apagados se a transação falhar
+        self.anexos_gravados = []
+
+    def importar(self, registros):
+        registros = iter(registros)
+        while True:
+            lote = list(islice(registros, self.lote))
+            if not lote:
+                return self.totais
+            self.importar_lote(lote)
+            if self.progresso is not None:
+                self.progresso(dict(self.totais))
+
+    def importar_lote(self, lote):
+        self.totais['lidos'] += len(lote)
+        for registro in lote:
+            if 'invalido' in registro:
+                self.totais['invalidos'] += 1
+                self.erros.append(registro['invalido'])
+        lote = [registro for registro in lote if 'invalido' not in registro]
+
+        origens = [registro['origem'] for registro in lote]
+        existentes = set(Ticket.objects.filter(origem__in=origens).values_list('origem', flat=True))
+        existentes |= set(Mensagem.objects.filter(origem__in=origens).values_list('origem', flat=True))
+        vistos = set()
+        novos = []
+        for registro in lote:
+            if registro['origem'] in existentes or registro['origem'] in vistos:
+                self.totais['ja_importados'] += 1
+                continue
+            vistos.add(registro['origem'])
+            novos.append(registro)
+
+        self.usuarios.carregar(
+            identificador for registro in novos for identificador in (registro['usuario'], registro['tecnico'])
+        )
+
+        # Ticket de destino de cada origem conhecida: ('id', pk) se já está no banco,
+        # ('novo', origem) se o ticket será criado neste lote
+        destinos = {}
+        referencias = {referencia for registro in novos for referencia in registro['referencias']}
+        for origem, pk in Ticket.objects.filter(origem__in=referencias).values_list('origem', 'pk'):
+            destinos[origem] = ('id', pk)
+        for origem, pk in Mensagem.objects.filter(origem__in=referencias).values_list('origem', 'ticket_id'):
+            destinos[origem] = ('id', pk)
+
+        self.anexos_gravados = []
+        try:
+            tickets, mensagens = [], []
+            for registro in novos:
+                destino = next((destinos[referencia] for referencia in registro['referencias'] if referencia in destinos), None)
+                if destino is not None:
+                    mensagens.append((registro, destino))
+                    destinos[registro['origem']] = destino
+                elif registro['resposta_obrigatoria']:
+                    self.totais['sem_ticket'] += 1
+                else:
+                    tickets.append(self.novo_ticket(registro))
+                    destinos[registro['origem']] = ('novo', registro['origem'])
+
+            with transaction.atomic():
+                ids = self.gravar_tickets(tickets)
+                self.gravar_mensagens(mensagens, ids)
+        except BaseException:
+            # Lote desfeito: os anexos já gravados ficariam órfãos (e duplicados na retomada)
+            for campo in self.anexos_gravados:
+                campo.storage.delete(campo.name)
+            raise
+
+    def gravar_anexo(self, campo, anexo):
+        # Os registros do lote levam só o nome e como abrir o anexo; o conteúdo é lido aqui
+        nome, abrir = anexo
+        with abrir() as conteudo:
+            campo.save(nome, File(conteudo), save=False)
+        self.anexos_gravados.append(campo)
+
+    def novo_ticket(self, registro):
+        usuario_id = self.usuarios(registro['usuario']) or self.usuario_padrao.pk
+        status = chave_de_choice(Ticket.STATUS_CHOICES, registro['status'], 'A')
+        ticket = Ticket(
+            origem=registro['origem'],
+            nome=(registro['usuario'] or self.usuario_padrao.get_username())[:100],
+            titulo=registro['titulo'][:200],
+            descricao=registro['descricao'],
+            tipo=registro['tipo'][:50],
+            subtipo=registro['subtipo'],
+            status=status,
+            prioridade=chave_de_choice(Ticket.PRIORIDADE_CHOICES, registro['prioridade'], 'N'),
+            usuario_id=usuario_id,
+            tecnico_id=self.usuarios(registro['tecnico']),
+            ativo=status not in Ticket.STATUS_ENCERRADOS,
+        )
+        ticket.importado_em = registro['criado_em']
+        ticket.arquivo_origem = registro['arquivo']
+        if registro['anexo'] is not None:
+            self.gravar_anexo(ticket.anexo, registro['anexo'])
+            ticket.url = ticket.anexo.name
+        return ticket
+
+    def gravar_tickets(self, tickets):
+        if not tickets:
+            return {}
+        Ticket.objects.bulk_create(tickets)
+        # Nem todo banco devolve os ids do bulk_create; a origem é a chave de volta
+        ids = dict(Ticket.objects.filter(origem__in=[ticket.origem for ticket in tickets]).values_list('origem', 'pk'))
+        for ticket in tickets:
+            ticket.pk = ids[ticket.origem]
+
+        # auto_now/auto_now_add sobrescrevem as datas no insert; a data original volta em seguida
+        datados = [ticket for ticket in tickets if ticket.importado_em is not None]
+        for ticket in datados:
+            ticket.criado_em = ticket.atualizado_em = ticket.importado_em
+        Ticket.objects.bulk_update(datados, ['criado_em', 'atualizado_em'])
+
+        HistoricoTicket.objects.bulk_create([
+            ticket.novo_historico(self.usuario_padrao, HistoricoTicket.IMPORTACAO, mensagem=ticket.arquivo_origem)
+            for ticket in tickets
+        ])
+        LeituraTicket.objects.bulk_create([
+            LeituraTicket(usuario_id=usuario_id, ticket_id=ticket.pk)
+            for ticket in tickets
+            for usuario_id in {ticket.usuario_id, ticket.tecnico_id} - {None}
+        ], ignore_conflicts=True)
+
+        # Índices mantidos pelos signals de post_save, que o bulk_create não dispara
+        indexados = [
+            duplicados.objetos_do_indice(ticket, duplicados.texto_do_ticket(ticket))
+            for ticket in tickets if duplicados.indexavel(ticket)
+        ]
+        AssinaturaTicket.objects.bulk_create([assinatura for assinatura, _ in indexados])
+        BandaLSH.objects.bulk_create([banda for _, bandas in indexados for banda in bandas])
+        transaction.on_commit(lambda: [triagem.atualizar(ticket) for ticket in tickets])
+
+        self.totais['tickets'] += len(tickets)
+        return ids
+
+    def gravar_mensagens(self, mensagens, ids):
+        if not mensagens:
+            return
+        objetos = []
+        for registro, (tipo, valor) in mensagens:
+            mensagem = Mensagem(
+                origem=registro['origem'],
+                ticket_id=valor if tipo == 'id' else ids[valor],
+                autor_id=self.usuarios(registro['usuario']) or self.usuario_padrao.pk,
+                texto=registro['descricao'],
+            )
+            mensagem.importado_em = registro['criado_em']
+            if registro['anexo'] is not None:
+                self.gravar_anexo(mensagem.anexo, registro['anexo'])
+            objetos.append(mensagem)
+
+        Mensagem.objects.bulk_create(objetos)
+        datadas = {mensagem.origem: mensagem.importado_em for mensagem in objetos if mensagem.importado_em is not None}
+        if datadas:
+            gravadas = list(Mensagem.objects.filter(origem__in=datadas).only('pk', 'origem'))
+            for mensagem in gravadas:
+                mensagem.criado_em = datadas[mensagem.origem]
+            Mensagem.objects.bulk_update(gravadas, ['criado_em'])
+
+        self.totais['mensagens'] += len(objetos)
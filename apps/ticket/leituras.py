@@ -0,0 +1,165 @@
+"""
+Estado de leitura dos tickets por participante.
+
+Abrir um ticket não grava nada na hora: a leitura entra em um buffer em
+memória, que agrupa leituras repetidas do mesmo usuário/ticket e é gravado em
+lote quando atinge ``LEITURAS_LOTE`` entradas ou, por uma thread temporizadora,
+``LEITURAS_INTERVALO`` segundos depois da primeira leitura pendente (e na saída
+do processo), sempre em um único UPDATE. O buffer é de cada worker: no
+próprio worker as consultas de não lidos o aplicam em memória, sem escrita
+(a leitura continua podendo ir para a réplica); em outro worker, a caixa de
+não lidos mostra a leitura com no máximo esse atraso, que também é o que se
+perde se o processo for morto sem encerrar.
+Atividades (mensagens, mudanças de status, conclusão) marcam os demais
+participantes como não lidos com um único UPDATE.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import LeituraTicket, Ticket
+
+
+class BufferLeituras:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pendentes = {}
+        self.desde = None
+        self.temporizador = None
+
+    def marcar_vista(self, usuario_id, ticket_id, mensagem_id=None):
+        with self.lock:
+            anterior = self.pendentes.get((usuario_id, ticket_id), (0, None))[0]
+            self.pendentes[(usuario_id, ticket_id)] = (max(anterior, mensagem_id or 0), timezone.now())
+            if self.desde is None:
+                self.desde = time.monotonic()
+                self.agendar()
+            cheio = len(self.pendentes) >= getattr(settings, 'LEITURAS_LOTE', 200)
+        if cheio:
+            self.descarregar()
+
+    def agendar(self):
+        # Com o lock: grava o lote mesmo que o worker não receba outra requisição
+        if self.temporizador is not None:
+            return
+        self.temporizador = threading.Timer(getattr(settings, 'LEITURAS_INTERVALO', 5), self.descarregar_agendado)
+        self.temporizador.daemon = True
+        self.temporizador.start()
+
+    def descarregar_agendado(self):
+        with self.lock:
+            self.temporizador = None
+        try:
+            self.descarregar()
+        finally:
+            # Conexões abertas por esta thread não são reaproveitadas
+            connections.close_all()
+
+    def vistas(self, usuario_id):
+        """Leituras do usuário ainda no buffer: ``{ticket_id: vista_em}``."""
+        with self.lock:
+            return {ticket: vista_em for (usuario, ticket), (_, vista_em) in self.pendentes.items() if usuario == usuario_id}
+
+    def descarregar(self):
+        with self.lock:
+            pendentes, self.pendentes, self.desde = self.pendentes, {}, None
+        if not pendentes:
+            return
+
+        # Tickets ou usuários removidos depois da leitura são descartados; a
+        # conferência é feita no banco que vai receber a escrita
+        alias = router.db_for_write(LeituraTicket)
+        tickets = set(Ticket.objects.using(alias).filter(
+            pk__in={ticket for _, ticket in pendentes}
+        ).values_list('pk', flat=True))
+        usuarios = set(get_user_model().objects.using(alias).filter(
+            pk__in={usuario for usuario, _ in pendentes}
+        ).values_list('pk', flat=True))
+        pendentes = {
+            (usuario, ticket): leitura for (usuario, ticket), leitura in pendentes.items()
+            if usuario in usuarios and ticket in tickets
+        }
+
+        if not pendentes:
+            return
+
+        with transaction.atomic(using=alias):
+            LeituraTicket.objects.using(alias).bulk_create(
+                [LeituraTicket(usuario_id=usuario, ticket_id=ticket) for usuario, ticket in pendentes],
+                ignore_conflicts=True,
+            )
+            chaves = {
+                (usuario, ticket): pk for pk, usuario, ticket in LeituraTicket.objects.using(alias).filter(
+                    usuario_id__in={usuario for usuario, _ in pendentes}, ticket_id__in={ticket for _, ticket in pendentes},
+                ).values_list('pk', 'usuario_id', 'ticket_id')
+                if (usuario, ticket) in pendentes
+            }
+            # Um único UPDATE para o lote; atividade posterior à leitura continua pendente
+            LeituraTicket.objects.using(alias).filter(pk__in=chaves.values()).update(
+                ultima_mensagem_vista=Greatest(F('ultima_mensagem_vista'), Case(*(
+                    When(pk=pk, then=Value(pendentes[par][0])) for par, pk in chaves.items()
+                ))),
+                nao_lida=Case(*(
+                    When(Q(pk=pk) & (Q(marcada_em__isnull=True) | Q(marcada_em__lte=pendentes[par][1])), then=Value(False))
+                    for par, pk in chaves.items()
+                ), default=F('nao_lida')),
+            )
+
+
+leituras = BufferLeituras()
+atexit.register(leituras.descarregar)
+
+
+def registrar_atividade(ticket, autor, mensagem_id=None):
+    """Marca o ticket como não lido para todos os participantes, exceto o autor."""
+    participantes = {ticket.usuario_id, ticket.tecnico_id} - {None}
+    LeituraTicket.objects.bulk_create(
+        [LeituraTicket(usuario_id=usuario, ticket=ticket) for usuario in participantes],
+        ignore_conflicts=True,
+    )
+    LeituraTicket.objects.filter(ticket=ticket).exclude(usuario=autor).update(
+        nao_lida=True, marcada_em=timezone.now()
+    )
+    leituras.marcar_vista(autor.pk, ticket.pk, mensagem_id)
+
+
+def lida_no_buffer(vistas, ticket_id, marcada_em):
+    # Mesma regra de ``descarregar``: a leitura vale se não houve atividade depois dela
+    vista_em = vistas.get(ticket_id)
+    return vista_em is not None and (marcada_em is None or marcada_em <= vista_em)
+
+
+def nao_lidos(usuario):
+    """
+    Tickets com atividade não vista pelo usuário (caixa de não lidos). As
+    leituras ainda no buffer são aplicadas em memória: a consulta não grava
+    nada e continua podendo ir para a réplica.
+    """
+    tickets = Ticket.objects.filter(leituras__usuario=usuario, leituras__nao_lida=True)
+    vistas = leituras.vistas(usuario.pk)
+    if vistas:
+        marcadas = LeituraTicket.objects.filter(
+            usuario=usuario, nao_lida=True, ticket_id__in=vistas
+        ).values_list('ticket_id', 'marcada_em')
+        tickets = tickets.exclude(pk__in=[
+            ticket for ticket, marcada_em in marcadas if lida_no_buffer(vistas, ticket, marcada_em)
+        ])
+    return tickets
+
+
+def marcar_nao_lidos(tickets, usuario):
+    vistas = leituras.vistas(usuario.pk)
+    marcadas = LeituraTicket.objects.filter(
+        usuario=usuario, nao_lida=True, ticket_id__in=[ticket.pk for ticket in tickets]
+    ).values_list('ticket_id', 'marcada_em')
+    ids = {ticket for ticket, marcada_em in marcadas if not lida_no_buffer(vistas, ticket, marcada_em)}
+    for ticket in tickets:
+        ticket.nao_lido = ticket.pk in ids
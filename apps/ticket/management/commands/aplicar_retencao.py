@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ticket.retencao import POLITICAS, Retencao
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica as políticas de RETENCAO_DIAS (sessões expiradas, histórico, tickets encerrados, webhooks entregues) em lotes '
+        'pequenos e remove anexos órfãos, relatando linhas e bytes recuperados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--politica', action='append', choices=[*POLITICAS, 'arquivos'],
+                            help='executa apenas as políticas informadas (repetível)')
+        parser.add_argument('--dias', type=int,
+                            help='sobrepõe os dias configurados das políticas informadas (exige --politica)')
+        parser.add_argument('--lote', type=int, help='linhas apagadas por transação (padrão RETENCAO_LOTE)')
+        parser.add_argument('--pausa', type=float, help='segundos entre lotes (padrão RETENCAO_PAUSA)')
+        parser.add_argument('--simular', action='store_true', help='só conta o que seria apagado')
+
+    def handle(self, *args, **options):
+        configuradas = getattr(settings, 'RETENCAO_DIAS', {})
+        desconhecidas = set(configuradas) - set(POLITICAS)
+        if desconhecidas:
+            raise CommandError(f'Políticas desconhecidas em RETENCAO_DIAS: {", ".join(sorted(desconhecidas))}')
+
+        # Um único --dias para todas as políticas apagaria tickets com a idade pensada para sessões
+        if options['dias'] is not None and not options['politica']:
+            raise CommandError('--dias exige --politica: informe a quais políticas a idade se aplica.')
+
+        escolhidas = options['politica'] or [*POLITICAS, 'arquivos']
+        progresso = (lambda mensagem: self.stdout.write(mensagem)) if options['verbosity'] > 1 else None
+        retencao = Retencao(options['lote'], options['pausa'], options['simular'], progresso)
+
+        for nome in POLITICAS:
+            if nome not in escolhidas:
+                continue
+            dias = options['dias'] if options['dias'] is not None else configuradas.get(nome)
+            if dias is None:
+                self.stdout.write(f'{nome}: desligada')
+                continue
+            retencao.aplicar(nome, dias)
+
+        # Por último: pega também os anexos dos tickets recém-apagados
+        if 'arquivos' in escolhidas:
+            retencao.limpar_arquivos()
+
+        verbo = 'seriam apagadas' if options['simular'] else 'apagadas'
+        for rotulo, quantidade in sorted(retencao.linhas.items()):
+            self.stdout.write(f'{rotulo}: {quantidade} linhas {verbo}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(retencao.linhas.values())} linhas {verbo}; {retencao.arquivos} anexos órfãos, '
+            f'{retencao.bytes / 1024:.0f} KB'
+        ))
@@ -0,0 +1,99 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import AuthenticationForm
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.base import Template
+from django.test import RequestFactory
+from django.urls import reverse
+
+from apps.base.precompilacao import nomes_templates
+from apps.ticket import duplicados, facetas
+from apps.ticket.forms import TicketStatusForm
+from apps.ticket.models import HistoricoTicket, Mensagem, Ticket
+from apps.ticket.views import TicketDetailView, marcar_recentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede, para cada template e parcial do projeto, o tempo de compilação (o que o loader em cache '
+        'economiza) e o de renderização com dados reais de dashboard e detalhe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='username do request (padrão: o primeiro staff)')
+        parser.add_argument('--ticket', type=int, help='ticket usado no contexto (padrão: o mais recente)')
+        parser.add_argument('--repeticoes', type=int, default=200)
+        parser.add_argument('--prefixo', default='', help='mede só os templates com este prefixo, ex.: ticket/partials/')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        usuarios = User.objects.filter(username=options['usuario']) if options['usuario'] else User.objects.filter(is_staff=True)
+        usuario = usuarios.order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Nenhum usuário encontrado para o request do benchmark.')
+
+        tickets = Ticket.objects.select_related('usuario', 'tecnico')
+        ticket = tickets.filter(pk=options['ticket']).first() if options['ticket'] else tickets.order_by('-pk').first()
+        if ticket is None:
+            raise CommandError('Nenhum ticket cadastrado para o contexto do benchmark.')
+
+        request = RequestFactory().get(reverse('ticket:dashboard'))
+        request.user = usuario
+        contexto = self.contexto(ticket, usuario)
+        engine = engines['django']
+        repeticoes = options['repeticoes']
+
+        resultados = []
+        for nome in nomes_templates():
+            if not nome.startswith(options['prefixo']):
+                continue
+            template = engine.get_template(nome)
+            origem = template.template.origin
+            fonte = origem.loader.get_contents(origem)
+            contexto_template = dict(contexto, form=AuthenticationForm(request)) if 'login' in nome else contexto
+
+            compilar = medir(lambda: Template(fonte, origem, nome, engine.engine), repeticoes)
+            try:
+                renderizar = medir(lambda: template.render(contexto_template, request), repeticoes)
+            except Exception as erro:
+                self.stderr.write(f'{nome}: {erro.__class__.__name__}: {erro}')
+                continue
+            resultados.append((renderizar, compilar, nome))
+
+        self.stdout.write(f'{repeticoes} repetições por template, ticket #{ticket.pk}, usuário {usuario.username}')
+        self.stdout.write(f'{"template":<58}{"compilar ms":>12}{"renderizar ms":>15}')
+        for renderizar, compilar, nome in sorted(resultados, reverse=True):
+            self.stdout.write(f'{nome:<58}{compilar * 1000:>12.3f}{renderizar * 1000:>15.3f}')
+
+    def contexto(self, ticket, usuario):
+        # Contexto das páginas reais: detalhe (ticket, histórico, mensagens) e dashboard (página de tickets)
+        mensagens = list(Mensagem.objects.filter(ticket=ticket).select_related('autor').order_by('criado_em'))
+        historico_list = list(HistoricoTicket.objects.filter(ticket=ticket).order_by('data_criacao'))
+        contexto = TicketDetailView().get_context_data(ticket, TicketStatusForm(instance=ticket), historico_list, mensagens)
+        contexto['duplicados'] = duplicados.provaveis_duplicados(ticket)
+
+        paginator = Paginator(Ticket.objects.select_related('usuario', 'tecnico').order_by('-criado_em'), 6)
+        page_obj = paginator.get_page(1)
+        page_obj.object_list = list(page_obj.object_list)
+        marcar_recentes(page_obj.object_list)
+        contexto.update({
+            'tickets': page_obj,
+            'page_obj': page_obj,
+            'paginator': paginator,
+            'is_paginated': page_obj.has_other_pages(),
+            'referer': '/',
+            **facetas.contexto(facetas.FiltroTickets({})),
+        })
+        return contexto
+
+
+def medir(funcao, repeticoes):
+    """Tempo médio por chamada, em segundos, depois de uma chamada de aquecimento."""
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from apps.ticket.async_views import AsyncDashboardView, AsyncTicketDetailView
+from apps.ticket.models import Ticket
+from apps.ticket.views import CustomUser, DashboardView, TicketDetailView
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão das views síncronas e assíncronas sob carga concorrente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help='username usado nas requisições')
+        parser.add_argument('--ticket', type=int, help='id do ticket aberto no detalhe (padrão: o mais recente)')
+        parser.add_argument('--requisicoes', type=int, default=200)
+        parser.add_argument('--concorrencia', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            self.usuario = CustomUser.objects.get(username=options['usuario'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario"]}" não encontrado.')
+
+        ticket_id = options['ticket'] or Ticket.objects.order_by('-pk').values_list('pk', flat=True).first()
+        if ticket_id is None:
+            raise CommandError('Nenhum ticket cadastrado para o benchmark do detalhe.')
+
+        self.factory = RequestFactory()
+        total = options['requisicoes']
+        concorrencia = options['concorrencia']
+
+        cenarios = [
+            ('dashboard', reverse('ticket:dashboard'), {}, DashboardView, AsyncDashboardView),
+            ('ticket_detail', reverse('ticket:ticket_detail', args=[ticket_id]), {'ticket_id': ticket_id},
+             TicketDetailView, AsyncTicketDetailView),
+        ]
+
+        self.stdout.write(f'{total} requisições, concorrência {concorrencia}')
+        for nome, caminho, kwargs, view_sync, view_async in cenarios:
+            duracao, status = self.executar_sync(view_sync.as_view(), caminho, kwargs, total, concorrencia)
+            self.relatar(nome, 'sync', total, duracao, status)
+            duracao, status = asyncio.run(self.executar_async(view_async.as_view(), caminho, kwargs, total, concorrencia))
+            self.relatar(nome, 'async', total, duracao, status)
+
+    def requisicao(self, caminho):
+        request = self.factory.get(caminho)
+        request.user = self.usuario
+        # Sessão nova e vazia, como a de um cliente sem cookie; nada é gravado nela
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+        async def auser():
+            return self.usuario
+
+        request.auser = auser
+        return request
+
+    def executar_sync(self, view, caminho, kwargs, total, concorrencia):
+        def chamar(_):
+            try:
+                return view(self.requisicao(caminho), **kwargs).status_code
+            finally:
+                connections.close_all()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            status = list(executor.map(chamar, range(total)))
+        return time.perf_counter() - inicio, status
+
+    async def executar_async(self, view, caminho, kwargs, total, concorrencia):
+        semaforo = asyncio.Semaphore(concorrencia)
+
+        async def chamar():
+            async with semaforo:
+                response = await view(self.requisicao(caminho), **kwargs)
+                return response.status_code
+
+        inicio = time.perf_counter()
+        status = await asyncio.gather(*(chamar() for _ in range(total)))
+        return time.perf_counter() - inicio, status
+
+    def relatar(self, nome, modo, total, duracao, status):
+        # Uma view com erro responderia rápido e distorceria a comparação
+        falhas = Counter(codigo for codigo in status if not 200 <= codigo < 300)
+        if falhas:
+            resumo = ', '.join(f'{quantidade}x {codigo}' for codigo, quantidade in sorted(falhas.items()))
+            raise CommandError(f'{nome} ({modo}): respostas fora de 2xx: {resumo}.')
+        self.stdout.write(
+            f'{nome:<15} {modo:<6} {total / duracao:8.1f} req/s  {duracao / total * 1000:7.2f} ms/req'
+        )
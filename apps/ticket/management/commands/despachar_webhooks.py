@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ticket.webhooks import Despachante, destinos
+
+
+class Command(BaseCommand):
+    help = (
+        'Entrega os eventos da caixa de saída aos destinos de WEBHOOKS, em lotes, com conexões '
+        'persistentes e novas tentativas com espera exponencial.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', action='append', help='despacha apenas os destinos informados (repetível)')
+        parser.add_argument('--uma-vez', action='store_true', help='esvazia a fila vencida e termina')
+        parser.add_argument('--intervalo', type=float, help='segundos entre verificações sem eventos (padrão WEBHOOKS_INTERVALO)')
+
+    def handle(self, *args, **options):
+        configuracao = destinos()
+        escolhidos = options['destino'] or list(configuracao)
+        desconhecidos = set(escolhidos) - set(configuracao)
+        if desconhecidos:
+            raise CommandError(f'Destinos não configurados em WEBHOOKS: {", ".join(sorted(desconhecidos))}')
+        if not escolhidos:
+            raise CommandError('Nenhum destino configurado em WEBHOOKS.')
+
+        intervalo = options['intervalo'] if options['intervalo'] is not None else getattr(settings, 'WEBHOOKS_INTERVALO', 2)
+        progresso = (lambda mensagem: self.stdout.write(mensagem)) if options['verbosity'] > 1 else None
+        despachante = Despachante({nome: configuracao[nome] for nome in escolhidos}, progresso)
+
+        try:
+            while True:
+                if despachante.ciclo():
+                    continue
+                if options['uma_vez']:
+                    break
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            despachante.fechar()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{despachante.enviados} eventos entregues, {despachante.reagendados} reagendados, '
+            f'{despachante.abandonados} abandonados'
+        ))
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ticket.importacao import LOTE_PADRAO, ArquivoInvalido, Importador, ler_origem
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa tickets e mensagens de arquivos CSV, .eml ou diretórios maildir em lotes. '
+        'Registros já importados são ignorados, então a importação pode ser repetida após uma interrupção.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminhos', nargs='+', help='arquivos .csv/.eml ou diretórios com e-mails')
+        parser.add_argument('--usuario-padrao', required=True,
+                            help='username que assina o histórico e as mensagens de autores desconhecidos')
+        parser.add_argument('--lote', type=int, default=LOTE_PADRAO, help='registros gravados por transação')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario_padrao'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario_padrao"]}" não encontrado.')
+
+        importador = Importador(usuario, lote=options['lote'], progresso=self.relatar)
+        for caminho in options['caminhos']:
+            self.stdout.write(f'Importando {caminho}')
+            try:
+                importador.importar(ler_origem(caminho))
+            except (OSError, ArquivoInvalido) as erro:
+                raise CommandError(f'Falha ao ler {caminho}: {erro}')
+
+        for erro in importador.erros:
+            self.stderr.write(f'  registro ignorado: {erro}')
+        self.stdout.write(self.style.SUCCESS(self.formatar(importador.totais)))
+
+    def relatar(self, totais):
+        self.stdout.write(f'  {self.formatar(totais)}')
+
+    def formatar(self, totais):
+        return (
+            f'{totais["lidos"]} lidos, {totais["tickets"]} tickets, {totais["mensagens"]} mensagens, '
+            f'{totais["ja_importados"]} já importados, {totais["sem_ticket"]} respostas sem ticket, '
+            f'{totais["invalidos"]} inválidos'
+        )
@@ -0,0 +1,306 @@
+import importlib.util
+import os
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.ticket.models import Ticket
+
+# Servidor WSGI com threads, o mesmo de `runserver`, carregando conf.wsgi
+SCRIPT_WSGI = r'''
+import sys
+from django.core.servers.basehttp import run
+from conf.wsgi import application
+run('127.0.0.1', int(sys.argv[1]), application, threading=True)
+'''
+
+LINK_TICKET = re.compile(rb'/ticket/tickets/(\d+)/')
+BANCO_TRAVADO = b'database is locked'
+
+# Peso de cada ação no roteiro de cada perfil
+ROTEIROS = {
+    'agente': {'dashboard': 3, 'detalhe': 4, 'mensagem': 2},
+    'solicitante': {'dashboard': 3, 'detalhe': 3, 'mensagem': 1, 'criar': 1},
+}
+STATUS_FILTRO = ['T', 'A', 'EA', 'EE', 'C', 'F', 'R']
+
+
+class SemRedirecionamento(HTTPRedirectHandler):
+    """Mede cada resposta isoladamente; o redirecionamento não é seguido."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Metricas:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.travados = defaultdict(int)
+
+    def registrar(self, nome, duracao, status, corpo):
+        with self.lock:
+            self.latencias[nome].append(duracao)
+            if status is None or status >= 400:
+                self.erros[nome] += 1
+            if status == 500 and BANCO_TRAVADO in corpo:
+                self.travados[nome] += 1
+
+
+class Sessao:
+    """Um usuário virtual: cookies próprios e um roteiro sorteado até o fim do tempo."""
+
+    def __init__(self, base, metricas, username, senha, perfil, tickets, anexo_kb, pausa):
+        self.base = base
+        self.metricas = metricas
+        self.username = username
+        self.senha = senha
+        self.perfil = perfil
+        self.tickets = list(tickets)
+        self.anexo_kb = anexo_kb
+        self.pausa = pausa
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), SemRedirecionamento)
+
+    def csrf(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+
+    def requisitar(self, nome, caminho, dados=None, arquivo=None):
+        corpo, headers = None, {}
+        if arquivo is not None:
+            corpo, headers['Content-Type'] = self.multipart(dados, arquivo)
+        elif dados is not None:
+            corpo = urlencode(dados).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(Request(self.base + caminho, data=corpo, headers=headers), timeout=60) as response:
+                status, conteudo = response.status, response.read()
+        except HTTPError as erro:
+            status, conteudo = erro.code, erro.read()
+        except (URLError, OSError):
+            status, conteudo = None, b''
+        duracao = time.perf_counter() - inicio
+
+        self.metricas.registrar(nome, duracao, status, conteudo)
+        return status, conteudo
+
+    def multipart(self, dados, arquivo):
+        limite = uuid.uuid4().hex
+        partes = []
+        for campo, valor in dados.items():
+            partes.append(
+                f'--{limite}\r\nContent-Disposition: form-data; name="{campo}"\r\n\r\n{valor}\r\n'.encode()
+            )
+        campo, nome_arquivo, conteudo = arquivo
+        partes.append(
+            f'--{limite}\r\nContent-Disposition: form-data; name="{campo}"; filename="{nome_arquivo}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + conteudo + b'\r\n'
+        )
+        partes.append(f'--{limite}--\r\n'.encode())
+        return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+    def executar(self, ate):
+        login = reverse('ticket:login')
+        self.requisitar('login', login)
+        status, _ = self.requisitar('login', login, {
+            'csrfmiddlewaretoken': self.csrf(), 'username': self.username, 'password': self.senha,
+        })
+        if status != 302:
+            return
+
+        acoes, pesos = zip(*ROTEIROS[self.perfil].items())
+        while time.monotonic() < ate:
+            getattr(self, random.choices(acoes, pesos)[0])()
+            if self.pausa:
+                time.sleep(random.uniform(0, self.pausa * 2))
+
+    def dashboard(self):
+        status = random.choice(STATUS_FILTRO)
+        _, conteudo = self.requisitar('dashboard', f'{reverse("ticket:dashboard")}?status={status}')
+        encontrados = {int(ticket_id) for ticket_id in LINK_TICKET.findall(conteudo)}
+        if encontrados:
+            self.tickets = list(encontrados)
+
+    def detalhe(self):
+        if self.tickets:
+            self.requisitar('ticket_detail', reverse('ticket:ticket_detail', args=[random.choice(self.tickets)]))
+
+    def mensagem(self):
+        if self.tickets:
+            self.requisitar('enviar_mensagem', reverse('ticket:ticket_detail', args=[random.choice(self.tickets)]), {
+                'csrfmiddlewaretoken': self.csrf(), 'enviar_mensagem': '1',
+                'texto': f'Mensagem de carga de {self.username}',
+            })
+
+    def criar(self):
+        caminho = reverse('ticket:create')
+        # O GET libera a sessão para um novo ticket (flag ticket_saved)
+        self.requisitar('create', caminho)
+        dados = {
+            'csrfmiddlewaretoken': self.csrf(), 'tipo': 'Painel',
+            'descricao': f'Ticket de carga {uuid.uuid4().hex[:8]} aberto por {self.username}',
+        }
+        anexo = ('anexo', 'carga.txt', os.urandom(self.anexo_kb * 1024)) if self.anexo_kb else None
+        self.requisitar('create', caminho, dados, anexo)
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera carga concorrente de agentes e solicitantes contra conf.wsgi ou conf.asgi em localhost '
+        'e relata vazão, latências p50/p95/p99 e taxas de erro por URL. Usa usuários carga_* com senha '
+        'aleatória, desativados ao final, e grava tickets, mensagens e anexos no banco e no MEDIA_ROOT '
+        'configurados. Só roda com DEBUG ligado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidor', choices=['wsgi', 'asgi'], default='wsgi',
+                            help='aplicação iniciada em um processo separado (asgi requer uvicorn)')
+        parser.add_argument('--url', help='usa um servidor já em execução em vez de iniciar um')
+        parser.add_argument('--agentes', type=int, default=4, help='usuários virtuais staff')
+        parser.add_argument('--solicitantes', type=int, default=8, help='usuários virtuais colaboradores')
+        parser.add_argument('--duracao', type=float, default=30, help='segundos de carga')
+        parser.add_argument('--pausa', type=float, default=0.2, help='tempo médio de espera entre ações (s)')
+        parser.add_argument('--anexo-kb', type=int, default=64, help='tamanho do anexo dos tickets criados; 0 desliga')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError('load_test cria usuários staff e grava no banco; só roda com DEBUG ligado.')
+
+        # Senha nova a cada execução; os usuários carga_* são desativados no finally
+        senha = secrets.token_urlsafe(16)
+        usuarios = self.preparar_usuarios(options['agentes'], options['solicitantes'], senha)
+        tickets = list(Ticket.objects.order_by('-pk').values_list('pk', flat=True)[:50])
+
+        servidor, log = None, None
+        try:
+            base = options['url']
+            if base is None:
+                servidor, log, base = self.iniciar_servidor(options['servidor'])
+            base = base.rstrip('/')
+
+            metricas = Metricas()
+            ate = time.monotonic() + options['duracao']
+            sessoes = [
+                Sessao(base, metricas, username, senha, perfil, tickets, options['anexo_kb'], options['pausa'])
+                for username, perfil in usuarios
+            ]
+            threads = [threading.Thread(target=sessao.executar, args=(ate,)) for sessao in sessoes]
+
+            inicio = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duracao = time.perf_counter() - inicio
+        finally:
+            if servidor is not None:
+                servidor.terminate()
+                servidor.wait(timeout=10)
+            self.desativar_usuarios(usuarios)
+
+        self.relatar(metricas, duracao, options)
+        if log is not None:
+            log.seek(0)
+            travados = log.read().count(BANCO_TRAVADO)
+            self.stdout.write(f'"database is locked" no log do servidor: {travados}')
+            log.close()
+
+    def preparar_usuarios(self, agentes, solicitantes, senha):
+        User = get_user_model()
+        usuarios = []
+        for perfil, quantidade in (('agente', agentes), ('solicitante', solicitantes)):
+            for indice in range(quantidade):
+                username = f'carga_{perfil}_{indice}'
+                usuario, _ = User.objects.get_or_create(
+                    username=username, defaults={'is_staff': perfil == 'agente', 'first_name': 'Carga'}
+                )
+                usuario.set_password(senha)
+                usuario.is_active = True
+                usuario.save(update_fields=['password', 'is_active'])
+                usuarios.append((username, perfil))
+        return usuarios
+
+    def desativar_usuarios(self, usuarios):
+        # Os tickets criados na carga continuam ligados a eles; por isso desativar, e não apagar
+        User = get_user_model()
+        for usuario in User.objects.filter(username__in=[username for username, _ in usuarios]):
+            usuario.set_unusable_password()
+            usuario.is_active = False
+            usuario.save(update_fields=['password', 'is_active'])
+
+    def iniciar_servidor(self, tipo):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            porta = sock.getsockname()[1]
+
+        if tipo == 'asgi':
+            if importlib.util.find_spec('uvicorn') is None:
+                raise CommandError('O modo asgi usa o uvicorn: pip install uvicorn (ou informe --url).')
+            comando = [sys.executable, '-m', 'uvicorn', 'conf.asgi:application',
+                       '--host', '127.0.0.1', '--port', str(porta), '--log-level', 'warning']
+        else:
+            comando = [sys.executable, '-c', SCRIPT_WSGI, str(porta)]
+
+        log = tempfile.TemporaryFile()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'conf.settings'))
+        servidor = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        base = f'http://127.0.0.1:{porta}'
+
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if servidor.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'O servidor {tipo} não iniciou:\n{log.read()[-2000:].decode(errors="replace")}')
+            try:
+                with socket.create_connection(('127.0.0.1', porta), timeout=1):
+                    return servidor, log, base
+            except OSError:
+                time.sleep(0.2)
+
+        servidor.terminate()
+        raise CommandError(f'O servidor {tipo} não respondeu em 30 s.')
+
+    def relatar(self, metricas, duracao, options):
+        total = sum(len(latencias) for latencias in metricas.latencias.values())
+        self.stdout.write(
+            f'{options["agentes"]} agentes, {options["solicitantes"]} solicitantes, {duracao:.1f} s: '
+            f'{total} requisições, {total / duracao:.1f} req/s'
+        )
+        self.stdout.write(
+            f'{"url":<16}{"reqs":>7}{"req/s":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"erros":>8}{"locked":>8}'
+        )
+        for nome, latencias in sorted(metricas.latencias.items()):
+            latencias.sort()
+            quantidade = len(latencias)
+            self.stdout.write(
+                f'{nome:<16}{quantidade:>7}{quantidade / duracao:>8.1f}'
+                f'{percentil(latencias, 50):>9.1f}{percentil(latencias, 95):>9.1f}{percentil(latencias, 99):>9.1f}'
+                f'{metricas.erros[nome] / quantidade:>8.1%}{metricas.travados[nome] / quantidade:>8.1%}'
+            )
+
+
+def percentil(ordenados, p):
+    # Nearest-rank sobre a lista já ordenada, em milissegundos
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice] * 1000
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.ticket import duplicados
+from apps.ticket.models import AssinaturaTicket, BandaLSH, Ticket
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice MinHash/LSH de prováveis duplicados a partir dos tickets abertos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='tickets gravados por transação')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        BandaLSH.objects.all().delete()
+        AssinaturaTicket.objects.all().delete()
+
+        tickets = Ticket.objects.filter(ativo=True).exclude(
+            status__in=duplicados.STATUS_FORA_DO_INDICE
+        ).only('pk', 'titulo', 'descricao').order_by('pk')
+
+        total = 0
+        pendentes = []
+        for ticket in tickets.iterator(chunk_size=lote):
+            pendentes.append(duplicados.objetos_do_indice(ticket, duplicados.texto_do_ticket(ticket)))
+            if len(pendentes) >= lote:
+                total += self.gravar(pendentes)
+                pendentes = []
+        if pendentes:
+            total += self.gravar(pendentes)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} tickets indexados.'))
+
+    def gravar(self, pendentes):
+        with transaction.atomic():
+            AssinaturaTicket.objects.bulk_create([assinatura for assinatura, _ in pendentes])
+            BandaLSH.objects.bulk_create([banda for _, bandas in pendentes for banda in bandas])
+        return len(pendentes)
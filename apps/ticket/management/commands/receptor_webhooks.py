@@ -0,0 +1,42 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Receptor local de webhooks para testes: aceita os POSTs do despachar_webhooks e imprime os '
+        'eventos recebidos. Use com WEBHOOKS apontando para http://127.0.0.1:<porta>/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--porta', type=int, default=8099)
+        parser.add_argument('--status', type=int, default=200, help='status devolvido (ex.: 503 para testar as novas tentativas)')
+
+    def handle(self, *args, **options):
+        comando = self
+
+        class Receptor(BaseHTTPRequestHandler):
+            # HTTP/1.1 mantém a conexão aberta entre os lotes, como um receptor real
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                for evento in corpo['eventos']:
+                    comando.stdout.write(f'{self.client_address[1]} #{evento["id"]} {evento["evento"]} {evento["dados"]}')
+                self.send_response(options['status'])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer(('127.0.0.1', options['porta']), Receptor)
+        self.stdout.write(f'Recebendo webhooks em http://127.0.0.1:{options["porta"]}/')
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
@@ -0,0 +1,94 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Executado em um interpretador novo, com -X importtime, para medir o boot real do worker
+SCRIPT_BOOT = r'''
+import json, os, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+wsgi = time.perf_counter()
+
+status = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.url_scheme': 'http', 'wsgi.input': __import__('io').BytesIO(), 'wsgi.errors': sys.stderr,
+}
+b''.join(application(environ, lambda s, h, e=None: status.append(s)))
+requisicao = time.perf_counter()
+
+print(json.dumps({
+    'setup_ms': (setup - inicio) * 1000,
+    'wsgi_ms': (wsgi - setup) * 1000,
+    'primeira_requisicao_ms': (requisicao - wsgi) * 1000,
+    'status': status[0] if status else None,
+}))
+'''
+
+LINHA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Mede o custo cumulativo dos imports e o tempo até a primeira requisição de um worker novo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settings-module', default=os.environ.get('DJANGO_SETTINGS_MODULE'),
+                            help='settings usado no worker medido (ex.: conf.settings_prod)')
+        parser.add_argument('--url', default=settings.STARTUP_PROFILE_URL)
+        parser.add_argument('--top', type=int, default=15, help='quantidade de pacotes listados')
+        parser.add_argument('--budget-ms', type=float, default=settings.STARTUP_BUDGET_MS,
+                            help='falha se o tempo até a primeira requisição exceder este valor')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=options['settings_module'])
+
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT_BOOT, options['url']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        if processo.returncode != 0:
+            raise CommandError(f'O worker medido falhou ao iniciar:\n{processo.stderr[-2000:]}')
+
+        medidas = json.loads(processo.stdout.strip().splitlines()[-1])
+        imports = self.imports_de_topo(processo.stderr)
+
+        self.stdout.write(f'Settings: {options["settings_module"]}')
+        self.stdout.write('Imports de topo mais caros (cumulativo):')
+        for nome, cumulativo_us in imports[:options['top']]:
+            self.stdout.write(f'  {cumulativo_us / 1000:9.1f} ms  {nome}')
+        self.stdout.write(f'Total de imports:        {sum(us for _, us in imports) / 1000:9.1f} ms')
+        self.stdout.write(f'django.setup():          {medidas["setup_ms"]:9.1f} ms')
+        self.stdout.write(f'Carga da aplicação WSGI: {medidas["wsgi_ms"]:9.1f} ms')
+        self.stdout.write(f'Primeira requisição:     {medidas["primeira_requisicao_ms"]:9.1f} ms ({medidas["status"]})')
+        self.stdout.write(f'Processo até 1ª resposta:{total_ms:9.1f} ms (orçamento {options["budget_ms"]:.0f} ms)')
+
+        # Um worker que responde erro sobe rápido, mas não está pronto
+        codigo = int(medidas['status'].split()[0]) if medidas['status'] else None
+        if codigo is None or not 200 <= codigo < 400:
+            raise CommandError(f'A primeira requisição a {options["url"]} falhou: {medidas["status"]}')
+
+        if total_ms > options['budget_ms']:
+            raise CommandError(f'Orçamento de inicialização excedido: {total_ms:.0f} ms > {options["budget_ms"]:.0f} ms')
+
+    def imports_de_topo(self, stderr):
+        # Apenas imports de nível 0: o cumulativo deles já inclui os imports aninhados
+        imports = []
+        for linha in stderr.splitlines():
+            match = LINHA_IMPORTTIME.match(linha)
+            if match and len(match.group(3)) == 1:
+                imports.append((match.group(4), int(match.group(2))))
+        return sorted(imports, key=lambda item: item[1], reverse=True)
@@ -0,0 +1,141 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+class SQLCapture:
+    """Registra as queries executadas através de ``connection.execute_wrapper``."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'params': repr(params)[:500],
+                'ms': round((time.perf_counter() - inicio) * 1000, 3),
+            })
+
+
+class ProfilingMiddleware:
+    """
+    Perfila sob demanda requisições de usuários staff.
+
+    O perfil é ativado pelo parâmetro ``?_profile`` ou pelo header ``X-Profile``.
+    Requisições sem o gatilho seguem direto para a view, sem instrumentação.
+    Funciona nos dois modos (WSGI e ASGI), sem trocar de thread no caminho comum.
+    Sob ASGI o perfil cobre o event loop durante a requisição, então também
+    registra o que outras requisições executarem nele nesse intervalo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.param = getattr(settings, 'PROFILING_PARAM', '_profile')
+        self.header = getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE')
+        self.max_perfis = getattr(settings, 'PROFILING_MAX_PERFIS', 50)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.solicitado(request) or not request.user.is_staff:
+            return self.get_response(request)
+        return self.profile(request)
+
+    async def __acall__(self, request):
+        if not self.solicitado(request) or not (await request.auser()).is_staff:
+            return await self.get_response(request)
+
+        # cProfile e execute_wrapper valem por thread: um perfil no event loop, em volta da
+        # view assíncrona, e outro na thread do sync_to_async, onde rodam o ORM e as views síncronas
+        profiler = cProfile.Profile()
+        stack = ExitStack()
+        inicio = time.perf_counter()
+        profiler.enable()
+        try:
+            capturas, profilers = await sync_to_async(self.instrumentar)(stack)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            profiler.disable()
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        perfil = await sync_to_async(self.salvar_perfil)(
+            request, response, [profiler, *profilers], capturas, duracao_ms
+        )
+        response['X-Profile-Id'] = str(perfil.pk)
+        return response
+
+    def solicitado(self, request):
+        return self.header in request.META or self.param in request.GET
+
+    def instrumentar(self, stack):
+        """Captura de SQL e cProfile na thread atual, desligados ao fechar ``stack``."""
+        capturas = [SQLCapture(conn.alias) for conn in connections.all()]
+        for conn, captura in zip(connections.all(), capturas):
+            stack.enter_context(conn.execute_wrapper(captura))
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: um só perfil por processo, e o do event loop já cobre todas as threads
+            return capturas, []
+        stack.callback(profiler.disable)
+        return capturas, [profiler]
+
+    def profile(self, request):
+        inicio = time.perf_counter()
+        with ExitStack() as stack:
+            capturas, profilers = self.instrumentar(stack)
+            response = self.get_response(request)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        perfil = self.salvar_perfil(request, response, profilers, capturas, duracao_ms)
+        response['X-Profile-Id'] = str(perfil.pk)
+        return response
+
+    def salvar_perfil(self, request, response, profilers, capturas, duracao_ms):
+        from .models import PerfilRequisicao
+
+        resumo = io.StringIO()
+        estatisticas = pstats.Stats(*profilers, stream=resumo)
+        estatisticas.sort_stats('cumulative').print_stats(40)
+
+        queries = [query for captura in capturas for query in captura.queries]
+        perfil = PerfilRequisicao.objects.create(
+            caminho=request.get_full_path()[:255],
+            metodo=request.method,
+            usuario=request.user,
+            status_code=response.status_code,
+            duracao_ms=duracao_ms,
+            total_queries=len(queries),
+            tempo_sql_ms=sum(query['ms'] for query in queries),
+            sql=queries,
+            resumo=resumo.getvalue(),
+            dados=marshal.dumps(estatisticas.stats),
+        )
+
+        # Mantém apenas os perfis mais recentes
+        antigos = PerfilRequisicao.objects.values_list('pk', flat=True)[self.max_perfis:]
+        PerfilRequisicao.objects.filter(pk__in=list(antigos)).delete()
+        return perfil
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('caminho', models.CharField(max_length=255)),
+                ('metodo', models.CharField(max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField(default=200)),
+                ('duracao_ms', models.FloatField(default=0)),
+                ('total_queries', models.PositiveIntegerField(default=0)),
+                ('tempo_sql_ms', models.FloatField(default=0)),
+                ('sql', models.JSONField(blank=True, default=list)),
+                ('resumo', models.TextField(blank=True)),
+                ('dados', models.BinaryField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Requisição',
+                'verbose_name_plural': 'Perfis de Requisições',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0002_perfilrequisicao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssinaturaTicket',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='assinatura', serialize=False, to='ticket.ticket')),
+                ('minhash', models.JSONField(default=list)),
+                ('texto_hash', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Assinatura do Ticket',
+                'verbose_name_plural': 'Assinaturas dos Tickets',
+            },
+        ),
+        migrations.CreateModel(
+            name='BandaLSH',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.BigIntegerField(db_index=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bandas_lsh', to='ticket.ticket')),
+            ],
+            options={
+                'verbose_name': 'Banda LSH',
+                'verbose_name_plural': 'Bandas LSH',
+            },
+        ),
+    ]
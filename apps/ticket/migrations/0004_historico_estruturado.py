@@ -0,0 +1,146 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:12
+
+import re
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+LOTE = 1000
+
+# Frases gravadas até aqui em HistoricoTicket.mensagem
+CAMPOS = {
+    'status': r'Status do ticket alterado',
+    'prioridade': r'Prioridade do ticket alterada',
+    'nivel_atendimento': r'Nível de atendimento alterado',
+    'tecnico': r'Técnico responsável alterado',
+}
+PADROES_ALTERACAO = {
+    campo: re.compile(rf'^{frase} de "(?P<anterior>.*)" para "(?P<novo>.*)"(?: em [\d/: ]+)?$', re.S)
+    for campo, frase in CAMPOS.items()
+}
+PADRAO_TRIAGEM = re.compile(r'^Ticket atribuído a "(?P<novo>.*)" pela fila de triagem(?: em [\d/: ]+)?$', re.S)
+PADRAO_CONCLUSAO = re.compile(r'^Conclusão: (?P<mensagem>.*)$', re.S)
+
+
+def chaves_por_nome(Ticket):
+    return {
+        campo: {nome: chave for chave, nome in Ticket._meta.get_field(campo).choices}
+        for campo in ('status', 'prioridade', 'nivel_atendimento')
+    }
+
+
+def converter(historico, chaves):
+    texto = historico.mensagem.strip()
+    for campo, padrao in PADROES_ALTERACAO.items():
+        encontrado = padrao.match(texto)
+        if encontrado:
+            # Valores vazios eram gravados como "None"
+            anterior, novo = ('' if valor == 'None' else valor for valor in (encontrado['anterior'], encontrado['novo']))
+            if campo != 'tecnico':
+                anterior, novo = (chaves[campo].get(valor, valor) for valor in (anterior, novo))
+            historico.evento, historico.campo = 'AL', campo
+            historico.valor_anterior, historico.valor_novo, historico.mensagem = anterior, novo, ''
+            return
+
+    encontrado = PADRAO_TRIAGEM.match(texto)
+    if encontrado:
+        historico.evento, historico.campo, historico.valor_novo, historico.mensagem = 'AT', 'tecnico', encontrado['novo'], ''
+    elif texto == 'Ticket reativado':
+        historico.evento, historico.mensagem = 'RE', ''
+    elif PADRAO_CONCLUSAO.match(texto):
+        historico.evento, historico.mensagem = 'CO', PADRAO_CONCLUSAO.match(texto)['mensagem']
+
+
+def texto_legado(historico, nomes):
+    # Como as views antigas gravavam: timezone.now(), em UTC
+    agora = historico.data_criacao.astimezone(dt_timezone.utc).strftime('%d/%m/%Y %H:%M:%S')
+    if historico.evento == 'AL':
+        anterior, novo = historico.valor_anterior, historico.valor_novo
+        if historico.campo != 'tecnico':
+            anterior, novo = (nomes[historico.campo].get(valor, valor) for valor in (anterior, novo))
+        anterior, novo = anterior or 'None', novo or 'None'
+        return f'{CAMPOS[historico.campo]} de "{anterior}" para "{novo}" em {agora}'
+    if historico.evento == 'AT':
+        return f'Ticket atribuído a "{historico.valor_novo}" pela fila de triagem em {agora}'
+    if historico.evento == 'RE':
+        return 'Ticket reativado'
+    if historico.evento == 'CO':
+        return f'Conclusão: {historico.mensagem}'
+    return historico.mensagem
+
+
+def atualizar_em_lotes(HistoricoTicket, alias, transformar):
+    pendentes = []
+    for historico in HistoricoTicket.objects.using(alias).order_by('pk').iterator(chunk_size=LOTE):
+        transformar(historico)
+        pendentes.append(historico)
+        if len(pendentes) >= LOTE:
+            HistoricoTicket.objects.using(alias).bulk_update(
+                pendentes, ['evento', 'campo', 'valor_anterior', 'valor_novo', 'mensagem']
+            )
+            pendentes = []
+    HistoricoTicket.objects.using(alias).bulk_update(
+        pendentes, ['evento', 'campo', 'valor_anterior', 'valor_novo', 'mensagem']
+    )
+
+
+def estruturar_historico(apps, schema_editor):
+    HistoricoTicket = apps.get_model('ticket', 'HistoricoTicket')
+    chaves = chaves_por_nome(apps.get_model('ticket', 'Ticket'))
+    atualizar_em_lotes(HistoricoTicket, schema_editor.connection.alias, lambda historico: converter(historico, chaves))
+
+
+def restaurar_texto(apps, schema_editor):
+    HistoricoTicket = apps.get_model('ticket', 'HistoricoTicket')
+    nomes = {
+        campo: {chave: nome for nome, chave in chaves.items()}
+        for campo, chaves in chaves_por_nome(apps.get_model('ticket', 'Ticket')).items()
+    }
+
+    def transformar(historico):
+        historico.mensagem = texto_legado(historico, nomes)
+        historico.evento, historico.campo, historico.valor_anterior, historico.valor_novo = 'TX', '', '', ''
+
+    atualizar_em_lotes(HistoricoTicket, schema_editor.connection.alias, transformar)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0003_indice_duplicados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicoticket',
+            name='campo',
+            field=models.CharField(blank=True, choices=[('status', 'Status do ticket'), ('prioridade', 'Prioridade do ticket'), ('nivel_atendimento', 'Nível de atendimento'), ('tecnico', 'Técnico responsável')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='historicoticket',
+            name='evento',
+            field=models.CharField(choices=[('AL', 'Alteração de campo'), ('CO', 'Conclusão'), ('RE', 'Reativação'), ('AT', 'Atribuição pela triagem'), ('TX', 'Texto livre')], default='TX', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='historicoticket',
+            name='valor_anterior',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='historicoticket',
+            name='valor_novo',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='historicoticket',
+            name='mensagem',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(estruturar_historico, restaurar_texto),
+        migrations.AddIndex(
+            model_name='historicoticket',
+            index=models.Index(fields=['campo', 'valor_novo', 'data_criacao'], name='historico_transicao_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def criar_leituras(apps, schema_editor):
+    """Uma leitura por colaborador/técnico; as flags ligadas viram leituras pendentes."""
+    Ticket = apps.get_model('ticket', 'Ticket')
+    LeituraTicket = apps.get_model('ticket', 'LeituraTicket')
+    alias = schema_editor.connection.alias
+    agora = timezone.now()
+
+    leituras = []
+    tickets = Ticket.objects.using(alias).values_list(
+        'pk', 'usuario_id', 'tecnico_id', 'atualizado_colaborador', 'atualizado_tecnico'
+    )
+    for ticket_id, usuario_id, tecnico_id, atualizado_colaborador, atualizado_tecnico in tickets.iterator():
+        participantes = {}
+        if usuario_id:
+            participantes[usuario_id] = atualizado_colaborador
+        if tecnico_id:
+            participantes[tecnico_id] = participantes.get(tecnico_id, False) or atualizado_tecnico
+        leituras.extend(
+            LeituraTicket(
+                usuario_id=participante, ticket_id=ticket_id, nao_lida=nao_lida,
+                marcada_em=agora if nao_lida else None,
+            )
+            for participante, nao_lida in participantes.items()
+        )
+    LeituraTicket.objects.using(alias).bulk_create(leituras, batch_size=1000)
+
+
+def restaurar_flags(apps, schema_editor):
+    Ticket = apps.get_model('ticket', 'Ticket')
+    LeituraTicket = apps.get_model('ticket', 'LeituraTicket')
+    alias = schema_editor.connection.alias
+    pendentes = LeituraTicket.objects.using(alias).filter(nao_lida=True, ticket=models.OuterRef('pk'))
+
+    Ticket.objects.using(alias).update(
+        atualizado_colaborador=models.Exists(pendentes.filter(usuario=models.OuterRef('usuario'))),
+        atualizado_tecnico=models.Exists(pendentes.filter(usuario=models.OuterRef('tecnico'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0004_historico_estruturado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeituraTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_mensagem_vista', models.PositiveBigIntegerField(default=0)),
+                ('nao_lida', models.BooleanField(default=False)),
+                ('marcada_em', models.DateTimeField(blank=True, null=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leituras', to='ticket.ticket')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leituras', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leitura do Ticket',
+                'verbose_name_plural': 'Leituras dos Tickets',
+                'indexes': [models.Index(condition=models.Q(('nao_lida', True)), fields=['usuario', 'ticket'], name='leitura_nao_lida_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'ticket'), name='leitura_usuario_ticket_unica')],
+            },
+        ),
+        migrations.RunPython(criar_leituras, restaurar_flags),
+        migrations.RemoveField(
+            model_name='ticket',
+            name='atualizado_colaborador',
+        ),
+        migrations.RemoveField(
+            model_name='ticket',
+            name='atualizado_tecnico',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0005_leitura_ticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mensagem',
+            name='origem',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='origem',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='historicoticket',
+            name='evento',
+            field=models.CharField(choices=[('AL', 'Alteração de campo'), ('CO', 'Conclusão'), ('RE', 'Reativação'), ('AT', 'Atribuição pela triagem'), ('IM', 'Importação'), ('TX', 'Texto livre')], default='TX', max_length=2),
+        ),
+    ]
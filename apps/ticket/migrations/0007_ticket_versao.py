@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0006_origem_importacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0007_ticket_versao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSaida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destino', models.CharField(max_length=50)),
+                ('evento', models.CharField(choices=[('criado', 'Ticket criado'), ('status', 'Status alterado'), ('mensagem', 'Mensagem enviada'), ('concluido', 'Ticket concluído')], max_length=20)),
+                ('dados', models.JSONField(default=dict)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Saída',
+                'verbose_name_plural': 'Eventos de Saída',
+                'indexes': [models.Index(condition=models.Q(('enviado_em__isnull', True)), fields=['destino', 'proxima_tentativa'], name='evento_saida_pendente_idx')],
+            },
+        ),
+    ]
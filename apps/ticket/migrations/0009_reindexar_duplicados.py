@@ -0,0 +1,103 @@
+# Assinaturas MinHash recalculadas com one permutation hashing.
+#
+# Cópia congelada do cálculo de apps/ticket/duplicados.py nesta versão: a migração
+# não importa o código da app, que pode mudar depois. Para reconstruir o índice com
+# o código atual, use `manage.py rebuild_lsh_index`.
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations
+
+LOTE = 500
+
+BITS_COMPARTIMENTO = 6
+NUM_COMPARTIMENTOS = 1 << BITS_COMPARTIMENTO
+BYTES_HASH = 7
+BITS_VALOR = BYTES_HASH * 8 - BITS_COMPARTIMENTO
+LINHAS_POR_BANDA = 4
+TAMANHO_SHINGLE = 5
+TAMANHO_MAXIMO_TEXTO = 500
+STATUS_FORA_DO_INDICE = ('C', 'F')
+
+
+def hash64(valor):
+    digest = hashlib.blake2b(valor.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def texto_do_ticket(ticket):
+    texto = unicodedata.normalize('NFKD', f'{ticket.titulo or ""} {ticket.descricao or ""}')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r'\W+', ' ', texto).strip()[:TAMANHO_MAXIMO_TEXTO]
+
+
+def minhash(texto):
+    if len(texto) <= TAMANHO_SHINGLE:
+        shingles = {texto} if texto else set()
+    else:
+        shingles = {texto[i:i + TAMANHO_SHINGLE] for i in range(len(texto) - TAMANHO_SHINGLE + 1)}
+
+    mascara = NUM_COMPARTIMENTOS - 1
+    minimos = [None] * NUM_COMPARTIMENTOS
+    for shingle in shingles:
+        valor = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=BYTES_HASH).digest(), 'big')
+        compartimento, valor = valor & mascara, valor >> BITS_COMPARTIMENTO
+        if minimos[compartimento] is None or valor < minimos[compartimento]:
+            minimos[compartimento] = valor
+    if all(minimo is None for minimo in minimos):
+        return []
+
+    assinatura = []
+    for inicio in range(NUM_COMPARTIMENTOS):
+        distancia = 0
+        while minimos[(inicio + distancia) % NUM_COMPARTIMENTOS] is None:
+            distancia += 1
+        assinatura.append(minimos[(inicio + distancia) % NUM_COMPARTIMENTOS] + (distancia << BITS_VALOR))
+    return assinatura
+
+
+def chaves_bandas(assinatura):
+    return [
+        hash64(f'{inicio}:{assinatura[inicio:inicio + LINHAS_POR_BANDA]}')
+        for inicio in range(0, len(assinatura), LINHAS_POR_BANDA)
+    ]
+
+
+def reindexar(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Ticket = apps.get_model('ticket', 'Ticket')
+    AssinaturaTicket = apps.get_model('ticket', 'AssinaturaTicket')
+    BandaLSH = apps.get_model('ticket', 'BandaLSH')
+
+    BandaLSH.objects.using(alias).all().delete()
+    AssinaturaTicket.objects.using(alias).all().delete()
+
+    tickets = Ticket.objects.using(alias).filter(ativo=True).exclude(
+        status__in=STATUS_FORA_DO_INDICE
+    ).only('pk', 'titulo', 'descricao').order_by('pk')
+
+    assinaturas, bandas = [], []
+    for ticket in tickets.iterator(chunk_size=LOTE):
+        texto = texto_do_ticket(ticket)
+        assinatura = minhash(texto)
+        assinaturas.append(AssinaturaTicket(ticket_id=ticket.pk, minhash=assinatura, texto_hash=hash64(texto)))
+        bandas += [BandaLSH(ticket_id=ticket.pk, chave=chave) for chave in chaves_bandas(assinatura)]
+        if len(assinaturas) >= LOTE:
+            AssinaturaTicket.objects.using(alias).bulk_create(assinaturas)
+            BandaLSH.objects.using(alias).bulk_create(bandas)
+            assinaturas, bandas = [], []
+    AssinaturaTicket.objects.using(alias).bulk_create(assinaturas)
+    BandaLSH.objects.using(alias).bulk_create(bandas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ticket', '0008_evento_saida'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindexar, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone, dateformat
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, Group, Permission
 from django.contrib.auth import get_user_model
 
@@ -85,17 +86,85 @@ class Porcentagem(models.Model):
 
 
 class HistoricoTicket(models.Model):
+    """
+    Evento do histórico de um ticket.
+
+    Alterações de campo guardam apenas as chaves dos valores anterior e novo
+    (para o técnico, o username); o texto exibido é montado por ``texto`` na
+    renderização. ``mensagem`` fica reservado ao texto livre da conclusão, à
+    origem de tickets importados e aos registros antigos que não puderam ser
+    convertidos.
+    """
+    ALTERACAO = 'AL'
+    CONCLUSAO = 'CO'
+    REATIVACAO = 'RE'
+    ATRIBUICAO_TRIAGEM = 'AT'
+    IMPORTACAO = 'IM'
+    TEXTO = 'TX'
+
+    EVENTO_CHOICES = [
+        (ALTERACAO, 'Alteração de campo'),
+        (CONCLUSAO, 'Conclusão'),
+        (REATIVACAO, 'Reativação'),
+        (ATRIBUICAO_TRIAGEM, 'Atribuição pela triagem'),
+        (IMPORTACAO, 'Importação'),
+        (TEXTO, 'Texto livre'),
+    ]
+
+    CAMPO_CHOICES = [
+        ('status', 'Status do ticket'),
+        ('prioridade', 'Prioridade do ticket'),
+        ('nivel_atendimento', 'Nível de atendimento'),
+        ('tecnico', 'Técnico responsável'),
+    ]
+
     ticket = models.ForeignKey('Ticket', related_name='historico_entries', on_delete=models.CASCADE)
-    mensagem = models.TextField()
+    evento = models.CharField(max_length=2, choices=EVENTO_CHOICES, default=TEXTO)
+    campo = models.CharField(max_length=20, choices=CAMPO_CHOICES, blank=True)
+    valor_anterior = models.CharField(max_length=150, blank=True)
+    valor_novo = models.CharField(max_length=150, blank=True)
+    mensagem = models.TextField(blank=True)
     data_criacao = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
 
     class Meta:
         verbose_name = 'Histórico do Ticket'
         verbose_name_plural = 'Históricos dos Tickets'
+        indexes = [
+            models.Index(fields=['campo', 'valor_novo', 'data_criacao'], name='historico_transicao_idx'),
+        ]
 
     def __str__(self):
-        return f'Histórico de {self.ticket} - {self.data_criacao.strftime("%d/%m/%Y %H:%M:%S")}'
+        return f'Histórico de {self.ticket} - {dateformat.format(timezone.localtime(self.data_criacao), "d/m/Y H:i:s")}'
+
+    def nome_valor(self, valor):
+        if not valor:
+            return 'None'
+        if self.campo == 'tecnico':
+            return valor
+        return dict(Ticket._meta.get_field(self.campo).choices).get(valor, valor)
+
+    @property
+    def texto(self):
+        if self.evento == self.ALTERACAO:
+            genero = 'alterada' if self.campo == 'prioridade' else 'alterado'
+            return (
+                f'{self.get_campo_display()} {genero} de "{self.nome_valor(self.valor_anterior)}" '
+                f'para "{self.nome_valor(self.valor_novo)}"'
+            )
+        if self.evento == self.CONCLUSAO:
+            return f'Conclusão: {self.mensagem}'
+        if self.evento == self.REATIVACAO:
+            return 'Ticket reativado'
+        if self.evento == self.ATRIBUICAO_TRIAGEM:
+            return f'Ticket atribuído a "{self.valor_novo}" pela fila de triagem'
+        if self.evento == self.IMPORTACAO:
+            return f'Ticket importado de {self.mensagem}'
+        return self.mensagem
+
+
+class ConflitoVersao(Exception):
+    """O ticket foi gravado por outra pessoa depois que esta instância foi carregada."""
 
 
 class Ticket(models.Model):
@@ -107,6 +176,9 @@ class Ticket(models.Model):
         ('F', 'Fechado'),
         ('R', 'Reaberto'),
     ]
+    STATUS_ENCERRADOS = ('C', 'F')
+    # Cor do tema por status (border-*/bg-* nos cards), no lugar de cadeias de if/elif nos templates
+    STATUS_CORES = {'A': 'primary', 'EA': 'warning', 'EE': 'secondary', 'C': 'success', 'F': 'danger', 'R': 'info'}
 
     PRIORIDADE_CHOICES = [
         ('N', 'Novo'),
@@ -142,8 +214,10 @@ class Ticket(models.Model):
     nivel_atendimento = models.CharField(max_length=2, choices=NIVEL_ATENDIMENTO_CHOICES, null=True, blank=True)
     recently_updated = models.BooleanField(default=False)
     conclusao = models.TextField(blank=True, null=True)
-    atualizado_colaborador = models.BooleanField(default=False)
-    atualizado_tecnico = models.BooleanField(default=False)
+    # Chave do registro no sistema de origem (CSV legado, Message-ID); torna a importação idempotente
+    origem = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    # Controle otimista de concorrência: incrementada a cada gravação (ver _do_update)
+    versao = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         verbose_name = 'Ticket'
@@ -152,8 +226,39 @@ class Ticket(models.Model):
     def __str__(self):
         return f'{self.titulo} - {self.status}'
 
-    def add_historico(self, message, usuario):
-        HistoricoTicket.objects.create(ticket=self, mensagem=message, usuario=usuario)
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # O UPDATE só atinge a linha se ela ainda estiver na versão carregada
+        # (WHERE versao = n) e já grava a seguinte; sem linha atingida, outra
+        # gravação chegou antes e save() levanta ConflitoVersao
+        campo_versao = self._meta.get_field('versao')
+        values = [valor for valor in values if valor[0] is not campo_versao]
+        values.append((campo_versao, None, self.versao + 1))
+        if super()._do_update(base_qs.filter(versao=self.versao), using, pk_val, values, update_fields, forced_update):
+            self.versao += 1
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise ConflitoVersao(f'Ticket {pk_val} alterado depois da versão {self.versao}.')
+        return False
+
+    @property
+    def encerrado(self):
+        return self.status in self.STATUS_ENCERRADOS
+
+    @property
+    def cor_status(self):
+        return self.STATUS_CORES.get(self.status, '')
+
+    def novo_historico(self, usuario, evento, campo='', anterior='', novo='', mensagem=''):
+        """Evento do histórico ainda não gravado, para uso com ``bulk_create``."""
+        return HistoricoTicket(
+            ticket=self, evento=evento, campo=campo, valor_anterior=anterior or '',
+            valor_novo=novo or '', mensagem=mensagem, usuario=usuario,
+        )
+
+    def add_historico(self, usuario, evento, **kwargs):
+        historico = self.novo_historico(usuario, evento, **kwargs)
+        historico.save()
+        return historico
 
 
 class Mensagem(models.Model):
@@ -162,6 +267,124 @@ class Mensagem(models.Model):
     texto = models.TextField()
     criado_em = models.DateTimeField(auto_now_add=True)
     anexo = models.FileField(upload_to='attachments/', blank=True, null=True)
+    origem = models.CharField(max_length=255, unique=True, null=True, blank=True)
 
     def __str__(self):
         return f'{self.autor.email}: {self.texto[:20]}'
+
+
+class PerfilRequisicao(models.Model):
+    caminho = models.CharField(max_length=255)
+    metodo = models.CharField(max_length=10)
+    usuario = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField(default=200)
+    duracao_ms = models.FloatField(default=0)
+    total_queries = models.PositiveIntegerField(default=0)
+    tempo_sql_ms = models.FloatField(default=0)
+    sql = models.JSONField(default=list, blank=True)
+    resumo = models.TextField(blank=True)
+    dados = models.BinaryField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Perfil de Requisição'
+        verbose_name_plural = 'Perfis de Requisições'
+        ordering = ['-criado_em']
+
+    def __str__(self):
+        return f'{self.metodo} {self.caminho} - {self.duracao_ms:.0f}ms'
+
+
+class AssinaturaTicket(models.Model):
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, primary_key=True, related_name='assinatura')
+    minhash = models.JSONField(default=list)
+    texto_hash = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = 'Assinatura do Ticket'
+        verbose_name_plural = 'Assinaturas dos Tickets'
+
+    def __str__(self):
+        return f'Assinatura de {self.ticket_id}'
+
+
+class BandaLSH(models.Model):
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='bandas_lsh')
+    chave = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Banda LSH'
+        verbose_name_plural = 'Bandas LSH'
+
+    def __str__(self):
+        return f'{self.ticket_id} - {self.chave}'
+
+
+class LeituraTicket(models.Model):
+    """
+    Estado de leitura de um participante (colaborador, técnico ou quem já abriu
+    o ticket). ``nao_lida`` é ligado a cada atividade de outra pessoa e
+    desligado quando o participante vê o ticket depois de ``marcada_em``.
+    """
+    usuario = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='leituras')
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='leituras')
+    ultima_mensagem_vista = models.PositiveBigIntegerField(default=0)
+    nao_lida = models.BooleanField(default=False)
+    marcada_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Leitura do Ticket'
+        verbose_name_plural = 'Leituras dos Tickets'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'ticket'], name='leitura_usuario_ticket_unica'),
+        ]
+        indexes = [
+            # Caixa de não lidos: o índice parcial só contém as linhas pendentes
+            models.Index(fields=['usuario', 'ticket'], condition=models.Q(nao_lida=True), name='leitura_nao_lida_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.usuario} - {self.ticket_id}'
+
+
+class EventoSaida(models.Model):
+    """
+    Caixa de saída dos webhooks: um evento por destino inscrito, gravado na
+    mesma transação da alteração do ticket e entregue depois pelo comando
+    ``despachar_webhooks``. Pendente enquanto ``enviado_em`` é nulo;
+    ``proxima_tentativa`` nula indica que o envio foi abandonado.
+    """
+    CRIADO = 'criado'
+    STATUS = 'status'
+    MENSAGEM = 'mensagem'
+    CONCLUIDO = 'concluido'
+
+    EVENTO_CHOICES = [
+        (CRIADO, 'Ticket criado'),
+        (STATUS, 'Status alterado'),
+        (MENSAGEM, 'Mensagem enviada'),
+        (CONCLUIDO, 'Ticket concluído'),
+    ]
+
+    destino = models.CharField(max_length=50)
+    evento = models.CharField(max_length=20, choices=EVENTO_CHOICES)
+    dados = models.JSONField(default=dict)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(null=True, blank=True, default=timezone.now)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Evento de Saída'
+        verbose_name_plural = 'Eventos de Saída'
+        indexes = [
+            # Fila do despachante: só os eventos ainda não entregues
+            models.Index(
+                fields=['destino', 'proxima_tentativa'], condition=models.Q(enviado_em__isnull=True),
+                name='evento_saida_pendente_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.destino} - {self.evento} #{self.pk}'
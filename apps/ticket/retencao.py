@@ -0,0 +1,145 @@
+"""
+Retenção de dados em lotes pequenos.
+
+Cada política apaga linhas antigas em lotes de ``RETENCAO_LOTE`` chaves,
+percorridos em ordem de chave primária (keyset: ``pk > último``), cada lote na
+sua própria transação e com ``RETENCAO_PAUSA`` segundos entre eles. No SQLite
+isso mantém cada trava de escrita curta: os agentes continuam gravando entre um
+lote e outro. Tickets têm as mensagens, o histórico e os índices apagados
+antes, também em lotes, para que o ``CASCADE`` não vire uma transação enorme.
+
+Os dias de cada política ficam em ``RETENCAO_DIAS``; ``None`` desliga a política.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.utils import timezone
+
+from apps.base.storage import CODECS
+from .models import AssinaturaTicket, BandaLSH, EventoSaida, HistoricoTicket, LeituraTicket, Mensagem, Ticket
+
+
+class Politica:
+
+    def __init__(self, nome, modelo, filtro, dependentes=()):
+        self.nome = nome
+        self.modelo = modelo
+        # filtro(limite) -> kwargs das linhas vencidas
+        self.filtro = filtro
+        # (modelo, campo da FK) apagados antes de cada lote do modelo principal
+        self.dependentes = dependentes
+
+
+POLITICAS = {
+    politica.nome: politica for politica in [
+        Politica('sessoes', Session, lambda limite: {'expire_date__lt': limite}),
+        Politica('historico', HistoricoTicket, lambda limite: {'data_criacao__lt': limite}),
+        Politica(
+            'tickets', Ticket,
+            lambda limite: {'status__in': Ticket.STATUS_ENCERRADOS, 'atualizado_em__lt': limite},
+            dependentes=[
+                (Mensagem, 'ticket'), (HistoricoTicket, 'ticket'), (LeituraTicket, 'ticket'),
+                (BandaLSH, 'ticket'), (AssinaturaTicket, 'ticket'),
+            ],
+        ),
+        Politica('eventos', EventoSaida, lambda limite: {'enviado_em__lt': limite}),
+    ]
+}
+
+
+class Retencao:
+
+    def __init__(self, lote=None, pausa=None, simular=False, progresso=None):
+        self.lote = lote or getattr(settings, 'RETENCAO_LOTE', 500)
+        self.pausa = getattr(settings, 'RETENCAO_PAUSA', 0.5) if pausa is None else pausa
+        self.simular = simular
+        self.progresso = progresso or (lambda mensagem: None)
+        # rótulo do modelo -> linhas apagadas
+        self.linhas = {}
+        self.arquivos = 0
+        self.bytes = 0
+
+    def aplicar(self, nome, dias):
+        politica = POLITICAS[nome]
+        limite = timezone.now() - timedelta(days=dias)
+        alias = router.db_for_write(politica.modelo)
+        vencidos = politica.modelo._default_manager.using(alias).filter(**politica.filtro(limite))
+
+        for chaves in self.lotes_de_chaves(vencidos):
+            for modelo, campo in politica.dependentes:
+                relacionados = modelo._default_manager.using(alias).filter(**{f'{campo}__in': chaves})
+                for chaves_relacionadas in self.lotes_de_chaves(relacionados):
+                    self.apagar(modelo, alias, chaves_relacionadas)
+            self.apagar(politica.modelo, alias, chaves)
+            self.progresso(f'{nome}: {self.linhas.get(politica.modelo._meta.label, 0)} linhas')
+
+    def lotes_de_chaves(self, queryset):
+        ultimo = None
+        while True:
+            pagina = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+            chaves = list(pagina.order_by('pk').values_list('pk', flat=True)[:self.lote])
+            if not chaves:
+                return
+            yield chaves
+            ultimo = chaves[-1]
+
+    def apagar(self, modelo, alias, chaves):
+        rotulo = modelo._meta.label
+        if self.simular:
+            self.linhas[rotulo] = self.linhas.get(rotulo, 0) + len(chaves)
+            return
+
+        with transaction.atomic(using=alias):
+            _, apagados = modelo._default_manager.using(alias).filter(pk__in=chaves).delete()
+        for rotulo, quantidade in apagados.items():
+            self.linhas[rotulo] = self.linhas.get(rotulo, 0) + quantidade
+        if self.pausa:
+            time.sleep(self.pausa)
+
+    def limpar_arquivos(self, carencia_horas=None):
+        """
+        Remove do armazenamento os anexos que nenhum ticket ou mensagem
+        referencia. Arquivos mais novos que a carência são mantidos: o upload
+        é gravado no disco antes da linha que aponta para ele.
+        """
+        carencia = getattr(settings, 'RETENCAO_CARENCIA_ARQUIVOS', 24) if carencia_horas is None else carencia_horas
+        limite = time.time() - carencia * 3600
+        referenciados = set()
+        for modelo in (Ticket, Mensagem):
+            referenciados.update(
+                modelo.objects.exclude(anexo='').exclude(anexo__isnull=True).values_list('anexo', flat=True).iterator()
+            )
+
+        diretorios = {modelo._meta.get_field('anexo').upload_to.rstrip('/') for modelo in (Ticket, Mensagem)}
+        for diretorio in diretorios:
+            for nome in self.listar(diretorio):
+                # Na camada fria o arquivo fica no disco com o sufixo do codec
+                logico = nome
+                sufixo = os.path.splitext(nome)[1]
+                if sufixo in CODECS and nome not in referenciados:
+                    logico = nome[:-len(sufixo)]
+                if logico in referenciados:
+                    continue
+
+                caminho = default_storage.path(nome)
+                if os.path.getmtime(caminho) > limite:
+                    continue
+                self.arquivos += 1
+                self.bytes += os.path.getsize(caminho)
+                if not self.simular:
+                    default_storage.delete(logico)
+                    self.progresso(f'arquivos: {self.arquivos} removidos')
+
+    def listar(self, diretorio):
+        if not default_storage.exists(diretorio):
+            return
+        subdiretorios, arquivos = default_storage.listdir(diretorio)
+        for nome in arquivos:
+            yield f'{diretorio}/{nome}'
+        for subdiretorio in subdiretorios:
+            yield from self.listar(f'{diretorio}/{subdiretorio}')
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import duplicados
+from .busca_usuarios import indice_usuarios
+from .models import Ticket
+from .triagem import triagem
+
+# Campos que alteram a entrada do ticket no índice de duplicados
+CAMPOS_DUPLICADOS = {'titulo', 'descricao', 'status', 'ativo'}
+
+
+@receiver(post_save, sender=Ticket)
+def atualizar_triagem(sender, instance, using, **kwargs):
+    # Só depois do commit: uma transação desfeita não pode mexer na fila
+    transaction.on_commit(lambda: triagem.atualizar(instance), using=using)
+
+
+@receiver(post_save, sender=Ticket)
+def atualizar_indice_duplicados(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not CAMPOS_DUPLICADOS.intersection(update_fields):
+        return
+    duplicados.indexar(instance, using)
+
+
+@receiver(post_delete, sender=Ticket)
+def remover_da_triagem(sender, instance, using, **kwargs):
+    ticket_id = instance.pk
+    transaction.on_commit(lambda: triagem.remover(ticket_id), using=using)
+
+
+@receiver(post_save, sender=get_user_model())
+def atualizar_busca_usuarios(sender, update_fields=None, **kwargs):
+    # O login grava apenas last_login, que não entra no índice
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    indice_usuarios.invalidar()
+
+
+@receiver(post_delete, sender=get_user_model())
+def remover_da_busca_usuarios(sender, **kwargs):
+    indice_usuarios.invalidar()
@@ -3,12 +3,23 @@ from django import template
 
 register = template.Library()
 
+# Extension -> icon in static/projeto; anything else uses the default icon
+ICONES_ANEXO = {
+    'png': 'png.svg', 'jpeg': 'jpeg.svg', 'jpg': 'jpeg.svg', 'pdf': 'pdf.svg', 'doc': 'doc.svg',
+    'docx': 'docx.svg', 'ai': 'ai.svg', 'css': 'css.svg', 'csv': 'csv.svg', 'xml': 'xml.svg', 'zip': 'zip.svg',
+}
+
 @register.filter
 def file_extension(filename):
     """Returns the file extension from a filename."""
-    return filename.split('.')[-1] if '.' in filename else ''
+    return filename.split('.')[-1] if filename and '.' in filename else ''
 
 @register.filter
 def endswith_custom(value, suffix):
     """Check if a string ends with the given suffix."""
     return value.endswith(suffix)
+
+@register.filter
+def icone_anexo(filename):
+    """Returns the static path of the icon for a filename's extension."""
+    return f"projeto/{ICONES_ANEXO.get(file_extension(filename), 'default-icon.png')}"
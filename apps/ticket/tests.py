@@ -1,3 +1,1100 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import importlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import types
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import include, path, resolve, reverse
+
+from apps.base.middleware import ReplicaPinMiddleware
+from apps.base.precompilacao import precompilar_templates
+from . import duplicados, urls as ticket_urls
+from .async_views import AsyncCreateTicketView, AsyncDashboardView, AsyncTicketDetailView
+from .facetas import FiltroTickets, contagens
+from .importacao import ArquivoInvalido, Importador, ler_origem
+from .leituras import leituras, marcar_nao_lidos, nao_lidos, registrar_atividade
+from .middleware import ProfilingMiddleware
+from .models import (
+    BandaLSH, ConflitoVersao, EventoSaida, HistoricoTicket, LeituraTicket, Mensagem, PerfilRequisicao, Ticket,
+)
+from .retencao import Retencao
+from .triagem import triagem
+from .views import STATUS_FILTRO, DashboardView
+from conf import urls as raiz_urls
+from .webhooks import Despachante, publicar
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.comum = User.objects.create(username='comum')
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=self.comum)
+        self.url = reverse('ticket:ticket_detail', args=[ticket.pk])
+        self.addCleanup(leituras.descarregar)
+
+    def test_perfil_gravado_quando_solicitado(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'_profile': '1'})
+
+        perfil = PerfilRequisicao.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(perfil.pk))
+        self.assertEqual((perfil.caminho, perfil.usuario), (f'{self.url}?_profile=1', self.staff))
+        self.assertGreater(perfil.total_queries, 0)
+
+    def test_sem_gatilho_ou_sem_staff_nada_e_gravado(self):
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile-Id', self.client.get(self.url))
+        self.client.force_login(self.comum)
+        self.assertNotIn('X-Profile-Id', self.client.get(self.url, {'_profile': '1'}))
+        self.assertFalse(PerfilRequisicao.objects.exists())
+
+    async def test_perfil_no_modo_assincrono(self):
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(view)))
+
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(self.url, {'_profile': '1'})
+
+        perfil = await PerfilRequisicao.objects.aget()
+        self.assertEqual(response['X-Profile-Id'], str(perfil.pk))
+        # As queries da view rodam na thread perfilada e são capturadas
+        self.assertGreater(perfil.total_queries, 0)
+
+    async def test_view_assincrona_aparece_no_perfil(self):
+        async def contar_tickets_assincrono(request):
+            return HttpResponse(str(await Ticket.objects.acount()))
+
+        async def auser():
+            return self.staff
+
+        request = AsyncRequestFactory().get('/', {'_profile': '1'})
+        request.user, request.auser = self.staff, auser
+        response = await ProfilingMiddleware(contar_tickets_assincrono)(request)
+
+        perfil = await PerfilRequisicao.objects.aget(pk=response['X-Profile-Id'])
+        # O corpo da view roda no event loop; a query, na thread do sync_to_async
+        self.assertIn('contar_tickets_assincrono', perfil.resumo)
+        self.assertEqual(perfil.total_queries, 1)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Primário e réplica como dois bancos SQLite distintos."""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        User = get_user_model()
+        self.usuario = User.objects.create(username='tecnico', is_staff=True)
+        User.objects.using('replica').create(pk=self.usuario.pk, username='tecnico', is_staff=True)
+        self.client.force_login(self.usuario)
+
+        # A réplica ainda não recebeu o ticket criado no primário
+        self.ticket = Ticket.objects.create(
+            nome='Primário', titulo='Primário', descricao='somente-no-primario', tipo='Painel', usuario=self.usuario,
+        )
+        Ticket.objects.using('replica').create(
+            nome='Réplica', titulo='Réplica', descricao='copiado-para-replica', tipo='Painel',
+        )
+
+    def test_dashboard_le_da_replica(self):
+        response = self.client.get(reverse('ticket:dashboard'))
+
+        self.assertContains(response, 'copiado-para-replica')
+        self.assertNotContains(response, 'somente-no-primario')
+        self.assertNotIn('db_primario', response.cookies)
+
+    def test_escrita_fixa_leituras_no_primario(self):
+        response = self.client.post(
+            reverse('ticket:ticket_detail', args=[self.ticket.pk]),
+            {'enviar_mensagem': '1', 'texto': 'Nova mensagem'},
+        )
+        self.assertIn('db_primario', response.cookies)
+
+        response = self.client.get(reverse('ticket:dashboard'))
+        self.assertContains(response, 'somente-no-primario')
+        self.assertNotContains(response, 'copiado-para-replica')
+
+    async def test_escrita_fixa_leituras_no_primario_sob_asgi(self):
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(ReplicaPinMiddleware(view)))
+
+        await self.async_client.aforce_login(self.usuario)
+        response = await self.async_client.post(
+            reverse('ticket:ticket_detail', args=[self.ticket.pk]),
+            {'enviar_mensagem': '1', 'texto': 'Nova mensagem'},
+        )
+        self.assertIn('db_primario', response.cookies)
+
+        response = await self.async_client.get(reverse('ticket:dashboard'))
+        self.assertContains(response, 'somente-no-primario')
+
+    def test_leituras_pendentes_nao_fixam_o_primario(self):
+        self.addCleanup(leituras.descarregar)
+        leituras.marcar_vista(self.usuario.pk, self.ticket.pk)
+
+        for nome in ('ticket:dashboard', 'ticket:nao_lidos'):
+            self.assertNotIn('db_primario', self.client.get(reverse(nome)).cookies)
+        self.assertContains(self.client.get(reverse('ticket:dashboard')), 'copiado-para-replica')
+
+    def test_escritas_vao_para_o_primario(self):
+        Ticket.objects.create(nome='Novo', titulo='Novo', descricao='novo', tipo='Painel')
+
+        self.assertEqual(Ticket.objects.using('default').count(), 2)
+        self.assertEqual(Ticket.objects.using('replica').count(), 1)
+
+
+def urls_assincronas():
+    """As URLs de DJANGO_ASYNC_VIEWS=1, para testar as views assíncronas em qualquer modo."""
+    assincronas = {
+        'dashboard': AsyncDashboardView, 'create': AsyncCreateTicketView,
+        'ticket_detail': AsyncTicketDetailView, 'send_message': AsyncTicketDetailView,
+    }
+    ticket = [
+        path(str(padrao.pattern), assincronas[padrao.name].as_view(), name=padrao.name) if padrao.name in assincronas else padrao
+        for padrao in ticket_urls.urlpatterns
+    ]
+    modulo = types.ModuleType('urls_assincronas')
+    modulo.urlpatterns = [
+        path('ticket/', include((ticket, 'ticket'))) if getattr(padrao, 'namespace', None) == 'ticket' else padrao
+        for padrao in raiz_urls.urlpatterns
+    ]
+    return modulo
+
+
+@override_settings(ROOT_URLCONF=urls_assincronas())
+class ViewsAssincronasTests(TestCase):
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        # Primário e réplica com os mesmos dados: o dashboard lê da réplica
+        for alias in ('default', 'replica'):
+            self.usuario = get_user_model().objects.using(alias).create(pk=1, username='colaborador')
+            self.ticket = Ticket.objects.using(alias).create(
+                pk=1, nome='Rede', titulo='Sem rede no andar', descricao='Cabo rompido', tipo='Painel', usuario=self.usuario,
+            )
+        self.addCleanup(leituras.descarregar)
+
+    def test_urls_seguem_async_views(self):
+        with override_settings(ROOT_URLCONF='conf.urls'):
+            view = resolve(reverse('ticket:dashboard')).func.view_class
+        self.assertIs(view, AsyncDashboardView if settings.ASYNC_VIEWS else DashboardView)
+        self.assertIs(resolve(reverse('ticket:ticket_detail', args=[1])).func.view_class, AsyncTicketDetailView)
+
+    async def test_dashboard(self):
+        await self.async_client.aforce_login(self.usuario)
+        response = await self.async_client.get(reverse('ticket:dashboard'))
+
+        self.assertContains(response, 'Cabo rompido')
+        self.assertEqual(list(response.context['page_obj']), [self.ticket])
+
+    async def test_detalhe_e_304(self):
+        await self.async_client.aforce_login(self.usuario)
+        url = reverse('ticket:ticket_detail', args=[self.ticket.pk])
+        await self.async_client.get(url)
+        response = await self.async_client.get(url)
+
+        self.assertContains(response, 'Cabo rompido')
+        response = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_escritas_passam_pelo_fluxo_sincrono(self):
+        await self.async_client.aforce_login(self.usuario)
+        response = await self.async_client.get(reverse('ticket:create'))
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.post(reverse('ticket:create'), {'descricao': 'Não imprime', 'tipo': 'Painel'})
+        self.assertRedirects(response, reverse('ticket:dashboard'), fetch_redirect_response=False)
+        self.assertTrue(await Ticket.objects.filter(descricao='Não imprime', usuario=self.usuario).aexists())
+
+        response = await self.async_client.post(
+            reverse('ticket:send_message', args=[self.ticket.pk]), {'enviar_mensagem': '1', 'texto': 'Alguma novidade?'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await Mensagem.objects.filter(ticket=self.ticket).acount(), 1)
+
+
+class TriagemTests(TestCase):
+
+    def setUp(self):
+        self.tecnico = get_user_model().objects.create(username='tecnico', is_staff=True)
+        self.client.force_login(self.tecnico)
+        triagem.carregado_em = None
+        self.addCleanup(setattr, triagem, 'carregado_em', None)
+        self.addCleanup(leituras.descarregar)
+
+    def ticket(self, prioridade, **campos):
+        return Ticket.objects.create(
+            nome=prioridade, titulo=prioridade, descricao='fila', tipo='Painel', prioridade=prioridade, **campos
+        )
+
+    def puxar(self):
+        response = self.client.post(reverse('ticket:proximo_ticket'))
+        return [str(mensagem) for mensagem in get_messages(response.wsgi_request)]
+
+    def test_reivindica_o_mais_urgente(self):
+        baixa = self.ticket('B')
+        urgente = self.ticket('MA')
+
+        self.assertIn(f'Ticket "{urgente.titulo}" atribuído a você.', self.puxar())
+        self.assertIn(f'Ticket "{baixa.titulo}" atribuído a você.', self.puxar())
+        self.assertIn('Nenhum ticket aguardando triagem.', self.puxar())
+        self.assertEqual(Ticket.objects.filter(tecnico=self.tecnico).count(), 2)
+        self.assertEqual(
+            HistoricoTicket.objects.filter(evento=HistoricoTicket.ATRIBUICAO_TRIAGEM, valor_novo='tecnico').count(), 2
+        )
+
+    def test_tickets_de_outro_processo_entram_na_fila(self):
+        self.ticket('B')
+        triagem.carregar()
+        # Gravado por outro worker (ou pelo importador): nenhum signal neste processo
+        Ticket.objects.bulk_create([Ticket(nome='outro', titulo='outro', descricao='fila', tipo='Painel', prioridade='MA')])
+
+        with override_settings(TRIAGEM_TTL=0):
+            self.assertEqual(triagem.reivindicar(self.tecnico).titulo, 'outro')
+        self.assertEqual(triagem.reivindicar(self.tecnico).titulo, 'B')
+
+        # Fila vazia dentro do TTL: responde sem consultar o banco
+        Ticket.objects.bulk_create([Ticket(nome='depois', titulo='depois', descricao='fila', tipo='Painel')])
+        with self.assertNumQueries(0):
+            self.assertIsNone(triagem.reivindicar(self.tecnico))
+        with override_settings(TRIAGEM_TTL=0):
+            self.assertEqual(triagem.reivindicar(self.tecnico).titulo, 'depois')
+
+    def test_fila_so_muda_depois_do_commit(self):
+        triagem.carregar()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.ticket('MA')
+                raise RuntimeError
+        self.assertEqual(triagem.entradas, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            confirmado = self.ticket('M')
+        self.assertEqual(list(triagem.entradas), [confirmado.pk])
+
+
+class DuplicadosTests(TestCase):
+
+    def ticket(self, titulo, descricao):
+        return Ticket.objects.create(nome=titulo, titulo=titulo, descricao=descricao, tipo='Painel')
+
+    def test_indexa_e_encontra_texto_parecido(self):
+        impressora = self.ticket('Impressora do financeiro', 'A impressora do financeiro não imprime desde ontem à tarde')
+        self.ticket('Senha do e-mail', 'Preciso redefinir a senha do e-mail corporativo')
+
+        self.assertEqual(impressora.bandas_lsh.count(), duplicados.NUM_COMPARTIMENTOS // duplicados.LINHAS_POR_BANDA)
+        encontrados = duplicados.buscar('Impressora do financeiro: a impressora não imprime desde ontem')
+        self.assertEqual([ticket.pk for ticket, _ in encontrados], [impressora.pk])
+        self.assertEqual(duplicados.buscar('Troca do monitor da recepção'), [])
+
+    def test_reindexa_ao_editar_e_remove_ao_encerrar(self):
+        ticket = self.ticket('Impressora', 'A impressora não imprime')
+        ticket.titulo, ticket.descricao = 'Senha do e-mail', 'Preciso redefinir a senha do e-mail corporativo'
+        ticket.save()
+        self.assertEqual(duplicados.buscar('A impressora não imprime'), [])
+        self.assertEqual(len(duplicados.buscar('Preciso redefinir a senha do e-mail corporativo')), 1)
+
+        ticket.status = 'C'
+        ticket.save()
+        self.assertFalse(BandaLSH.objects.filter(ticket=ticket).exists())
+        self.assertEqual(duplicados.provaveis_duplicados(ticket), [])
+
+    def test_assinatura_limitada_ao_inicio_do_texto(self):
+        longo = 'impressora sem toner ' * 500
+        self.assertEqual(duplicados.minhash(duplicados.normalizar(longo)), duplicados.minhash(duplicados.normalizar(longo[:600])))
+        self.assertEqual(len(duplicados.minhash('abc')), duplicados.NUM_COMPARTIMENTOS)
+
+    def test_migracao_reconstroi_o_indice_sem_o_codigo_da_app(self):
+        migracao = importlib.import_module('apps.ticket.migrations.0009_reindexar_duplicados')
+        self.assertNotIn('duplicados', vars(migracao))
+        impressora = self.ticket('Impressora do financeiro', 'A impressora do financeiro não imprime desde ontem à tarde')
+        Ticket.objects.filter(pk=self.ticket('Fechado', 'Já resolvido').pk).update(status='F')
+        BandaLSH.objects.all().delete()
+
+        migracao.reindexar(django_apps, connection.schema_editor())
+
+        self.assertEqual(set(BandaLSH.objects.values_list('ticket_id', flat=True)), {impressora.pk})
+        encontrados = duplicados.buscar('Impressora do financeiro: a impressora não imprime desde ontem')
+        self.assertEqual([ticket.pk for ticket, _ in encontrados], [impressora.pk])
+
+
+class MigracaoHistoricoTests(TestCase):
+
+    migracao = importlib.import_module('apps.ticket.migrations.0004_historico_estruturado')
+
+    LEGADO = {
+        'Status do ticket alterado de "Aberto" para "Em Análise" em 01/03/2024 12:30:45':
+            ('AL', 'status', 'A', 'EA', ''),
+        'Prioridade do ticket alterada de "None" para "Muito Alta" em 01/03/2024 12:30:45':
+            ('AL', 'prioridade', '', 'MA', ''),
+        'Nível de atendimento alterado de "N1" para "Inexistente" em 01/03/2024 12:30:45':
+            ('AL', 'nivel_atendimento', 'N1', 'Inexistente', ''),
+        'Técnico responsável alterado de "None" para "jsilva" em 01/03/2024 12:30:45':
+            ('AL', 'tecnico', '', 'jsilva', ''),
+        'Ticket atribuído a "jsilva" pela fila de triagem em 01/03/2024 12:30:45':
+            ('AT', 'tecnico', '', 'jsilva', ''),
+        'Ticket reativado': ('RE', '', '', '', ''),
+        'Conclusão: Trocado o cabo.\nTestado com o usuário.': ('CO', '', '', '', 'Trocado o cabo.\nTestado com o usuário.'),
+        'Comentário livre do técnico': ('TX', '', '', '', 'Comentário livre do técnico'),
+    }
+
+    def setUp(self):
+        usuario = get_user_model().objects.create(username='jsilva')
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=usuario)
+        HistoricoTicket.objects.all().delete()
+        HistoricoTicket.objects.bulk_create(
+            HistoricoTicket(ticket=ticket, usuario=usuario, mensagem=mensagem) for mensagem in self.LEGADO
+        )
+        HistoricoTicket.objects.update(data_criacao=datetime(2024, 3, 1, 12, 30, 45, tzinfo=dt_timezone.utc))
+
+    def executar(self, funcao):
+        funcao(django_apps, connection.schema_editor())
+
+    def test_formatos_legados_sao_estruturados(self):
+        self.executar(self.migracao.estruturar_historico)
+
+        convertidos = HistoricoTicket.objects.order_by('pk').values_list(
+            'evento', 'campo', 'valor_anterior', 'valor_novo', 'mensagem',
+        )
+        self.assertEqual(dict(zip(self.LEGADO, convertidos)), self.LEGADO)
+
+    def test_reverter_restaura_o_texto_com_o_horario_em_utc(self):
+        self.executar(self.migracao.estruturar_historico)
+        self.executar(self.migracao.restaurar_texto)
+
+        self.assertEqual(list(HistoricoTicket.objects.order_by('pk').values_list('mensagem', flat=True)), list(self.LEGADO))
+        self.assertEqual(set(HistoricoTicket.objects.values_list('evento', flat=True)), {'TX'})
+
+
+class LeituraTicketTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.colaborador = User.objects.create(username='colaborador')
+        self.tecnico = User.objects.create(username='tecnico', is_staff=True)
+        self.ticket = Ticket.objects.create(
+            nome='Impressora', titulo='Impressora', descricao='Não imprime', tipo='Painel',
+            usuario=self.colaborador, tecnico=self.tecnico,
+        )
+        self.addCleanup(leituras.descarregar)
+
+    def test_mensagem_marca_nao_lido_para_os_demais(self):
+        self.client.force_login(self.tecnico)
+        self.client.post(
+            reverse('ticket:ticket_detail', args=[self.ticket.pk]),
+            {'enviar_mensagem': '1', 'texto': 'Pode testar?'},
+        )
+
+        self.assertEqual(list(nao_lidos(self.colaborador)), [self.ticket])
+        self.assertEqual(list(nao_lidos(self.tecnico)), [])
+
+    def test_leitura_agrupada_no_buffer(self):
+        registrar_atividade(self.ticket, self.tecnico)
+        self.client.force_login(self.colaborador)
+
+        with self.assertNumQueries(0, using='default'):
+            leituras.marcar_vista(self.colaborador.pk, self.ticket.pk)
+        self.assertTrue(LeituraTicket.objects.get(usuario=self.colaborador).nao_lida)
+
+        # A leitura pendente vale na hora para as consultas, sem gravar nada
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(list(nao_lidos(self.colaborador)), [])
+            marcar_nao_lidos([self.ticket], self.colaborador)
+        self.assertFalse(self.ticket.nao_lido)
+        self.assertTrue(all(consulta['sql'].startswith('SELECT') for consulta in consultas))
+        self.assertTrue(LeituraTicket.objects.get(usuario=self.colaborador).nao_lida)
+
+        leituras.descarregar()
+        self.assertFalse(LeituraTicket.objects.get(usuario=self.colaborador).nao_lida)
+
+    def test_descarregar_grava_o_lote_em_um_update(self):
+        outro = Ticket.objects.create(
+            nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=self.colaborador, tecnico=self.tecnico,
+        )
+        registrar_atividade(self.ticket, self.colaborador, mensagem_id=7)
+        registrar_atividade(outro, self.colaborador)
+        leituras.descarregar()
+        leituras.marcar_vista(self.tecnico.pk, self.ticket.pk, 7)
+        leituras.marcar_vista(self.tecnico.pk, outro.pk)
+        registrar_atividade(outro, self.colaborador)
+
+        with CaptureQueriesContext(connection) as consultas:
+            leituras.descarregar()
+
+        self.assertEqual(sum(consulta['sql'].startswith('UPDATE') for consulta in consultas), 1)
+        self.assertEqual(
+            dict(LeituraTicket.objects.filter(usuario=self.tecnico).values_list('ticket_id', 'ultima_mensagem_vista')),
+            {self.ticket.pk: 7, outro.pk: 0},
+        )
+        self.assertEqual(list(nao_lidos(self.tecnico)), [outro])
+
+    def test_atividade_depois_da_leitura_continua_pendente(self):
+        leituras.marcar_vista(self.colaborador.pk, self.ticket.pk)
+        registrar_atividade(self.ticket, self.tecnico)
+        leituras.descarregar()
+
+        self.assertEqual(list(nao_lidos(self.colaborador)), [self.ticket])
+
+
+class BufferLeiturasTests(TransactionTestCase):
+    # O temporizador grava em outra thread (outra conexão): precisa de dados confirmados
+
+    def test_temporizador_grava_sem_nova_leitura(self):
+        User = get_user_model()
+        colaborador = User.objects.create(username='colaborador')
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=colaborador)
+        tecnico = User.objects.create(username='tecnico')
+        self.addCleanup(leituras.descarregar)
+        leituras.descarregar()
+        if leituras.temporizador is not None:
+            leituras.temporizador.cancel()
+            leituras.temporizador = None
+
+        with override_settings(LEITURAS_INTERVALO=0.05):
+            registrar_atividade(ticket, tecnico)
+            leituras.marcar_vista(colaborador.pk, ticket.pk)
+            leituras.temporizador.join(5)
+
+        self.assertEqual(leituras.pendentes, {})
+        self.assertFalse(LeituraTicket.objects.get(usuario=colaborador).nao_lida)
+
+
+class BenchmarkViewsTests(TransactionTestCase):
+    # As requisições síncronas rodam em threads (outras conexões): precisa de dados confirmados
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create(username='colaborador')
+        Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=self.usuario)
+        self.addCleanup(leituras.descarregar)
+
+    def test_mede_os_dois_modos(self):
+        saida = io.StringIO()
+        call_command('benchmark_views', usuario='colaborador', requisicoes=2, concorrencia=2, stdout=saida)
+        self.assertEqual(len(saida.getvalue().splitlines()), 5)
+
+    def test_falha_em_resposta_de_erro(self):
+        with mock.patch('apps.ticket.views.TicketDetailView.get', return_value=HttpResponse(status=500)):
+            with self.assertRaisesMessage(CommandError, 'ticket_detail (sync): respostas fora de 2xx: 2x 500.'):
+                call_command('benchmark_views', usuario='colaborador', requisicoes=2, stdout=io.StringIO())
+
+
+class StartupProfileTests(TestCase):
+
+    IMPORTTIME = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       200 |        200 |   encodings.utf_8\n'
+        'import time:      1500 |      40000 | django\n'
+        'import time:       300 |       9000 | apps.ticket.views\n'
+    )
+
+    def executar(self, status, **opcoes):
+        medidas = {'setup_ms': 30.0, 'wsgi_ms': 10.0, 'primeira_requisicao_ms': 5.0, 'status': status}
+        processo = subprocess.CompletedProcess([], 0, stdout=json.dumps(medidas) + '\n', stderr=self.IMPORTTIME)
+        saida = io.StringIO()
+        with mock.patch('subprocess.run', return_value=processo) as run:
+            call_command('startup_profile', settings_module='conf.settings_prod', stdout=saida, **opcoes)
+        self.assertEqual(run.call_args.kwargs['env']['DJANGO_SETTINGS_MODULE'], 'conf.settings_prod')
+        return saida.getvalue()
+
+    def test_relata_imports_de_topo_e_status(self):
+        saida = self.executar('302 Found', budget_ms=60000)
+
+        # Só os imports de nível 0, do mais caro para o mais barato
+        self.assertLess(saida.index('40.0 ms  django'), saida.index('9.0 ms  apps.ticket.views'))
+        self.assertNotIn('encodings.utf_8', saida)
+        self.assertIn('49.0 ms', saida)
+        self.assertIn('(302 Found)', saida)
+
+    def test_falha_quando_a_primeira_requisicao_nao_responde_2xx_ou_3xx(self):
+        with self.assertRaisesMessage(CommandError, 'falhou: 400 Bad Request'):
+            self.executar('400 Bad Request', budget_ms=60000)
+
+    def test_falha_acima_do_orcamento(self):
+        with self.assertRaisesMessage(CommandError, 'Orçamento de inicialização excedido'):
+            self.executar('200 OK', budget_ms=0)
+
+
+class LoadTestTests(TestCase):
+
+    def test_recusa_rodar_sem_debug(self):
+        with self.assertRaisesMessage(CommandError, 'só roda com DEBUG ligado'):
+            call_command('load_test', url='http://127.0.0.1:1', duracao=0, stdout=io.StringIO())
+        self.assertFalse(get_user_model().objects.filter(username__startswith='carga_').exists())
+
+    @override_settings(DEBUG=True)
+    def test_usuarios_de_carga_ficam_desativados_ao_final(self):
+        User = get_user_model()
+        antigo = User.objects.create(username='carga_agente_0', is_staff=True)
+        antigo.set_password('carga-local')
+        antigo.save()
+
+        # Porta fechada: as sessões falham no login e o comando termina logo
+        call_command('load_test', url='http://127.0.0.1:1', agentes=1, solicitantes=1, duracao=0,
+                     stdout=io.StringIO())
+
+        usuarios = User.objects.filter(username__startswith='carga_')
+        self.assertEqual(usuarios.count(), 2)
+        for usuario in usuarios:
+            self.assertFalse(usuario.is_active)
+            self.assertFalse(usuario.has_usable_password())
+
+
+class BuscaUsuariosTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.tecnico = User.objects.create(
+            username='jsilva', first_name='João', last_name='Silva', email='joao.silva@empresa.com', is_staff=True,
+        )
+        User.objects.create(username='msouza', first_name='Maria', last_name='Souza', email='maria@empresa.com')
+        self.client.force_login(self.tecnico)
+
+    def buscar(self, termo):
+        response = self.client.get(reverse('ticket:buscar_usuarios'), {'term': termo})
+        return [resultado['text'] for resultado in response.json()['results']]
+
+    def test_busca_por_prefixo_em_todos_os_campos(self):
+        self.assertEqual(self.buscar('joa sil'), ['João Silva (jsilva)'])
+        self.assertEqual(self.buscar('SOU'), ['Maria Souza (msouza)'])
+        self.assertEqual(len(self.buscar('empresa')), 2)
+        self.assertEqual(self.buscar('silvana'), [])
+
+    def test_indice_atualizado_ao_salvar_usuario(self):
+        self.assertEqual(self.buscar('pedro'), [])
+        get_user_model().objects.create(username='pedro')
+        self.assertEqual(self.buscar('pedro'), ['pedro'])
+
+    def test_detalhe_renderiza_apenas_o_tecnico_selecionado(self):
+        ticket = Ticket.objects.create(
+            nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=self.tecnico, tecnico=self.tecnico,
+        )
+        response = self.client.get(reverse('ticket:ticket_detail', args=[ticket.pk]))
+
+        self.assertContains(response, 'João Silva (jsilva)')
+        self.assertNotContains(response, 'msouza')
+
+
+class ImportacaoTests(TestCase):
+
+    CSV = (
+        'origem,titulo,descricao,status,prioridade,usuario,criado_em,responde_a\n'
+        '10,Impressora,Não imprime,Em Análise,Alta,JSilva@Empresa.com,2024-01-05 10:00,\n'
+        '11,,Resposta do legado,,,jsilva,2024-01-06 11:00,10\n'
+        '12,Rede,Sem rede,A,B,desconhecido,,\n'
+    )
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create(username='jsilva', email='jsilva@empresa.com')
+        self.padrao = get_user_model().objects.create(username='importacao')
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        configuracao = override_settings(MEDIA_ROOT=os.path.join(self.diretorio, 'media'))
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.caminho = self.escrever('legado.csv', self.CSV)
+
+    def escrever(self, nome, conteudo):
+        caminho = os.path.join(self.diretorio, nome)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(conteudo)
+        return caminho
+
+    def importar(self, importador=None):
+        importador = importador or Importador(self.padrao, lote=2)
+        return importador.importar(ler_origem(self.caminho))
+
+    def test_importa_tickets_mensagens_e_historico(self):
+        totais = self.importar()
+
+        self.assertEqual((totais['tickets'], totais['mensagens']), (2, 1))
+        ticket = Ticket.objects.get(origem='csv:10')
+        self.assertEqual((ticket.status, ticket.prioridade, ticket.usuario), ('EA', 'A', self.usuario))
+        self.assertEqual(ticket.criado_em.year, 2024)
+        self.assertEqual(Mensagem.objects.get(origem='csv:11').ticket, ticket)
+        self.assertEqual(Ticket.objects.get(origem='csv:12').usuario, self.padrao)
+        self.assertEqual(HistoricoTicket.objects.filter(evento=HistoricoTicket.IMPORTACAO).count(), 2)
+
+    def test_reimportar_ignora_registros_existentes(self):
+        self.importar()
+        totais = self.importar()
+
+        self.assertEqual((totais['tickets'], totais['mensagens'], totais['ja_importados']), (0, 0, 3))
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_linhas_invalidas_sao_relatadas_e_puladas(self):
+        self.caminho = self.escrever('invalido.csv', (
+            'origem,titulo,descricao,status,criado_em\n'
+            ',Sem origem,Primeira,,\n'
+            ',Sem origem,Segunda,,\n'
+            '20,Data,Data ruim,,ontem\n'
+            '21,Mês,Mês inexistente,,2024-13-01 10:00\n'
+            '22,Fechado,Já fechado,Fechado,\n'
+        ))
+        importador = Importador(self.padrao, lote=2)
+        totais = self.importar(importador)
+
+        self.assertEqual((totais['tickets'], totais['invalidos'], totais['ja_importados']), (1, 4, 0))
+        self.assertEqual([erro.split(':')[1] for erro in importador.erros], ['2', '3', '4', '5'])
+        self.assertIn('origem em branco', importador.erros[0])
+        self.assertFalse(Ticket.objects.get(origem='csv:22').ativo)
+
+        self.caminho = self.escrever('sem_coluna.csv', 'origem,titulo\n1,Sem descrição\n')
+        with self.assertRaises(ArquivoInvalido):
+            self.importar()
+
+    def test_lote_desfeito_apaga_os_anexos(self):
+        self.escrever('log.txt', 'erro 42')
+        self.caminho = self.escrever('anexos.csv', 'origem,descricao,anexo\n30,Com anexo,log.txt\n')
+
+        class Falha(Importador):
+            def gravar_mensagens(self, mensagens, ids):
+                raise RuntimeError('falha no meio do lote')
+
+        with self.assertRaises(RuntimeError):
+            self.importar(Falha(self.padrao))
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(default_storage.listdir('anexos')[1], [])
+
+        self.importar()
+        self.assertEqual(len(default_storage.listdir('anexos')[1]), 1)
+
+    def test_anexos_sao_lidos_so_na_gravacao(self):
+        self.escrever('log.txt', 'erro 42')
+        self.caminho = self.escrever('anexos.csv', 'origem,descricao,anexo\n31,Com anexo,log.txt\n32,Sem arquivo,nada.txt\n')
+        registros = list(ler_origem(self.caminho))
+        # O registro guarda como abrir o arquivo, não o conteúdo
+        self.assertTrue(callable(registros[0]['anexo'][1]))
+        self.assertIn('anexo não encontrado: nada.txt', registros[1]['invalido'])
+
+        Importador(self.padrao).importar(registros)
+        with Ticket.objects.get(origem='csv:31').anexo.open('rb') as anexo:
+            self.assertEqual(anexo.read(), b'erro 42')
+
+    def test_email_encaminhado_como_anexo(self):
+        encaminhado = EmailMessage()
+        encaminhado['Subject'] = 'Impressora parada'
+        encaminhado.set_content('Não imprime desde ontem')
+        mensagem = EmailMessage()
+        mensagem['Message-ID'] = '<fw-1@empresa.com>'
+        mensagem['From'] = 'jsilva@empresa.com'
+        mensagem['Subject'] = 'Fwd: Impressora parada'
+        mensagem.set_content('Segue o e-mail original')
+        mensagem.add_attachment(encaminhado)
+        self.caminho = os.path.join(self.diretorio, 'fw.eml')
+        with open(self.caminho, 'wb') as arquivo:
+            arquivo.write(mensagem.as_bytes())
+
+        self.assertEqual(self.importar()['tickets'], 1)
+        anexo = Ticket.objects.get(origem='eml:<fw-1@empresa.com>').anexo
+        self.assertTrue(anexo.name.endswith('.eml'))
+        with anexo.open('rb') as conteudo:
+            self.assertIn(b'Subject: Impressora parada', conteudo.read())
+
+
+class RetencaoTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.usuario = get_user_model().objects.create(username='colaborador')
+        self.antigo = Ticket.objects.create(
+            nome='Antigo', titulo='Antigo', descricao='Encerrado', tipo='Painel', usuario=self.usuario, status='F',
+        )
+        self.aberto = Ticket.objects.create(
+            nome='Aberto', titulo='Aberto', descricao='Em andamento', tipo='Painel', usuario=self.usuario,
+        )
+        for ticket in (self.antigo, self.aberto):
+            for indice in range(3):
+                Mensagem.objects.create(ticket=ticket, autor=self.usuario, texto=f'Mensagem {indice}')
+        Ticket.objects.update(atualizado_em=timezone.now() - timedelta(days=800))
+
+    def test_apaga_tickets_encerrados_em_lotes(self):
+        retencao = Retencao(lote=2, pausa=0)
+        retencao.aplicar('tickets', 730)
+
+        self.assertEqual(list(Ticket.objects.all()), [self.aberto])
+        self.assertEqual(Mensagem.objects.filter(ticket=self.aberto).count(), 3)
+        self.assertEqual(retencao.linhas['ticket.Mensagem'], 3)
+        self.assertEqual(retencao.linhas['ticket.Ticket'], 1)
+
+    def test_remove_apenas_anexos_orfaos(self):
+        referenciado = default_storage.save('attachments/usado.txt', ContentFile(b'usado'))
+        Mensagem.objects.create(ticket=self.aberto, autor=self.usuario, texto='Com anexo', anexo=referenciado)
+        orfao = default_storage.save('attachments/orfao.txt', ContentFile(b'x' * 100))
+
+        retencao = Retencao(pausa=0)
+        retencao.limpar_arquivos(carencia_horas=0)
+
+        self.assertTrue(default_storage.exists(referenciado))
+        self.assertFalse(default_storage.exists(orfao))
+        self.assertEqual((retencao.arquivos, retencao.bytes), (1, 100))
+
+
+    def test_comando_nao_apaga_tickets_sem_configuracao(self):
+        saida = io.StringIO()
+        call_command('aplicar_retencao', pausa=0, stdout=saida)
+
+        self.assertIn('tickets: desligada', saida.getvalue())
+        self.assertEqual(Ticket.objects.count(), 2)
+
+        with self.assertRaisesMessage(CommandError, '--dias exige --politica'):
+            call_command('aplicar_retencao', dias=1, stdout=saida)
+        call_command('aplicar_retencao', politica=['tickets'], dias=730, pausa=0, stdout=saida)
+        self.assertEqual(list(Ticket.objects.all()), [self.aberto])
+
+
+class TemplatesTests(TestCase):
+
+    def test_todos_os_templates_compilam(self):
+        compilados, erros = precompilar_templates()
+
+        self.assertGreater(compilados, 0)
+        self.assertEqual(erros, {})
+
+    def test_cards_e_filtro_usam_as_tabelas_de_status(self):
+        usuario = get_user_model().objects.create(username='tecnico', is_staff=True)
+        ticket = Ticket.objects.create(
+            nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=usuario, status='F',
+        )
+        request = RequestFactory().get(reverse('ticket:dashboard'))
+        request.user = usuario
+
+        cards = render_to_string('ticket/partials/_cards.html', {'tickets': [ticket]}, request)
+        filtro = render_to_string(
+            'ticket/partials/_title.html', {'status_filtro': STATUS_FILTRO, 'selected_status': 'F'}, request,
+        )
+
+        self.assertIn('border-danger', cards)
+        self.assertIn('bg-danger', cards)
+        self.assertInHTML('<option value="F" selected>Fechado</option>', filtro)
+
+
+class FacetasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tecnico = get_user_model().objects.create(username='jsilva', first_name='João', is_staff=True)
+        for tipo, status, tecnico in [('Painel', 'A', self.tecnico), ('Painel', 'F', None), ('Rede', 'A', None)]:
+            Ticket.objects.create(nome=tipo, titulo=tipo, descricao=tipo, tipo=tipo, status=status, tecnico=tecnico)
+
+    def test_cada_faceta_ignora_o_proprio_filtro(self):
+        with self.assertNumQueries(7):
+            facetas = contagens(FiltroTickets({'tipo': 'Painel', 'status': 'A'}))
+
+        self.assertEqual(facetas['tipo'], [('Painel', 'Painel', 1), ('Rede', 'Rede', 1)])
+        self.assertEqual(facetas['status'], [('A', 'Aberto', 1), ('F', 'Fechado', 1)])
+        self.assertEqual(facetas['tecnico'], [(str(self.tecnico.pk), 'João (jsilva)', 1)])
+
+    def test_contagens_em_cache_por_combinacao(self):
+        contagens(FiltroTickets({'tipo': 'Rede'}))
+        with self.assertNumQueries(0):
+            contagens(FiltroTickets({'tipo': 'Rede', 'status': 'T'}))
+
+    def test_paginacao_mantem_os_filtros(self):
+        filtro = FiltroTickets({'status': 'A', 'tipo': 'Painel', 'tecnico': 'x', 'de': '2024-01-01', 'ate': 'ontem'})
+
+        self.assertEqual(filtro.pagination_params, '&status=A&tipo=Painel&de=2024-01-01')
+        self.assertEqual(FiltroTickets({}).aplicar(Ticket.objects.all()).count(), 3)
+        self.assertEqual(filtro.aplicar(Ticket.objects.all()).count(), 1)
+
+
+class CacheDetalheTests(TestCase):
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create(username='colaborador')
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', usuario=self.usuario)
+        self.url = reverse('ticket:ticket_detail', args=[ticket.pk])
+        self.client.force_login(self.usuario)
+        self.addCleanup(leituras.descarregar)
+
+    def etag(self):
+        # A primeira resposta cria o cookie do CSRF, que passa a fazer parte da versão
+        self.client.get(self.url)
+        return self.client.get(self.url)['ETag']
+
+    def test_304_enquanto_nada_muda(self):
+        etag = self.etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_escrita_troca_o_etag(self):
+        etag = self.etag()
+        # follow: o redirecionamento exibe o aviso de sucesso, que fica fora do cache
+        self.client.post(self.url, {'enviar_mensagem': '1', 'texto': 'Alguma novidade?'}, follow=True)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_so_muda_com_duplicados_do_proprio_ticket(self):
+        etag = self.etag()
+        Ticket.objects.create(nome='Outro', titulo='Impressora', descricao='Papel atolado na bandeja', tipo='Painel')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        parecido = Ticket.objects.create(nome='Outro', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'#{parecido.pk} - Sem rede')
+
+        # O candidato encerrado sai do painel, e a página em cache também deixa de valer
+        etag = response['ETag']
+        parecido.status = 'F'
+        parecido.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_novo_login_troca_o_etag(self):
+        etag = self.etag()
+        # Novo login: sessão e segredo do CSRF trocados; o token da página em cache não vale mais
+        self.client.force_login(self.usuario)
+        self.client.cookies.pop('csrftoken', None)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class VersaoTicketTests(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.tecnico = User.objects.create(username='tecnico', is_staff=True)
+        self.outro = User.objects.create(username='outro', is_staff=True)
+        self.ticket = Ticket.objects.create(
+            nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel', prioridade='M', tecnico=self.tecnico,
+        )
+        self.addCleanup(leituras.descarregar)
+
+    def formulario(self, **novos):
+        # POST do formulário de particularidades como renderizado na versão 1
+        exibidos = {'status': 'A', 'prioridade': 'M', 'nivel_atendimento': '', 'tecnico': self.tecnico.pk}
+        dados = {'confirmar_btn': 'true', 'versao': 1, **exibidos, **novos}
+        dados.update({f'initial-{campo}': valor for campo, valor in exibidos.items()})
+        return dados
+
+    def alterar(self, usuario, **novos):
+        self.client.force_login(usuario)
+        response = self.client.post(reverse('ticket:ticket_detail', args=[self.ticket.pk]), self.formulario(**novos))
+        return [str(mensagem) for mensagem in get_messages(response.wsgi_request)]
+
+    def test_instancia_desatualizada_nao_sobrescreve(self):
+        antiga = Ticket.objects.get(pk=self.ticket.pk)
+        self.ticket.status = 'EE'
+        self.ticket.save(update_fields=['status'])
+
+        antiga.status = 'EA'
+        with self.assertRaises(ConflitoVersao), transaction.atomic():
+            antiga.save(update_fields=['status'])
+        self.assertEqual(Ticket.objects.get(pk=self.ticket.pk).status, 'EE')
+
+    def test_edicoes_em_campos_diferentes_sao_mescladas(self):
+        self.alterar(self.tecnico, status='EE')
+        self.alterar(self.outro, prioridade='A')
+
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        self.assertEqual((ticket.status, ticket.prioridade, ticket.versao), ('EE', 'A', 3))
+        self.assertEqual(
+            list(HistoricoTicket.objects.values_list('campo', 'valor_anterior', 'valor_novo').order_by('pk')),
+            [('status', 'A', 'EE'), ('prioridade', 'M', 'A')],
+        )
+
+    def test_edicao_conflitante_mantem_o_valor_atual(self):
+        self.alterar(self.tecnico, status='EE')
+        avisos = self.alterar(self.outro, status='EA')
+
+        self.assertEqual(Ticket.objects.get(pk=self.ticket.pk).status, 'EE')
+        self.assertEqual(HistoricoTicket.objects.count(), 1)
+        self.assertIn('Status: alterado por outra pessoa enquanto você editava. O valor atual foi mantido.', avisos)
+
+    def test_aviso_de_conflito_aparece_no_detalhe(self):
+        self.alterar(self.tecnico, status='EE')
+        url = reverse('ticket:ticket_detail', args=[self.ticket.pk])
+        self.client.force_login(self.outro)
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+
+        # Nada foi gravado, então a versão não muda: mesmo assim o aviso não pode virar um 304
+        response = self.client.post(url, self.formulario(status='EA'), follow=True, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'toastr.warning("Status: alterado por outra pessoa enquanto você editava.')
+        self.assertNotIn('ETag', response)
+
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+
+class ReceptorWebhooks(BaseHTTPRequestHandler):
+    """
+    Receptor local: guarda (porta do cliente, cabeçalhos, corpo) e responde com
+    o próximo status da fila; ``'fechar'`` derruba a conexão sem responder e
+    ``'lento'`` responde depois do timeout do despachante.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.recebidos.append((self.client_address[1], self.headers, json.loads(corpo), corpo))
+        resposta = self.server.respostas.pop(0) if self.server.respostas else 200
+        if resposta == 'fechar':
+            self.close_connection = True
+            return
+        if resposta == 'lento':
+            time.sleep(0.5)
+            resposta = 200
+        self.send_response(resposta)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class WebhooksTests(TestCase):
+
+    def setUp(self):
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), ReceptorWebhooks)
+        self.servidor.recebidos, self.servidor.respostas = [], []
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+
+        url = f'http://127.0.0.1:{self.servidor.server_port}/hooks'
+        self.destinos = {
+            'chat': {'url': url, 'eventos': ['criado'], 'segredo': 'segredo', 'lote': 2, 'concorrencia': 1},
+            'monitor': {'url': url},
+        }
+        configuracao = override_settings(WEBHOOKS=self.destinos)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.addCleanup(leituras.descarregar)
+        self.usuario = get_user_model().objects.create(username='solicitante')
+
+    def despachar(self, destinos):
+        despachante = Despachante({nome: self.destinos[nome] for nome in destinos})
+        self.addCleanup(despachante.fechar)
+        # Como o comando: rodadas até não haver eventos vencidos
+        while despachante.ciclo():
+            pass
+        return despachante
+
+    def test_eventos_gravados_na_transacao_do_ticket(self):
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('ticket:create'), {
+            'descricao': 'Não imprime', 'tipo': 'Painel',
+        })
+        self.assertEqual(
+            sorted(EventoSaida.objects.values_list('destino', 'evento')), [('chat', 'criado'), ('monitor', 'criado')]
+        )
+
+        ticket = Ticket.objects.get()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            publicar(EventoSaida.MENSAGEM, ticket, texto='desfeita')
+            raise RuntimeError
+        self.assertFalse(EventoSaida.objects.filter(evento=EventoSaida.MENSAGEM).exists())
+
+    def test_entrega_em_lotes_na_mesma_conexao(self):
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        for _ in range(5):
+            publicar(EventoSaida.CRIADO, ticket)
+
+        despachante = self.despachar(['chat'])
+
+        self.assertEqual(despachante.enviados, 5)
+        self.assertFalse(EventoSaida.objects.filter(destino='chat', enviado_em__isnull=True).exists())
+        self.assertEqual([len(corpo['eventos']) for _, _, corpo, _ in self.servidor.recebidos], [2, 2, 1])
+        self.assertEqual(len({porta for porta, _, _, _ in self.servidor.recebidos}), 1)
+        _, cabecalhos, _, bruto = self.servidor.recebidos[0]
+        assinatura = hmac.new(b'segredo', bruto, hashlib.sha256).hexdigest()
+        self.assertEqual(cabecalhos['X-Webhook-Assinatura'], f'sha256={assinatura}')
+
+    def test_falha_temporaria_reagenda_e_erro_do_cliente_abandona(self):
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        publicar(EventoSaida.STATUS, ticket)
+        self.servidor.respostas = [503]
+        self.despachar(['monitor'])
+
+        evento = EventoSaida.objects.get()
+        self.assertEqual(evento.tentativas, 1)
+        self.assertGreater(evento.proxima_tentativa, timezone.now())
+        self.assertIn('HTTP 503', evento.erro)
+
+        EventoSaida.objects.update(proxima_tentativa=timezone.now())
+        self.servidor.respostas = [400]
+        self.despachar(['monitor'])
+
+        evento.refresh_from_db()
+        self.assertEqual((evento.tentativas, evento.proxima_tentativa, evento.enviado_em), (2, None, None))
+
+    def test_conexao_fechada_sem_resposta_repete_em_outra(self):
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        for _ in range(3):
+            publicar(EventoSaida.CRIADO, ticket)
+        self.servidor.respostas = [200, 'fechar']
+
+        despachante = self.despachar(['chat'])
+
+        self.assertEqual(despachante.enviados, 3)
+        portas = [porta for porta, _, _, _ in self.servidor.recebidos]
+        self.assertEqual(len(portas), 3)
+        self.assertEqual(portas[0], portas[1])
+        self.assertNotEqual(portas[1], portas[2])
+
+    @override_settings(WEBHOOKS_TIMEOUT=0.2)
+    def test_timeout_depois_do_envio_nao_reenvia(self):
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        for _ in range(3):
+            publicar(EventoSaida.CRIADO, ticket)
+        self.servidor.respostas = [200, 'lento']
+
+        despachante = self.despachar(['chat'])
+
+        self.assertEqual((despachante.enviados, despachante.reagendados), (2, 1))
+        self.assertEqual(len(self.servidor.recebidos), 2)
+        self.assertIn('timed out', EventoSaida.objects.get(destino='chat', enviado_em__isnull=True).erro)
+
+    def test_erro_em_um_destino_nao_interrompe_os_outros(self):
+        # Cabeçalho inválido na configuração: ValueError no envio, fora dos erros de rede
+        self.destinos['quebrado'] = {**self.destinos['monitor'], 'cabecalhos': {'X-Token': 'quebrado\n'}}
+        ticket = Ticket.objects.create(nome='Rede', titulo='Rede', descricao='Sem rede', tipo='Painel')
+        publicar(EventoSaida.STATUS, ticket)
+
+        despachante = self.despachar(['quebrado', 'monitor'])
+
+        self.assertEqual((despachante.enviados, despachante.reagendados), (1, 1))
+        self.assertTrue(EventoSaida.objects.get(destino='monitor').enviado_em)
+        self.assertIn('ValueError', EventoSaida.objects.get(destino='quebrado').erro)
@@ -0,0 +1,143 @@
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .leituras import registrar_atividade
+from .models import HistoricoTicket, Ticket
+
+# Peso de cada prioridade; 'N' (Novo, ainda não classificado) entra como Média
+PESOS_PRIORIDADE = {'MA': 5, 'A': 4, 'M': 3, 'N': 3, 'B': 2, 'MB': 1}
+
+# Situações em que um ticket sem técnico aguarda triagem
+STATUS_TRIAGEM = ('A', 'R')
+
+
+class TriagemIndex:
+    """
+    Fila de triagem em memória: um heap por nível de atendimento com os
+    tickets abertos e sem técnico.
+
+    A chave é ``criado_em - peso * TRIAGEM_HORAS_POR_PRIORIDADE``: cada nível
+    de prioridade equivale a um número fixo de horas de espera, então a ordem
+    entre dois tickets não muda com o tempo e o heap nunca precisa ser
+    reordenado. Alterações deste processo chegam pelos signals de ``Ticket``
+    depois do commit; entradas obsoletas são descartadas ao chegarem ao topo
+    (remoção preguiçosa). Tickets gravados por outros workers ou pelo
+    importador entram quando o índice passa de ``TRIAGEM_TTL`` segundos e é
+    relido do banco; fora isso, nem uma fila vazia consulta o banco.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heaps = {}
+        self.entradas = {}
+        self.carregado_em = None
+
+    def chave(self, prioridade, criado_em):
+        horas = getattr(settings, 'TRIAGEM_HORAS_POR_PRIORIDADE', 24)
+        peso = PESOS_PRIORIDADE.get(prioridade, PESOS_PRIORIDADE['N'])
+        return criado_em.timestamp() - peso * horas * 3600
+
+    def elegivel(self, ticket):
+        return ticket.ativo and ticket.tecnico_id is None and ticket.status in STATUS_TRIAGEM
+
+    def carregar(self):
+        self.heaps = {}
+        self.entradas = {}
+        tickets = Ticket.objects.filter(
+            ativo=True, tecnico__isnull=True, status__in=STATUS_TRIAGEM
+        ).values_list('pk', 'prioridade', 'criado_em', 'nivel_atendimento')
+
+        for ticket_id, prioridade, criado_em, nivel in tickets.iterator():
+            chave = self.chave(prioridade, criado_em)
+            self.entradas[ticket_id] = (chave, nivel)
+            self.heaps.setdefault(nivel, []).append((chave, ticket_id))
+
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+        self.carregado_em = time.monotonic()
+
+    def vencido(self):
+        ttl = getattr(settings, 'TRIAGEM_TTL', 60)
+        return self.carregado_em is None or time.monotonic() - self.carregado_em > ttl
+
+    def atualizar(self, ticket):
+        with self.lock:
+            # Antes da primeira consulta não há índice; a carga inicial lerá o banco
+            if self.carregado_em is None:
+                return
+            if not self.elegivel(ticket):
+                self.entradas.pop(ticket.pk, None)
+                return
+
+            entrada = (self.chave(ticket.prioridade, ticket.criado_em), ticket.nivel_atendimento)
+            if self.entradas.get(ticket.pk) == entrada:
+                return
+            self.entradas[ticket.pk] = entrada
+            heapq.heappush(self.heaps.setdefault(entrada[1], []), (entrada[0], ticket.pk))
+
+    def remover(self, ticket_id):
+        with self.lock:
+            self.entradas.pop(ticket_id, None)
+
+    def topo(self, nivel):
+        heap = self.heaps.get(nivel, [])
+        while heap and self.entradas.get(heap[0][1]) != (heap[0][0], nivel):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def candidatos(self, niveis):
+        candidatos = []
+        for nivel in (self.heaps.keys() if niveis is None else niveis):
+            topo = self.topo(nivel)
+            if topo is not None:
+                candidatos.append((topo, nivel))
+        return candidatos
+
+    def retirar(self, niveis=None):
+        """Remove e devolve o id do ticket mais urgente entre os níveis informados."""
+        with self.lock:
+            if self.vencido():
+                self.carregar()
+
+            candidatos = self.candidatos(niveis)
+            if not candidatos:
+                return None
+
+            (_, ticket_id), nivel = min(candidatos)
+            heapq.heappop(self.heaps[nivel])
+            del self.entradas[ticket_id]
+            return ticket_id
+
+    def reivindicar(self, usuario, niveis=None):
+        """
+        Atribui ao usuário o próximo ticket da fila.
+
+        A atribuição é um UPDATE condicional: se outro worker já levou o
+        ticket, a entrada é descartada e o próximo da fila é tentado.
+        """
+        while True:
+            ticket_id = self.retirar(niveis)
+            if ticket_id is None:
+                return None
+
+            with transaction.atomic():
+                atribuidos = Ticket.objects.filter(
+                    pk=ticket_id, ativo=True, tecnico__isnull=True, status__in=STATUS_TRIAGEM
+                ).update(tecnico=usuario, atualizado_em=timezone.now(), versao=F('versao') + 1)
+
+                if atribuidos:
+                    ticket = Ticket.objects.get(pk=ticket_id)
+                    ticket.add_historico(
+                        usuario, HistoricoTicket.ATRIBUICAO_TRIAGEM, campo='tecnico', novo=usuario.get_username()
+                    )
+                    registrar_atividade(ticket, usuario)
+                    return ticket
+
+
+triagem = TriagemIndex()
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    CreateTicketView, DashboardView, TicketDetailView, CustomLoginView
+    CreateTicketView, DashboardView, TicketDetailView, CustomLoginView, ProximoTicketView, DuplicadosView,
+    NaoLidosView, BuscarUsuariosView,
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncCreateTicketView as CreateTicketView,
+        AsyncDashboardView as DashboardView,
+        AsyncTicketDetailView as TicketDetailView,
+    )
+
 app_name = 'ticket'
 
 urlpatterns = [
@@ -10,5 +19,9 @@ urlpatterns = [
     path('suporte-ticket/', CreateTicketView.as_view(), name='create'),
     path('tickets/<int:ticket_id>/', TicketDetailView.as_view(), name='ticket_detail'),
     path('tickets/<int:ticket_id>/enviar_mensagem/', TicketDetailView.as_view(), name='send_message'),
+    path('nao-lidos/', NaoLidosView.as_view(), name='nao_lidos'),
+    path('usuarios/buscar/', BuscarUsuariosView.as_view(), name='buscar_usuarios'),
+    path('duplicados/', DuplicadosView.as_view(), name='duplicados'),
+    path('triagem/proximo/', ProximoTicketView.as_view(), name='proximo_ticket'),
     path('login/', CustomLoginView.as_view(), name='login'),
 ]
@@ -1,8 +1,8 @@
+import hashlib
 import os
-import locale
 from datetime import datetime
 from django.contrib import messages
-from django.utils import timezone
+from django.utils import timezone, dateformat
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import View, CreateView, ListView, FormView
 from django.contrib.auth import authenticate, login
@@ -11,17 +11,45 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.utils.decorators import method_decorator
 from django.contrib.auth import get_user_model
 from django.contrib.auth.views import LoginView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.utils.text import slugify
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.db import transaction
+from django.db.models import Func, IntegerField, OuterRef, Subquery
 
-from .models import HistoricoTicket, Ticket, Mensagem
+from .models import BandaLSH, ConflitoVersao, EventoSaida, HistoricoTicket, Ticket, Mensagem
 from .forms import TicketForm, TicketStatusForm
+from .triagem import triagem
+from . import duplicados, facetas, webhooks
+from .busca_usuarios import indice_usuarios
+from .leituras import leituras, marcar_nao_lidos, nao_lidos, registrar_atividade
+from apps.base.routers import ler_da_replica
 
-locale.setlocale(locale.LC_TIME, 'pt_BR.utf8')
 CustomUser = get_user_model()
 
+# Opções do filtro do dashboard: 'T' (todos) seguido dos status do ticket
+STATUS_FILTRO = [('T', 'Todos'), *Ticket.STATUS_CHOICES]
+
+# Regravações sobre a versão atual quando outra gravação chega no meio
+TENTATIVAS_VERSAO = 3
+
+
+def versao_vista(request):
+    """Versão do ticket na página que enviou o POST (input oculto ``versao``)."""
+    try:
+        return int(request.POST['versao'])
+    except (KeyError, ValueError):
+        return None
+
+
+def iguais(a, b):
+    # '' e None são o mesmo valor vazio nos selects do formulário
+    return (a or None) == (b or None)
+
+
 def resolve_user(user):
     if isinstance(user, CustomUser):
         return user
@@ -38,22 +66,34 @@ class CreateTicketView(CreateView):
         if self.request.session.get('ticket_saved'):
             return redirect(self.success_url)
         
-        ticket = form.save(commit=False)
-        ticket.usuario = self.request.user
-        ticket.save()
-        
-        messages.success(self.request, 'Ticket criado com sucesso!')
-
-        if 'anexo' in self.request.FILES:
-            file_extension = os.path.splitext(self.request.FILES['anexo'].name)[1]
-            new_filename = f"{ticket.pk}_{slugify(ticket.usuario.get_full_name())}_" \
-                           f"{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
-            self.request.FILES['anexo'].name = new_filename
-            ticket.anexo = self.request.FILES['anexo']
-            ticket.url = ticket.anexo
+        # Ticket e evento de saída na mesma transação
+        with transaction.atomic():
+            ticket = form.save(commit=False)
+            ticket.usuario = self.request.user
+            ticket.save()
+
+            if 'anexo' in self.request.FILES:
+                file_extension = os.path.splitext(self.request.FILES['anexo'].name)[1]
+                new_filename = f"{ticket.pk}_{slugify(ticket.usuario.get_full_name())}_" \
+                               f"{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
+                self.request.FILES['anexo'].name = new_filename
+                ticket.anexo = self.request.FILES['anexo']
+                ticket.url = ticket.anexo
+
+            ticket.save()
+            webhooks.publicar(
+                EventoSaida.CRIADO, ticket, usuario=ticket.usuario.get_username(),
+                tipo=ticket.tipo, prioridade=ticket.prioridade,
+            )
+        registrar_atividade(ticket, self.request.user)
 
-        ticket.save()
+        messages.success(self.request, 'Ticket criado com sucesso!')
         self.request.session['ticket_saved'] = True
+
+        similares = duplicados.provaveis_duplicados(ticket, limite=3)
+        if similares:
+            ids = ', '.join(f'#{similar.pk}' for similar, _ in similares)
+            messages.info(self.request, f'Possíveis tickets duplicados em aberto: {ids}.')
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
@@ -66,28 +106,42 @@ class CreateTicketView(CreateView):
         return super().get(request, *args, **kwargs)
 
 
+class ReplicaReadMixin:
+    """Envia as leituras de GET/HEAD da view para a réplica (ver apps/base/routers.py)."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with ler_da_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+def marcar_recentes(tickets):
+    # Calculado só para os tickets exibidos, sem gravar no banco
+    recentemente = timezone.now() - timezone.timedelta(days=7)
+    for ticket in tickets:
+        ticket.recently_updated = ticket.atualizado_em >= recentemente
+
+
 @method_decorator(login_required, name='dispatch')
-class DashboardView(ListView):
+class DashboardView(ReplicaReadMixin, ListView):
     model = Ticket
     template_name = 'ticket/dashboard.html'
     context_object_name = 'tickets'
     paginate_by = 6  # Define o número padrão para paginação
 
-    def get_queryset(self):
-        # Obtém o status do filtro
-        status = self.request.GET.get('status', 'T')
-        
-        # Filtra os tickets pelo status
-        tickets = Ticket.objects.all() if status == 'T' else Ticket.objects.filter(status=status)
-        tickets = tickets.order_by('-criado_em')
+    # Painel de facetas com contagens; desligado em listas com queryset próprio
+    facetado = True
 
-        # Marca os tickets atualizados recentemente
-        recentemente = timezone.now() - timezone.timedelta(days=7)
-        for ticket in tickets:
-            ticket.recently_updated = ticket.atualizado_em >= recentemente
-            ticket.save(update_fields=['recently_updated'])
+    def get_filtro(self):
+        if not hasattr(self, 'filtro'):
+            self.filtro = facetas.FiltroTickets(self.request.GET)
+        return self.filtro
 
-        return tickets
+    def get_queryset(self):
+        # Filtros combináveis: status, tipo, subtipo, prioridade, técnico, nível e período
+        tickets = self.get_filtro().aplicar(Ticket.objects.all())
+        return tickets.select_related('usuario', 'tecnico').order_by('-criado_em')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -99,122 +153,198 @@ class DashboardView(ListView):
         paginator = Paginator(tickets, self.paginate_by)
         page_number = self.request.GET.get('page')
         page_obj = paginator.get_page(page_number)
+        marcar_recentes(page_obj)
+        marcar_nao_lidos(page_obj, self.request.user)
 
         # Adiciona o filtro de status e outras informações ao contexto
         context['tickets'] = page_obj
         context['page_obj'] = page_obj
         context['paginator'] = paginator
         context['selected_status'] = self.request.GET.get('status', 'T')
+        context['status_filtro'] = STATUS_FILTRO
         context['referer'] = self.request.META.get('HTTP_REFERER', '/')
 
-        # Mantém o filtro nos links de paginação
-        context['pagination_params'] = f"&status={context['selected_status']}"
+        # Contagens por faceta e filtros mantidos nos links de paginação
+        if self.facetado:
+            context.update(facetas.contexto(self.get_filtro()))
 
         return context
 
-    
+
+@method_decorator(login_required, name='dispatch')
+class NaoLidosView(DashboardView):
+    """Tickets com atividade que o usuário ainda não viu."""
+
+    facetado = False
+
+    def get_queryset(self):
+        return nao_lidos(self.request.user).select_related('usuario', 'tecnico').order_by('-atualizado_em')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['nao_lidos'] = True
+        context['pagination_params'] = ''
+        return context
+
+
 @method_decorator(login_required, name='dispatch')
 class TicketDetailView(View):
 
     def get(self, request, ticket_id):
-        ticket = get_object_or_404(Ticket, id=ticket_id)
-        if ticket.tecnico == request.user and ticket.atualizado_tecnico:
-            ticket.atualizado_tecnico = False
-        elif ticket.usuario == request.user and ticket.atualizado_colaborador:
-            ticket.atualizado_colaborador = False
-        ticket.save(update_fields=['atualizado_tecnico', 'atualizado_colaborador'])
+        ticket = get_object_or_404(self.get_ticket_queryset(), id=ticket_id)
+
+        # Leitura agrupada no buffer; nenhuma escrita no ticket ao abrir a página
+        leituras.marcar_vista(request.user.pk, ticket.pk, ticket.ultima_mensagem_id)
+
+        # Responde 304 sem consultar mensagens/histórico nem renderizar templates
+        versao = None if self.tem_avisos(request) else self.get_versao(ticket, request)
+        if versao is not None:
+            response = get_conditional_response(request, etag=versao['etag'], last_modified=versao['last_modified'])
+            if response is not None:
+                return self.aplicar_versao(response, versao)
 
         form = TicketStatusForm(instance=ticket)
         mensagens = Mensagem.objects.filter(ticket=ticket).order_by('criado_em')
         historico_list = HistoricoTicket.objects.filter(ticket=ticket).order_by('data_criacao')
 
         context = self.get_context_data(ticket, form, historico_list, mensagens)
-        return render(request, 'ticket/ticket_detail.html', context)
+        context['duplicados'] = duplicados.provaveis_duplicados(ticket)
+        return self.aplicar_versao(render(request, 'ticket/ticket_detail.html', context), versao)
+
+    def get_ticket_queryset(self):
+        # Ids da última mensagem e do último histórico compõem a versão da página, assim como
+        # as bandas LSH que o ticket compartilha: um candidato a duplicado que entra, sai ou
+        # muda de texto troca a última banda ou a contagem, e o resto da base não interfere
+        bandas_candidatas = BandaLSH.objects.filter(
+            chave__in=BandaLSH.objects.filter(ticket=OuterRef(OuterRef('pk'))).values('chave')
+        ).order_by()
+        return Ticket.objects.select_related('usuario', 'tecnico').annotate(
+            ultima_mensagem_id=Subquery(
+                Mensagem.objects.filter(ticket=OuterRef('pk')).order_by('-pk').values('pk')[:1]
+            ),
+            ultimo_historico_id=Subquery(
+                HistoricoTicket.objects.filter(ticket=OuterRef('pk')).order_by('-pk').values('pk')[:1]
+            ),
+            ultima_banda_id=Subquery(bandas_candidatas.order_by('-pk').values('pk')[:1]),
+            total_bandas=Subquery(
+                bandas_candidatas.annotate(total=Func('pk', function='COUNT', output_field=IntegerField()))
+                .values('total')
+            ),
+        )
+
+    def get_versao(self, ticket, request):
+        # A página varia por usuário (mensagens próprias, formulário), então ele entra no ETag,
+        # assim como a sessão e o segredo do CSRF embutido nos formulários: um novo login os
+        # troca, e a página em cache do navegador levaria um token que não vale mais
+        session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+        sessao = hashlib.md5(f'{session_key}-{request.META.get("CSRF_COOKIE", "")}'.encode()).hexdigest()[:12]
+        etag = quote_etag(
+            f'{ticket.pk}-{ticket.versao}-{request.user.pk}-{sessao}-{ticket.atualizado_em.timestamp()}-'
+            f'{ticket.ultima_mensagem_id or 0}-{ticket.ultimo_historico_id or 0}-'
+            f'{ticket.ultima_banda_id or 0}-{ticket.total_bandas or 0}'
+        )
+        return {'etag': etag, 'last_modified': int(ticket.atualizado_em.timestamp())}
+
+    def tem_avisos(self, request):
+        # Avisos pendentes (ex.: edição em conflito) saem nesta renderização: sem 304, e a página
+        # vai sem versão, para o navegador não reaproveitá-la depois com o aviso embutido
+        return len(messages.get_messages(request)) > 0
+
+    def aplicar_versao(self, response, versao):
+        if versao is not None:
+            response.headers.setdefault('ETag', versao['etag'])
+            response.headers.setdefault('Last-Modified', http_date(versao['last_modified']))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     def post(self, request, ticket_id):
         ticket = get_object_or_404(Ticket, id=ticket_id)
 
-        # Captura os valores anteriores
-        status_anterior = ticket.status
-        prioridade_anterior = ticket.prioridade
-        nivel_anterior = ticket.nivel_atendimento
-        tecnico_anterior = ticket.tecnico
-
         # Inicializa o formulário apenas se 'confirmar_btn' estiver no POST
         form = TicketStatusForm(request.POST, instance=ticket) if 'confirmar_btn' in request.POST else None
         if form and form.is_valid():
-            # Passa os valores anteriores ao chamar form_valid
-            return self.form_valid(form, ticket, request, status_anterior, prioridade_anterior, nivel_anterior, tecnico_anterior)
+            return self.form_valid(form, ticket, request)
         
         return self.handle_ticket_actions(request, ticket)
 
-
-    def form_valid(self, form, ticket, request, status_anterior, prioridade_anterior, nivel_anterior, tecnico_anterior):
-        ticket = form.save(commit=False)
-
-        # Obter os valores atuais após a alteração
-        status_atual = ticket.get_status_display()
-        prioridade_atual = ticket.get_prioridade_display()
-        nivel_atual = ticket.get_nivel_atendimento_display()
-        tecnico_atual = ticket.tecnico
-
-        # Obter os nomes dos valores anteriores
-        status_anterior_nome = dict(Ticket.STATUS_CHOICES).get(status_anterior, status_anterior)
-        prioridade_anterior_nome = dict(Ticket.PRIORIDADE_CHOICES).get(prioridade_anterior, prioridade_anterior)
-        nivel_anterior_nome = dict(Ticket.NIVEL_ATENDIMENTO_CHOICES).get(nivel_anterior, nivel_anterior)
-
-        # Variável para armazenar o histórico e mensagens de notificação
-        novo_historico = []
-        agora = timezone.now().strftime("%d/%m/%Y %H:%M:%S")
-
-        # Verificação de alterações e adição ao histórico e às mensagens
-        if status_anterior != ticket.status:
-            novo_historico.append(
-                f'Status do ticket alterado de "{status_anterior_nome}" para "{status_atual}" em {agora}'
-            )
-            messages.success(request, f'Status do ticket alterado para "{status_atual}".')
-
-        if prioridade_anterior != ticket.prioridade:
-            novo_historico.append(
-                f'Prioridade do ticket alterada de "{prioridade_anterior_nome}" para "{prioridade_atual}" em {agora}'
-            )
-            messages.success(request, f'Prioridade do ticket alterada para "{prioridade_atual}".')
-
-        if nivel_anterior != ticket.nivel_atendimento:
-            novo_historico.append(
-                f'Nível de atendimento alterado de "{nivel_anterior_nome}" para "{nivel_atual}" em {agora}'
-            )
-            messages.success(request, f'Nível de atendimento alterado para "{nivel_atual}".')
-
-        if tecnico_anterior != tecnico_atual:
-            novo_historico.append(
-                f'Técnico responsável alterado de "{tecnico_anterior}" para "{tecnico_atual}" em {agora}'
-            )
-            messages.success(request, f'Técnico responsável alterado para "{tecnico_atual}".')
-
-        # Adicionar histórico ao ticket
-        for entry in novo_historico:
-            ticket.add_historico(entry, request.user)
-
-        # Atualizar o campo de atualização recente e flags de colaboração
-        ticket.atualizado_em = timezone.now()
-        if ticket.tecnico == request.user:
-            ticket.atualizado_colaborador = True
-        else:
-            ticket.atualizado_tecnico = True
-
-        # Salvar as mudanças no ticket
-        ticket.save(update_fields=[
-            'status',
-            'prioridade',
-            'nivel_atendimento',
-            'tecnico',
-            'atualizado_em',
-            'atualizado_tecnico',
-            'atualizado_colaborador'
-        ])
-
+    def gravar_versionado(self, request, ticket, gravar):
+        """
+        Executa ``gravar(ticket)`` (alterações, save e histórico) em uma
+        transação. Se outra gravação chegou antes (ConflitoVersao), recarrega o
+        ticket e executa de novo sobre a versão atual.
+        """
+        for _ in range(TENTATIVAS_VERSAO):
+            try:
+                with transaction.atomic():
+                    return gravar(ticket)
+            except ConflitoVersao:
+                ticket = Ticket.objects.get(pk=ticket.pk)
+
+        messages.error(request, 'O ticket está sendo alterado por outras pessoas. Tente novamente.')
         return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+    def form_valid(self, form, ticket, request):
+        versao = versao_vista(request)
+        novos = {campo: form.cleaned_data.get(campo) for campo in form.CAMPOS_MESCLAVEIS}
+
+        def gravar(ticket):
+            aplicar, conflitos = dict(novos), []
+            if versao is not None and ticket.versao != versao:
+                # Gravado por outra pessoa depois da página: vale só o que este
+                # usuário mudou; se os dois mudaram o mesmo campo, mantém o atual
+                for campo in form.CAMPOS_MESCLAVEIS:
+                    gravado = getattr(ticket, campo)
+                    if campo not in form.changed_data or iguais(gravado, novos[campo]):
+                        del aplicar[campo]
+                    elif not iguais(gravado, form.valor_exibido(campo)):
+                        del aplicar[campo]
+                        conflitos.append(campo)
+
+            # Histórico com os valores gravados de fato, não os exibidos na página
+            novo_historico = []
+            for campo, atual in aplicar.items():
+                anterior = getattr(ticket, campo)
+                if iguais(anterior, atual):
+                    continue
+                if campo == 'tecnico':
+                    anterior = anterior.get_username() if anterior else ''
+                    atual = atual.get_username() if atual else ''
+                novo_historico.append(
+                    ticket.novo_historico(request.user, HistoricoTicket.ALTERACAO, campo=campo, anterior=anterior, novo=atual)
+                )
+
+            for campo, valor in aplicar.items():
+                setattr(ticket, campo, valor)
+            if aplicar:
+                ticket.atualizado_em = timezone.now()
+                ticket.save(update_fields=[*aplicar, 'atualizado_em'])
+            HistoricoTicket.objects.bulk_create(novo_historico)
+            for historico in novo_historico:
+                if historico.campo == 'status':
+                    webhooks.publicar(
+                        EventoSaida.STATUS, ticket, usuario=request.user.get_username(),
+                        anterior=historico.valor_anterior, novo=historico.valor_novo,
+                    )
+            if novo_historico:
+                registrar_atividade(ticket, request.user)
+
+            notificacoes = {
+                'status': f'Status do ticket alterado para "{ticket.get_status_display()}".',
+                'prioridade': f'Prioridade do ticket alterada para "{ticket.get_prioridade_display()}".',
+                'nivel_atendimento': f'Nível de atendimento alterado para "{ticket.get_nivel_atendimento_display()}".',
+                'tecnico': f'Técnico responsável alterado para "{ticket.tecnico}".',
+            }
+            for historico in novo_historico:
+                messages.success(request, notificacoes[historico.campo])
+            if conflitos:
+                campos = ', '.join(facetas.ROTULOS[campo] for campo in conflitos)
+                messages.warning(
+                    request, f'{campos}: alterado por outra pessoa enquanto você editava. O valor atual foi mantido.'
+                )
+            return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+        # O form já aplicou os valores do POST nesta instância; parte da linha gravada
+        return self.gravar_versionado(request, Ticket.objects.get(pk=ticket.pk), gravar)
     
     def atualiza_detalhes(self, request, ticket):
         form = TicketStatusForm(instance=ticket)
@@ -234,7 +364,7 @@ class TicketDetailView(View):
             elif 'confirmar_btn' in request.POST:  # Permitir alterações via formulário
                 form = TicketStatusForm(request.POST, instance=ticket)
                 if form.is_valid():
-                    return self.form_valid(form, ticket, request, ticket.status, ticket.prioridade, ticket.nivel_atendimento, ticket.tecnico)
+                    return self.form_valid(form, ticket, request)
                 else:
                     messages.warning(request, 'Não foi possível salvar as alterações. Verifique os dados.')
                     return redirect('ticket:ticket_detail', ticket_id=ticket.id)
@@ -255,8 +385,16 @@ class TicketDetailView(View):
 
     def encerrar_ticket(self, request, ticket, is_tecnico):
         novo_comentario = request.POST.get('conclusao')
-        if novo_comentario:
-            agora = timezone.now().strftime("%d/%m/%Y %H:%M:%S")
+        if not novo_comentario:
+            return redirect('ticket:dashboard')
+        versao = versao_vista(request)
+
+        def gravar(ticket):
+            if ticket.encerrado and ticket.versao != versao:
+                messages.warning(request, 'O ticket já foi concluído por outra pessoa.')
+                return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+            agora = dateformat.format(timezone.localtime(), "d/m/Y H:i:s")
             novo_comentario_formatado = f"-----------------\n[{agora}]\n{novo_comentario}".strip()
             
             # Adiciona o novo comentário à conclusão anterior, se houver
@@ -266,80 +404,84 @@ class TicketDetailView(View):
             else:
                 ticket.conclusao = novo_comentario_formatado
 
-            # Adiciona ao histórico do ticket
-            ticket.add_historico(f'Conclusão: {novo_comentario}', request.user)
-            
             # Atualiza os campos do ticket para indicar conclusão
             ticket.data_conclusao = timezone.now()
             ticket.ativo = False
             ticket.status = 'C'
 
-            # Verifica o tipo de usuário para definir flags de atualização
-            if is_tecnico:
-                ticket.atualizado_colaborador = True
-            else:
-                ticket.atualizado_tecnico = True
-
-            # Salva as mudanças
-            ticket.save(update_fields=['conclusao', 'data_conclusao', 'ativo', 'status', 'atualizado_tecnico', 'atualizado_colaborador'])
+            # Salva as mudanças e adiciona ao histórico do ticket
+            ticket.save(update_fields=['conclusao', 'data_conclusao', 'ativo', 'status', 'atualizado_em'])
+            ticket.add_historico(request.user, HistoricoTicket.CONCLUSAO, mensagem=novo_comentario)
+            webhooks.publicar(
+                EventoSaida.CONCLUIDO, ticket, usuario=request.user.get_username(), conclusao=novo_comentario
+            )
+            registrar_atividade(ticket, request.user)
             
             # Adiciona uma mensagem de sucesso para o Toastr
             messages.success(request, 'Ticket concluído com sucesso!')
+            return redirect('ticket:dashboard')
 
-        return redirect('ticket:dashboard')
+        return self.gravar_versionado(request, ticket, gravar)
 
 
 
     def ativar_ticket(self, request, ticket, is_tecnico):
-        ticket.data_conclusao = None
-        ticket.ativo = True
-        ticket.status = 'R'
-        
-        # Adiciona um histórico indicando que o ticket foi reativado
-        ticket.add_historico("Ticket reativado", request.user)
-        
-        # Define flags de atualização com base no tipo de usuário
-        if is_tecnico:
-            ticket.atualizado_colaborador = True
-        else:
-            ticket.atualizado_tecnico = True
-
-        # Salva as mudanças no ticket
-        ticket.save(update_fields=['data_conclusao', 'ativo', 'status', 'atualizado_tecnico', 'atualizado_colaborador'])
-        
-        # Adiciona uma mensagem de sucesso para o Toastr
-        messages.success(request, 'Ticket reativado com sucesso!')
+        versao = versao_vista(request)
 
-        return redirect('ticket:dashboard')
+        def gravar(ticket):
+            if not ticket.encerrado and ticket.versao != versao:
+                messages.warning(request, 'O ticket já foi reativado por outra pessoa.')
+                return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+            status_anterior = ticket.status
+            ticket.data_conclusao = None
+            ticket.ativo = True
+            ticket.status = 'R'
+            
+            # Salva as mudanças e adiciona um histórico indicando que o ticket foi reativado
+            ticket.save(update_fields=['data_conclusao', 'ativo', 'status', 'atualizado_em'])
+            ticket.add_historico(request.user, HistoricoTicket.REATIVACAO)
+            webhooks.publicar(
+                EventoSaida.STATUS, ticket, usuario=request.user.get_username(), anterior=status_anterior, novo=ticket.status
+            )
+            registrar_atividade(ticket, request.user)
+            
+            # Adiciona uma mensagem de sucesso para o Toastr
+            messages.success(request, 'Ticket reativado com sucesso!')
+            return redirect('ticket:dashboard')
+
+        return self.gravar_versionado(request, ticket, gravar)
 
 
     def enviar_mensagem(self, request, ticket):
         texto = request.POST.get('texto')
-        if texto:
+        if not texto:
+            messages.warning(request, 'A mensagem não pode estar vazia.')
+            return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+        versao = versao_vista(request)
+
+        def gravar(ticket):
+            # Mensagens não conflitam entre si; só o encerramento no meio tempo impede o envio
+            if ticket.encerrado and versao is not None and ticket.versao != versao:
+                messages.warning(request, 'O ticket foi concluído por outra pessoa. A mensagem não foi enviada.')
+                return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
             # Cria a mensagem associada ao ticket
-            Mensagem.objects.create(ticket=ticket, autor=request.user, texto=texto)
-            
-            # Marca o ticket como atualizado recentemente
+            mensagem = Mensagem.objects.create(ticket=ticket, autor=request.user, texto=texto)
+
+            # Marca o ticket como atualizado e pendente de leitura para os demais participantes
             ticket.atualizado_em = timezone.now()
-            ticket.recently_updated = True
-            
-            # Define as flags `atualizado_tecnico` ou `atualizado_colaborador` com base no usuário atual
-            if request.user == ticket.tecnico:
-                ticket.atualizado_colaborador = True
-                ticket.atualizado_tecnico = False  # Resetando para evitar duplicidade
-            elif request.user == ticket.usuario:
-                ticket.atualizado_tecnico = True
-                ticket.atualizado_colaborador = False  # Resetando para evitar duplicidade
-            
+            ticket.save(update_fields=['atualizado_em'])
+            webhooks.publicar(
+                EventoSaida.MENSAGEM, ticket, mensagem=mensagem.pk, autor=request.user.get_username(), texto=texto
+            )
+            registrar_atividade(ticket, request.user, mensagem.pk)
+
             # Adiciona a mensagem de sucesso para o Toastr
             messages.success(request, 'Mensagem enviada com sucesso!')
-            
-            # Salva as mudanças no ticket
-            ticket.save(update_fields=['atualizado_em', 'recently_updated', 'atualizado_tecnico', 'atualizado_colaborador'])
-        else:
-            messages.warning(request, 'A mensagem não pode estar vazia.')
-        
-        return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+            return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+        return self.gravar_versionado(request, ticket, gravar)
 
 
     def get_context_data(self, ticket, form, historico_list, mensagens):
@@ -351,6 +493,63 @@ class TicketDetailView(View):
             'is_closed': ticket.status == 'F',  # Indica se o ticket está fechado
         }
 
+@method_decorator(login_required, name='dispatch')
+class ProximoTicketView(View):
+
+    def post(self, request):
+        if not request.user.is_staff:
+            messages.warning(request, 'Somente técnicos podem puxar tickets da fila de triagem.')
+            return redirect('ticket:dashboard')
+
+        nivel = request.POST.get('nivel')
+        ticket = triagem.reivindicar(request.user, [nivel] if nivel else None)
+        if ticket is None:
+            messages.info(request, 'Nenhum ticket aguardando triagem.')
+            return redirect('ticket:dashboard')
+
+        messages.success(request, f'Ticket "{ticket.titulo}" atribuído a você.')
+        return redirect('ticket:ticket_detail', ticket_id=ticket.id)
+
+
+@method_decorator(login_required, name='dispatch')
+class DuplicadosView(View):
+    """Prováveis duplicados de um texto, consultado pelo formulário de criação."""
+
+    def get(self, request):
+        resultados = duplicados.buscar(request.GET.get('texto', ''))
+        return JsonResponse({'duplicados': [
+            {
+                'id': ticket.pk,
+                'titulo': ticket.titulo,
+                'descricao': ticket.descricao[:120],
+                'similaridade': round(valor, 2),
+                'url': reverse('ticket:ticket_detail', args=[ticket.pk]),
+            }
+            for ticket, valor in resultados
+        ]})
+
+
+@method_decorator(login_required, name='dispatch')
+class BuscarUsuariosView(View):
+    """Usuários por prefixo no formato do select2 (``term`` e ``page``)."""
+
+    por_pagina = 20
+
+    def get(self, request):
+        try:
+            pagina = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            pagina = 1
+
+        resultados, ha_mais = indice_usuarios.buscar(
+            request.GET.get('term', ''), inicio=(pagina - 1) * self.por_pagina, limite=self.por_pagina
+        )
+        return JsonResponse({
+            'results': [{'id': usuario_id, 'text': texto} for usuario_id, texto in resultados],
+            'pagination': {'more': ha_mais},
+        })
+
+
 class CustomLoginView(LoginView):
     template_name = 'ticket/login.html'
     redirect_authenticated_user = True
@@ -0,0 +1,234 @@
+"""
+Eventos de tickets enviados a webhooks (chat, monitoramento).
+
+Caixa de saída transacional: ``publicar`` grava um ``EventoSaida`` por destino
+inscrito na mesma transação da alteração do ticket, então a requisição não
+espera nenhum serviço externo e um evento só existe se a alteração foi
+confirmada. O comando ``despachar_webhooks`` entrega os pendentes em lotes
+(``{"eventos": [...]}`` por POST), com até ``concorrencia`` envios simultâneos
+por destino, cada um em uma conexão HTTP persistente reaproveitada entre os
+lotes. Falhas de rede, 408, 429 e 5xx voltam para a fila com espera
+exponencial; outros 4xx abandonam o evento.
+
+A entrega é pelo menos uma vez e sem ordem garantida entre lotes: cada evento
+leva ``id`` e ``criado_em`` para o receptor descartar repetições.
+
+Destinos em ``WEBHOOKS``::
+
+    WEBHOOKS = {
+        'chat': {
+            'url': 'https://chat.exemplo/hooks/tickets',
+            'eventos': ['criado', 'concluido'],  # None ou ausente: todos
+            'segredo': '...',  # opcional, assina o corpo (X-Webhook-Assinatura)
+            'lote': 50,
+            'concorrencia': 2,
+        },
+    }
+"""
+import hashlib
+import hmac
+import json
+import queue
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EventoSaida
+
+# Respostas que valem nova tentativa; os demais erros 4xx não mudam repetindo
+STATUS_REPETIR = {408, 425, 429}
+
+
+def destinos():
+    return getattr(settings, 'WEBHOOKS', {})
+
+
+def publicar(evento, ticket, **dados):
+    """Enfileira o evento para os destinos inscritos; chamar dentro da transação da alteração."""
+    inscritos = [
+        nome for nome, destino in destinos().items()
+        if destino.get('eventos') is None or evento in destino['eventos']
+    ]
+    if not inscritos:
+        return
+    dados = {'ticket': ticket.pk, 'titulo': ticket.titulo, 'status': ticket.status, **dados}
+    EventoSaida.objects.bulk_create([EventoSaida(destino=nome, evento=evento, dados=dados) for nome in inscritos])
+
+
+class PoolConexoes:
+    """
+    Conexões keep-alive de um destino. Cada envio pega uma conexão livre (ou
+    abre outra) e a devolve depois de ler a resposta; o número de conexões
+    fica limitado pelo número de threads do destino.
+    """
+
+    def __init__(self, url, timeout):
+        partes = urlsplit(url)
+        self.classe = HTTPSConnection if partes.scheme == 'https' else HTTPConnection
+        self.host = partes.netloc
+        self.caminho = (partes.path or '/') + (f'?{partes.query}' if partes.query else '')
+        self.timeout = timeout
+        self.livres = queue.LifoQueue()
+
+    def conexao(self):
+        try:
+            return self.livres.get_nowait(), True
+        except queue.Empty:
+            return self.classe(self.host, timeout=self.timeout), False
+
+    def post(self, corpo, cabecalhos):
+        """(status, cabeçalhos, corpo) da resposta; levanta OSError/HTTPException em falha de rede."""
+        conexao, reaproveitada = self.conexao()
+        try:
+            try:
+                conexao.request('POST', self.caminho, corpo, cabecalhos)
+                resposta = conexao.getresponse()
+            except (BrokenPipeError, ConnectionResetError):
+                # Inclui RemoteDisconnected: o servidor fechou a conexão ociosa sem responder.
+                # Só esse caso repete, uma vez e em conexão nova; um timeout depois do envio não.
+                if not reaproveitada:
+                    raise
+                conexao.close()
+                conexao = self.classe(self.host, timeout=self.timeout)
+                conexao.request('POST', self.caminho, corpo, cabecalhos)
+                resposta = conexao.getresponse()
+            conteudo = resposta.read()
+        except (OSError, HTTPException):
+            conexao.close()
+            raise
+
+        if resposta.will_close:
+            conexao.close()
+        else:
+            self.livres.put(conexao)
+        return resposta.status, resposta.headers, conteudo
+
+    def fechar(self):
+        while True:
+            try:
+                self.livres.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Despachante:
+
+    def __init__(self, configuracao=None, progresso=None):
+        self.configuracao = destinos() if configuracao is None else configuracao
+        self.progresso = progresso or (lambda mensagem: None)
+        self.timeout = getattr(settings, 'WEBHOOKS_TIMEOUT', 10)
+        self.max_tentativas = getattr(settings, 'WEBHOOKS_TENTATIVAS', 8)
+        self.espera_base = getattr(settings, 'WEBHOOKS_ESPERA_BASE', 5)
+        self.espera_maxima = getattr(settings, 'WEBHOOKS_ESPERA_MAXIMA', 3600)
+        self.pools = {nome: PoolConexoes(destino['url'], self.timeout) for nome, destino in self.configuracao.items()}
+        self.executores = {
+            nome: ThreadPoolExecutor(destino.get('concorrencia', 2), thread_name_prefix=f'webhook-{nome}')
+            for nome, destino in self.configuracao.items()
+        }
+        self.enviados = 0
+        self.reagendados = 0
+        self.abandonados = 0
+
+    def ciclo(self):
+        """Uma rodada em todos os destinos; devolve quantos eventos foram processados."""
+        envios = []
+        for nome, destino in self.configuracao.items():
+            tamanho = destino.get('lote', 50)
+            eventos = self.reservar(nome, tamanho * destino.get('concorrencia', 2))
+            for inicio in range(0, len(eventos), tamanho):
+                lote = eventos[inicio:inicio + tamanho]
+                envios.append((nome, lote, self.executores[nome].submit(self.enviar, nome, lote)))
+
+        # A rede fica nas threads; o banco só é tocado aqui, na thread do comando
+        for nome, lote, futuro in envios:
+            try:
+                resultado = futuro.result()
+            except Exception as erro:
+                # Ex.: cabeçalho inválido na configuração; o lote volta para a fila e os outros seguem
+                resultado = False, True, None, f'{erro.__class__.__name__}: {erro}'
+            self.concluir(nome, lote, *resultado)
+        return sum(len(lote) for _, lote, _ in envios)
+
+    def reservar(self, nome, limite):
+        """
+        Eventos vencidos do destino, adiados por alguns timeouts para que outro
+        despachante não os pegue durante o envio (se este cair, voltam sozinhos).
+        """
+        agora = timezone.now()
+        alias = router.db_for_write(EventoSaida)
+        with transaction.atomic(using=alias):
+            pendentes = EventoSaida.objects.using(alias).filter(
+                destino=nome, enviado_em__isnull=True, proxima_tentativa__lte=agora
+            ).order_by('pk')
+            if connections[alias].features.has_select_for_update_skip_locked:
+                pendentes = pendentes.select_for_update(skip_locked=True)
+            eventos = list(pendentes[:limite])
+            EventoSaida.objects.using(alias).filter(pk__in=[evento.pk for evento in eventos]).update(
+                proxima_tentativa=agora + timedelta(seconds=self.timeout * 3)
+            )
+        return eventos
+
+    def enviar(self, nome, eventos):
+        """Executado na thread do destino: (entregue, repetir, espera sugerida, erro)."""
+        destino = self.configuracao[nome]
+        corpo = json.dumps({
+            'eventos': [
+                {'id': evento.pk, 'evento': evento.evento, 'criado_em': evento.criado_em, 'dados': evento.dados}
+                for evento in eventos
+            ],
+        }, cls=DjangoJSONEncoder).encode()
+        cabecalhos = {'Content-Type': 'application/json', **destino.get('cabecalhos', {})}
+        if destino.get('segredo'):
+            assinatura = hmac.new(destino['segredo'].encode(), corpo, hashlib.sha256).hexdigest()
+            cabecalhos['X-Webhook-Assinatura'] = f'sha256={assinatura}'
+
+        try:
+            status, resposta, conteudo = self.pools[nome].post(corpo, cabecalhos)
+        except (OSError, HTTPException) as erro:
+            return False, True, None, f'{erro.__class__.__name__}: {erro}'
+        if 200 <= status < 300:
+            return True, False, None, ''
+
+        erro = f'HTTP {status}: {conteudo[:500].decode(errors="replace")}'
+        retry_after = resposta.get('Retry-After', '')
+        espera = int(retry_after) if retry_after.isdigit() else None
+        return False, status in STATUS_REPETIR or status >= 500, espera, erro
+
+    def concluir(self, nome, eventos, entregue, repetir, espera, erro):
+        agora = timezone.now()
+        if entregue:
+            EventoSaida.objects.filter(pk__in=[evento.pk for evento in eventos]).update(enviado_em=agora, erro='')
+            self.enviados += len(eventos)
+            self.progresso(f'{nome}: {len(eventos)} eventos entregues')
+            return
+
+        por_tentativa = {}
+        for evento in eventos:
+            por_tentativa.setdefault(evento.tentativas + 1, []).append(evento.pk)
+        for tentativas, chaves in por_tentativa.items():
+            if repetir and tentativas < self.max_tentativas:
+                # Espera exponencial com variação, para os destinos não receberem rajadas sincronizadas
+                atraso = espera or min(self.espera_base * 2 ** (tentativas - 1), self.espera_maxima) * random.uniform(0.5, 1)
+                proxima = agora + timedelta(seconds=atraso)
+                self.reagendados += len(chaves)
+            else:
+                proxima = None
+                self.abandonados += len(chaves)
+            EventoSaida.objects.filter(pk__in=chaves).update(
+                tentativas=F('tentativas') + 1, proxima_tentativa=proxima, erro=erro
+            )
+        self.progresso(f'{nome}: {len(eventos)} eventos não entregues ({erro})')
+
+    def fechar(self):
+        for executor in self.executores.values():
+            executor.shutdown()
+        for pool in self.pools.values():
+            pool.fechar()
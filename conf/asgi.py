@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'TEMPLATES_PRECOMPILAR', False):
+    from apps.base.precompilacao import precompilar_templates
+
+    precompilar_templates()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,6 +31,11 @@ ALLOWED_HOSTS = ['*']
 
 # Application definition
 
+# Apps usadas apenas em desenvolvimento; removidas em conf/settings_prod.py
+DEV_APPS = [
+    'django_extensions',
+]
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -37,7 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'django_extensions',
+    *DEV_APPS,
     'apps.base',
     'apps.landingpage',
     'apps.ticket',
@@ -45,10 +51,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.base.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.ticket.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,13 +82,27 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'conf.wsgi.application'
 
+# Views assíncronas (apps/ticket/async_views.py) ativadas pelo conf/asgi.py
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'banco' / 'base.sqlite3',
-    }
+    },
+    # Réplica de leitura do dashboard e relatórios; sem DJANGO_DB_REPLICA usa o próprio banco principal
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_REPLICA', BASE_DIR / 'banco' / 'base.sqlite3'),
+    },
 }
 
+DATABASE_ROUTERS = ['apps.base.routers.PrimaryReplicaRouter']
+
+# Após uma escrita, as leituras do cliente ficam no primário por este tempo
+REPLICA_PIN_SECONDS = 10
+REPLICA_EXCLUDED_APPS = ['sessions']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,7 +135,68 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_ROOT = BASE_DIR / 'media_web'
 MEDIA_URL = 'media/'
 
+# Anexos em camadas: sem acesso há ANEXOS_DIAS_FRIO dias, `compactar_anexos` comprime o arquivo
+STORAGES = {
+    'default': {
+        'BACKEND': 'apps.base.storage.ArmazenamentoEmCamadas',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+ANEXOS_DIAS_FRIO = 30
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/ticket/login/'
-LOGIN_REDIRECT_URL = '/'
\ No newline at end of file
+LOGIN_REDIRECT_URL = '/'
+
+# Profiling sob demanda (somente staff): ?_profile=1 ou header X-Profile
+PROFILING_PARAM = '_profile'
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_MAX_PERFIS = 50
+
+# Orçamento de inicialização verificado por `manage.py startup_profile`
+STARTUP_BUDGET_MS = 2000
+STARTUP_PROFILE_URL = '/ticket/login/'
+
+# Fila de triagem: cada nível de prioridade vale este número de horas de espera
+TRIAGEM_HORAS_POR_PRIORIDADE = 24
+# Idade máxima da fila em memória (tickets gravados por outros workers ou pelo importador)
+TRIAGEM_TTL = 60
+
+# Leituras de tickets acumuladas em memória antes de serem gravadas em lote
+LEITURAS_LOTE = 200
+LEITURAS_INTERVALO = 5
+
+# Idade máxima do índice de busca de usuários (alterações feitas em outros workers)
+BUSCA_USUARIOS_TTL = 300
+
+# Segundos em cache das contagens por faceta do dashboard, por combinação de filtros
+FACETAS_TTL = 30
+
+# Compila os templates do projeto na subida do worker (conf/wsgi.py, conf/asgi.py)
+TEMPLATES_PRECOMPILAR = False
+
+# Retenção (`manage.py aplicar_retencao`): dias por política, None desliga.
+# Apagar tickets encerrados (com mensagens, histórico e anexos) é decisão do negócio:
+# fica desligado até ser configurado aqui, ex.: 'tickets': 730
+RETENCAO_DIAS = {
+    'sessoes': 0,
+    'historico': None,
+    'tickets': None,
+    'eventos': 30,
+}
+RETENCAO_LOTE = 500
+RETENCAO_PAUSA = 0.5
+RETENCAO_CARENCIA_ARQUIVOS = 24
+
+# Webhooks de eventos de tickets (apps/ticket/webhooks.py, `manage.py despachar_webhooks`):
+# nome -> {'url', 'eventos' (None = todos), 'segredo', 'lote', 'concorrencia'}
+WEBHOOKS = {}
+WEBHOOKS_TIMEOUT = 10
+WEBHOOKS_INTERVALO = 2
+# Espera antes de cada nova tentativa: WEBHOOKS_ESPERA_BASE * 2^(tentativa - 1), até WEBHOOKS_ESPERA_MAXIMA
+WEBHOOKS_TENTATIVAS = 8
+WEBHOOKS_ESPERA_BASE = 5
+WEBHOOKS_ESPERA_MAXIMA = 3600
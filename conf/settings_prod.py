@@ -0,0 +1,55 @@
+"""
+Perfil de produção: DJANGO_SETTINGS_MODULE=conf.settings_prod
+
+Herda conf/settings.py, desliga o DEBUG e remove as apps de desenvolvimento
+para reduzir o tempo de boot dos workers.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DEV_APPS, INSTALLED_APPS, SECRET_KEY, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+
+# Pipeline de estáticos: manifest com hash, .gz/.br pré-gerados e poda de js/custom
+STORAGES = {
+    'default': {
+        'BACKEND': 'apps.base.storage.ArmazenamentoEmCamadas',
+    },
+    'staticfiles': {
+        'BACKEND': 'apps.base.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+STATICFILES_FINDERS = [
+    'apps.base.finders.PrunedFileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+]
+
+STATIC_PRUNE_PREFIXES = ['js/custom/']
+
+# Templates compilados uma vez por processo (loader em cache), já na subida do worker
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processador for processador in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processador != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+TEMPLATES_PRECOMPILAR = True
@@ -1,10 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
-from .settings import STATIC_URL, STATIC_ROOT
 
-from apps.ticket.views import DashboardView
+from apps.base.views import servir_estatico
+
+if settings.ASYNC_VIEWS:
+    from apps.ticket.async_views import AsyncDashboardView as DashboardView
+else:
+    from apps.ticket.views import DashboardView
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'), 
@@ -14,4 +19,10 @@ urlpatterns = [
     path('ticket/',  include('apps.ticket.urls', namespace='ticket')),
 ]
 
-urlpatterns += static(STATIC_URL, document_root=STATIC_ROOT)
+if settings.DEBUG:
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+else:
+    # Produção: arquivos com hash e variantes .gz/.br geradas pelo collectstatic
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), servir_estatico, name='static'),
+    ]
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'TEMPLATES_PRECOMPILAR', False):
+    from apps.base.precompilacao import precompilar_templates
+
+    precompilar_templates()